@@ -0,0 +1,699 @@
+"""
+In-process stand-in for the DaVinci Resolve scripting API.
+
+Mimics the ProjectManager/Project/MediaPool/MediaStorage/Folder/Timeline objects footbrake talks to, closely enough
+to run the engine without Resolve. Every API call is counted per method and can be slowed down by a fixed latency,
+so the number of round trips a code path makes can be measured and regression tested.
+Renders are simulated against the clock at render_fps frames per second.
+
+serve() runs a FakeResolve in its own process behind a multiprocessing.connection listener, connect() returns a proxy
+of it, so several stand-in Resolve hosts can run on one machine, and be killed to test failover:
+
+    python3 fakeresolve.py --serve 127.0.0.1:6001
+"""
+import argparse
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from multiprocessing.connection import Client, Listener
+
+# Extensions the fake media storage accepts, anything else is rejected like Resolve does with unsupported files.
+MEDIA_EXTENSIONS = ('.mov', '.mp4', '.mxf', '.braw', '.r3d', '.ari', '.dng', '.dpx', '.exr', '.avi', '.mts', '.m4v',
+                    '.wav', '.aif', '.aiff', '.tif', '.tiff', '.jpg', '.png', '.crm', '.mkv')
+
+BUILTIN_PRESETS = ['Custom', 'YouTube - 720p', 'YouTube - 1080p', 'YouTube - 2160p', 'Vimeo - 720p', 'Vimeo - 1080p',
+                   'Vimeo - 2160p', 'Twitter - 720p', 'Twitter - 1080p', 'Dropbox - 720p', 'Dropbox - 1080p',
+                   'Dropbox - 2160p', 'Final Cut Pro X', 'Premiere XML', 'AVID AAF', 'Pro Tools', 'Audio Only',
+                   'H.264 Master', 'H.265 Master']
+
+TIMELINE_START_FRAME = 86400
+
+# A complete, empty QuickTime file: one 'ftyp' atom, so the synthetic clips pass fbprobe's header check.
+QUICKTIME_HEADER = b'\x00\x00\x00\x14ftypqt  \x00\x00\x02\x00qt  '
+
+
+class CallLog:
+    """
+    Counts API calls per 'Object.Method' and sleeps a fixed latency on each of them.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name):
+        with self._lock:
+            self.counts[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+def api(method):
+    """
+    Mark a method as a Resolve API call, so it is counted and delayed by the call log.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        self._log.record(type(self).__name__[4:] + '.' + method.__name__)
+        return method(self, *args)
+
+    return wrapper
+
+
+def _indexed(items):
+    # Resolve returns collections as dictionaries keyed by a 1-based index.
+    return {i: item for i, item in enumerate(items, 1)}
+
+
+class FakeClip:
+    def __init__(self, log, path, frames):
+        self._log = log
+        self.path = path
+        self.frames = frames
+
+    @api
+    def GetName(self):
+        return os.path.basename(self.path)
+
+    @api
+    def GetMediaId(self):
+        return self.path
+
+    @api
+    def GetClipProperty(self, name=None):
+        properties = {'Clip Name': os.path.basename(self.path), 'File Path': self.path, 'Frames': str(self.frames)}
+        if name is None:
+            return properties
+        return properties.get(name, '')
+
+
+class FakeFolder:
+    def __init__(self, log, name):
+        self._log = log
+        self.name = name
+        self.clips = []
+        self.subfolders = []
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def GetClips(self):
+        return _indexed(self.clips)
+
+    @api
+    def GetSubFolders(self):
+        return _indexed(self.subfolders)
+
+
+class FakeTimelineItem:
+    def __init__(self, log, clip, start):
+        self._log = log
+        self.clip = clip
+        # timeline frame the item starts at
+        self.start = start
+
+    @api
+    def GetName(self):
+        return os.path.basename(self.clip.path)
+
+    @api
+    def GetDuration(self):
+        return self.clip.frames
+
+    @api
+    def GetStart(self):
+        return self.start
+
+    @api
+    def GetEnd(self):
+        return self.start + self.clip.frames
+
+    @api
+    def GetMediaPoolItem(self):
+        return self.clip
+
+
+class FakeTimeline:
+    def __init__(self, log, name):
+        self._log = log
+        self.name = name
+        self.items = []
+        self.markers = {}
+
+    @property
+    def frames(self):
+        return sum(item.clip.frames for item in self.items)
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def SetName(self, name):
+        self.name = name
+        return True
+
+    @api
+    def GetStartFrame(self):
+        return TIMELINE_START_FRAME
+
+    @api
+    def GetEndFrame(self):
+        return TIMELINE_START_FRAME + self.frames
+
+    @api
+    def GetTrackCount(self, track_type):
+        return 1 if track_type in ('video', 'audio') else 0
+
+    @api
+    def GetItemsInTrack(self, track_type, index):
+        if track_type == 'video' and index == 1:
+            return _indexed(self.items)
+        return {}
+
+    @api
+    def AddMarker(self, frame_id, color, name, note, duration):
+        if frame_id in self.markers:
+            return False
+        self.markers[frame_id] = {'color': color, 'name': name, 'note': note, 'duration': duration}
+        return True
+
+    @api
+    def GetMarkers(self):
+        return dict(self.markers)
+
+
+class FakeMediaPool:
+    def __init__(self, log, project):
+        self._log = log
+        self.project = project
+        self.root = FakeFolder(log, 'Master')
+        self.current = self.root
+
+    @api
+    def GetRootFolder(self):
+        return self.root
+
+    @api
+    def GetCurrentFolder(self):
+        return self.current
+
+    @api
+    def SetCurrentFolder(self, folder):
+        if not isinstance(folder, FakeFolder):
+            return False
+        self.current = folder
+        return True
+
+    @api
+    def AddSubFolder(self, parent, name):
+        if not isinstance(parent, FakeFolder):
+            return None
+        folder = FakeFolder(self._log, name)
+        parent.subfolders.append(folder)
+        # Resolve switches the current folder to the newly added one
+        self.current = folder
+        return folder
+
+    @api
+    def CreateEmptyTimeline(self, name):
+        if any(timeline.name == name for timeline in self.project.timelines):
+            return None
+        timeline = FakeTimeline(self._log, name)
+        self.project.timelines.append(timeline)
+        self.project.current_timeline = timeline
+        return timeline
+
+    @api
+    def AppendToTimeline(self, *clips):
+        if len(clips) == 1 and isinstance(clips[0], (list, tuple)):
+            clips = clips[0]
+        timeline = self.project.current_timeline
+        if timeline is None or not clips:
+            return False
+        items = []
+        start = TIMELINE_START_FRAME + timeline.frames
+        for clip in clips:
+            items.append(FakeTimelineItem(self._log, clip, start))
+            start += clip.frames
+        timeline.items.extend(items)
+        return items
+
+
+class FakeMediaStorage:
+    def __init__(self, log, resolve):
+        self._log = log
+        self.resolve = resolve
+
+    @api
+    def AddItemsToMediaPool(self, *items):
+        if len(items) == 1 and isinstance(items[0], (list, tuple)):
+            items = items[0]
+        folder = self.resolve.project_manager.current_project.media_pool.current
+        clips = []
+        for path in items:
+            if os.path.isfile(path) and path.lower().endswith(MEDIA_EXTENSIONS):
+                clips.append(FakeClip(self._log, path, self.resolve.clip_frames))
+        folder.clips.extend(clips)
+        return _indexed(clips)
+
+    @api
+    def GetMountedVolumes(self):
+        return _indexed(['/'])
+
+
+class FakeProject:
+    def __init__(self, log, resolve, name):
+        self._log = log
+        self.resolve = resolve
+        self.name = name
+        self.media_pool = FakeMediaPool(log, self)
+        self.timelines = []
+        self.current_timeline = None
+        self.presets = BUILTIN_PRESETS + list(resolve.custom_presets)
+        self.render_settings = {}
+        self.loaded_preset = None
+        # job dictionaries and statuses, in queue order
+        self.jobs = []
+        self.render_order = []
+        self.render_started = None
+        self.stopped = False
+
+    def _advance(self):
+        """
+        Bring the status of the queued jobs up to date with the clock.
+        """
+        if self.render_started is None or self.stopped:
+            return
+        elapsed = self.resolve.clock() - self.render_started
+        for job in self.render_order:
+            status = job['status']
+            if status['JobStatus'] in ('Complete', 'Failed', 'Cancelled'):
+                continue
+            duration = job['frames'] / float(self.resolve.render_fps)
+            if job['name'] in self.resolve.failing_timelines:
+                status.update({'JobStatus': 'Failed', 'CompletionPercentage': 0})
+                continue
+            if elapsed >= duration:
+                status.update({'JobStatus': 'Complete', 'CompletionPercentage': 100,
+                               'TimeTakenToRenderInMs': int(duration * 1000)})
+                elapsed -= duration
+            else:
+                status.update({'JobStatus': 'Rendering',
+                               'CompletionPercentage': int(100 * elapsed / duration) if duration else 0,
+                               'TimeTakenToRenderInMs': int(elapsed * 1000),
+                               'EstimatedTimeRemainingInMs': int((duration - elapsed) * 1000)})
+                break
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def GetMediaPool(self):
+        return self.media_pool
+
+    @api
+    def GetTimelineCount(self):
+        return len(self.timelines)
+
+    @api
+    def GetTimelineByIndex(self, index):
+        try:
+            return self.timelines[index - 1]
+        except IndexError:
+            return None
+
+    @api
+    def GetCurrentTimeline(self):
+        return self.current_timeline
+
+    @api
+    def SetCurrentTimeline(self, timeline):
+        if timeline not in self.timelines:
+            return False
+        self.current_timeline = timeline
+        return True
+
+    @api
+    def GetRenderPresets(self):
+        return _indexed(self.presets)
+
+    @api
+    def LoadRenderPreset(self, name):
+        if name not in self.presets:
+            return False
+        self.loaded_preset = name
+        return True
+
+    @api
+    def SetRenderSettings(self, settings):
+        self.render_settings.update(settings)
+        return True
+
+    @api
+    def AddRenderJob(self):
+        timeline = self.current_timeline
+        if timeline is None or self._rendering():
+            return False
+        self.jobs.append({
+            'id': str(uuid.uuid4()), 'name': timeline.name, 'frames': timeline.frames,
+            'preset': self.loaded_preset, 'target': self.render_settings.get('TargetDir', ''),
+            'status': {'JobStatus': 'Ready', 'CompletionPercentage': 0}})
+        return True
+
+    @api
+    def DeleteRenderJobByIndex(self, index):
+        if self._rendering() or not 0 < index <= len(self.jobs):
+            return False
+        del self.jobs[index - 1]
+        return True
+
+    @api
+    def DeleteAllRenderJobs(self):
+        if self._rendering():
+            return False
+        self.jobs = []
+        return True
+
+    @api
+    def GetRenderJobs(self):
+        return _indexed({
+            'JobId': job['id'], 'TimelineName': job['name'], 'TargetDir': job['target'],
+            'MarkIn': TIMELINE_START_FRAME, 'MarkOut': TIMELINE_START_FRAME + max(job['frames'] - 1, 0),
+            'RenderJobName': 'Job ' + str(i), 'PresetName': job['preset']}
+            for i, job in enumerate(self.jobs, 1))
+
+    @api
+    def GetRenderJobStatus(self, index):
+        self._advance()
+        try:
+            return dict(self.jobs[index - 1]['status'])
+        except (IndexError, TypeError):
+            return {}
+
+    @api
+    def StartRendering(self, *indexes):
+        if len(indexes) == 1 and isinstance(indexes[0], (list, tuple)):
+            indexes = indexes[0]
+        if self._rendering():
+            return False
+        if not indexes:
+            indexes = range(1, len(self.jobs) + 1)
+        self.render_order = [self.jobs[i - 1] for i in indexes if 0 < i <= len(self.jobs)]
+        for job in self.render_order:
+            job['status'] = {'JobStatus': 'Ready', 'CompletionPercentage': 0}
+        self.render_started = self.resolve.clock()
+        self.stopped = False
+        return bool(self.render_order)
+
+    @api
+    def StopRendering(self):
+        self._advance()
+        for job in self.render_order:
+            if job['status']['JobStatus'] == 'Rendering':
+                job['status']['JobStatus'] = 'Cancelled'
+        self.stopped = True
+
+    @api
+    def IsRenderingInProgress(self):
+        return self._rendering()
+
+    def _rendering(self):
+        self._advance()
+        if self.render_started is None or self.stopped:
+            return False
+        return any(job['status']['JobStatus'] in ('Ready', 'Rendering') for job in self.render_order)
+
+
+class FakeProjectManager:
+    def __init__(self, log, resolve):
+        self._log = log
+        self.resolve = resolve
+        self.projects = {'Untitled Project': FakeProject(log, resolve, 'Untitled Project')}
+        self.current_project = self.projects['Untitled Project']
+
+    @api
+    def GetCurrentProject(self):
+        return self.current_project
+
+    @api
+    def CreateProject(self, name):
+        if name in self.projects:
+            return None
+        self.projects[name] = FakeProject(self._log, self.resolve, name)
+        self.current_project = self.projects[name]
+        return self.current_project
+
+    @api
+    def LoadProject(self, name):
+        if name not in self.projects or self.current_project._rendering():
+            return None
+        self.current_project = self.projects[name]
+        return self.current_project
+
+    @api
+    def SaveProject(self):
+        return True
+
+    @api
+    def GetProjectsInCurrentFolder(self):
+        return _indexed(list(self.projects))
+
+
+class FakeResolve:
+    """
+    Entry point, what GetResolve() would return.
+    :param latency: seconds slept on every API call.
+    :param clip_frames: frame count given to every imported clip.
+    :param render_fps: simulated render speed in frames per second.
+    :param custom_presets: names of the user presets on top of the built-in ones.
+    :param clock: time function used to simulate renders.
+    """
+
+    def __init__(self, latency=0.0, clip_frames=100, render_fps=1000000.0,
+                 custom_presets=('ProRes 422 Proxy', 'DNxHR LB'), clock=time.monotonic):
+        self._log = CallLog(latency)
+        self.clip_frames = clip_frames
+        self.render_fps = render_fps
+        self.custom_presets = custom_presets
+        self.clock = clock
+        # timelines whose render jobs fail instead of completing
+        self.failing_timelines = set()
+        self.project_manager = FakeProjectManager(self._log, self)
+        self.media_storage = FakeMediaStorage(self._log, self)
+
+    @property
+    def log(self):
+        return self._log
+
+    @api
+    def GetProjectManager(self):
+        return self.project_manager
+
+    @api
+    def GetMediaStorage(self):
+        return self.media_storage
+
+    @api
+    def GetProductName(self):
+        return 'DaVinci Resolve'
+
+    @api
+    def GetVersionString(self):
+        return '16.2.0.55'
+
+
+def make_source_tree(root, clips, clips_per_folder=50, folders_per_level=10, sidecar_every=25):
+    """
+    Create a synthetic camera card dump of header-only clips and empty sidecars.
+    :param root: folder to create, must not exist yet.
+    :param clips: number of media files.
+    :param clips_per_folder: media files per leaf folder.
+    :param folders_per_level: leaf folders grouped per parent folder.
+    :param sidecar_every: add an .xml sidecar for every n clips, 0 for none.
+    :return: list of the media file paths.
+    """
+    paths = []
+    for i in range(clips):
+        folder_index = i // clips_per_folder
+        folder = os.path.join(root, 'A{:03d}'.format(folder_index // folders_per_level),
+                              'A{:03d}_C{:03d}'.format(folder_index // folders_per_level, folder_index))
+        if i % clips_per_folder == 0:
+            os.makedirs(folder)
+        path = os.path.join(folder, 'A{:03d}C{:05d}.mov'.format(folder_index, i))
+        with open(path, 'wb') as filehandle:
+            filehandle.write(QUICKTIME_HEADER)
+        paths.append(path)
+        if sidecar_every and i % sidecar_every == 0:
+            open(os.path.join(folder, 'A{:03d}C{:05d}.xml'.format(folder_index, i)), 'wb').close()
+    return paths
+
+
+# Remote object handle, API objects cross the connection as Refs, plain values as themselves.
+Ref = namedtuple('Ref', ['oid'])
+
+DEFAULT_AUTHKEY = b'footbrake'
+
+
+def _encode(value, objects):
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, objects) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(item, objects) for key, item in value.items()}
+    objects[id(value)] = value
+    return Ref(id(value))
+
+
+def _decode(value, objects):
+    if isinstance(value, Ref):
+        return objects[value.oid]
+    if isinstance(value, list):
+        return [_decode(item, objects) for item in value]
+    if isinstance(value, dict):
+        return {key: _decode(item, objects) for key, item in value.items()}
+    return value
+
+
+def _serve_client(conn, objects, lock):
+    try:
+        while True:
+            oid, method, args = conn.recv()
+            with lock:
+                try:
+                    result = ('ok', _encode(getattr(objects[oid], method)(*_decode(args, objects)), objects))
+                except Exception as e:
+                    result = ('error', f'{type(e).__name__}: {e}')
+            conn.send(result)
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def serve(address, authkey=DEFAULT_AUTHKEY, **kwargs):
+    """
+    Serve a FakeResolve to connect() clients until the process is killed.
+    :param address: (host, port) to listen on.
+    :param authkey: shared secret of multiprocessing.connection.
+    :param kwargs: passed on to FakeResolve.
+    """
+    resolve = FakeResolve(**kwargs)
+    objects = {0: resolve}
+    lock = threading.Lock()
+    with Listener(tuple(address), authkey=authkey) as listener:
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_client, args=(conn, objects, lock), daemon=True).start()
+
+
+class RemoteObject:
+    """
+    Client side proxy of an API object served by serve(), method calls are forwarded over the connection.
+    A dead server raises EOFError or OSError from the call, like a lost network connection would.
+    """
+
+    def __init__(self, client, oid):
+        self._client = client
+        self._oid = oid
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self._client.call, self._oid, method)
+
+    def __repr__(self):
+        return f'RemoteObject({self._oid})'
+
+
+class RemoteClient:
+    def __init__(self, conn):
+        self.conn = conn
+        # one proxy per remote object, so the same object compares identical between calls
+        self._proxies = {}
+        self._lock = threading.Lock()
+
+    def proxy(self, oid):
+        if oid not in self._proxies:
+            self._proxies[oid] = RemoteObject(self, oid)
+        return self._proxies[oid]
+
+    def _encode(self, value):
+        if isinstance(value, RemoteObject):
+            return Ref(value._oid)
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        return value
+
+    def _decode(self, value):
+        if isinstance(value, Ref):
+            return self.proxy(value.oid)
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._decode(item) for key, item in value.items()}
+        return value
+
+    def call(self, oid, method, *args):
+        with self._lock:
+            self.conn.send((oid, method, self._encode(args)))
+            outcome, value = self.conn.recv()
+        if outcome == 'error':
+            raise RuntimeError(value)
+        return self._decode(value)
+
+    def close(self):
+        self.conn.close()
+
+
+def connect(address, authkey=DEFAULT_AUTHKEY):
+    """
+    Connect to a served FakeResolve.
+    :param address: (host, port) the server listens on.
+    :return: proxy of the FakeResolve, None if nothing listens there.
+    """
+    try:
+        conn = Client(tuple(address), authkey=authkey)
+    except OSError:
+        return None
+    return RemoteClient(conn).proxy(0)
+
+
+def parse_address(text):
+    """
+    :param text: 'host:port'
+    :return: (host, port)
+    """
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a fake Resolve, for footbrake farm tests without Resolve.')
+    parser.add_argument('--serve', type=parse_address, required=True, metavar='HOST:PORT', help='address to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per Resolve API call')
+    parser.add_argument('--render-fps', type=float, default=1000.0, help='simulated render speed')
+    args = parser.parse_args()
+    serve(args.serve, latency=args.latency, render_fps=args.render_fps)
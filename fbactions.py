@@ -0,0 +1,255 @@
+"""
+Post-render actions.
+
+When a job completes, the render status poller hands it to the ActionBus, which runs the job's actions one after the
+other in a worker thread. A slow copy to a server, or a webhook that does not answer, holds up neither the poller
+nor the GUI, and the jobs that complete meanwhile queue for the next free worker.
+
+    copy        copy the xml sidecars of the source folder to the output path, see fbcopy
+    manifest    write <timeline>.footbrake.json in the output path: source, preset, host, frames, render time and
+                the renders with their sizes
+    move        move the renders, the xml sidecars copied and the files named after the timeline from the output path
+                to the delivery path, keeping the folders below the output path. Refused in incremental mode,
+                which looks for the renders in the output path
+    notify      POST a JSON message to the notify URL, Slack incoming webhook format, print it if there is none
+
+Every action reports per job whether it worked. Once one fails, the actions after it are skipped, so a half copied
+deliverable is not moved, only notify still runs, to tell about the failure. With a verifier on the session, the
+actions wait until the job's renders are verified, a job with missing or broken renders fails as 'verify'.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+
+from fbcopy import find_sidecars
+from fbverify import find_outputs
+
+# action: name of the action. ok: True if it worked, False if it failed, None if it was skipped.
+# message: what it did, or why it failed.
+ActionReport = namedtuple('ActionReport', ['job', 'action', 'ok', 'message', 'seconds'])
+
+MANIFEST_SUFFIX = '.footbrake.json'
+
+# actions that run after one failed
+ALWAYS = ('notify',)
+
+
+class ActionError(Exception):
+    pass
+
+
+def copy_action(bus, job, timeline_name, reports):
+    report = bus.session.copy_xml(job.watch_path, job.source, job.output_path)
+    if report.failed:
+        raise ActionError(f'{len(report.failed)} xml files failed to copy, first {report.failed[0][0]}: '
+                          f'{report.failed[0][1]}')
+    return f'copied {report.copied} xml files, {report.skipped} unchanged'
+
+
+def job_outputs(bus, job, timeline_name):
+    """
+    :return: paths of the job's renders in its output path.
+    """
+    sources = job.sources if job.sources is not None else bus.session.media_files(job.watch_path, job.source)
+    outputs, missing = find_outputs(sources, job.output_path, timeline_name, bus.session.preserve_levels)
+    return outputs
+
+
+def manifest_action(bus, job, timeline_name, reports):
+    renders = []
+    for path in job_outputs(bus, job, timeline_name):
+        renders.append({'path': os.path.relpath(path, job.output_path), 'bytes': os.path.getsize(path)})
+    manifest = {
+        'timeline': timeline_name, 'source': os.path.join(job.watch_path, job.source), 'preset': job.preset,
+        'host': bus.session.host, 'frames': job.frames, 'clips': job.clips, 'source_bytes': job.bytes,
+        'render_ms': (bus.statuses.get(job) or {}).get('TimeTakenToRenderInMs'), 'finished': time.time(),
+        'renders': sorted(renders, key=lambda render: render['path'])}
+    path = os.path.join(job.output_path, timeline_name + MANIFEST_SUFFIX)
+    with open(path, 'w') as filehandle:
+        json.dump(manifest, filehandle, indent=1)
+    return f'{len(renders)} renders listed in {path}'
+
+
+def move_action(bus, job, timeline_name, reports):
+    if not bus.delivery_path:
+        raise ActionError('no delivery path set')
+    if bus.session.preserve_levels is not None:
+        raise ActionError('not in incremental mode, the renders have to stay in the output path')
+    # the renders, the sidecars copied next to them, and the checksums and manifest written for the timeline
+    paths = job_outputs(bus, job, timeline_name)
+    for path in find_sidecars(os.path.join(job.watch_path, job.source), walk=bus.session.walk):
+        copied = os.path.join(job.output_path, os.path.relpath(path, job.watch_path))
+        if os.path.isfile(copied):
+            paths.append(copied)
+    with os.scandir(job.output_path) as entries:
+        paths += [entry.path for entry in entries if entry.is_file() and entry.name.startswith(timeline_name + '.')]
+    moved = 0
+    for path in dict.fromkeys(paths):
+        target = os.path.join(bus.delivery_path, os.path.relpath(path, job.output_path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # a rename on the same volume, a copy and delete across volumes
+        shutil.move(path, target)
+        moved += 1
+    return f'moved {moved} files to {bus.delivery_path}'
+
+
+def notify_action(bus, job, timeline_name, reports):
+    failed = [report for report in reports if report.ok is False]
+    if failed:
+        text = f'{job.source}: {timeline_name} rendered, ' + ', '.join(
+            f'{report.action} failed: {report.message}' for report in failed)
+    else:
+        text = f'{job.source}: {timeline_name} rendered to {job.output_path}'
+    if not bus.notify_url:
+        print(text)
+        return 'printed'
+    body = json.dumps({'text': text}).encode()
+    request = urllib.request.Request(bus.notify_url, body, {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=bus.notify_timeout) as response:
+        return f'posted, HTTP {response.status}'
+
+
+# action name -> function(bus, job, timeline name, reports of the job's actions so far) returning what it did,
+# raising on failure
+ACTIONS = {
+    'copy': copy_action,
+    'manifest': manifest_action,
+    'move': move_action,
+    'notify': notify_action,
+}
+
+
+def print_action_report(report):
+    """
+    Print an ActionReport, on_report for the GUI and the watch folder daemon.
+    :return: none
+    """
+    if report.ok is None:
+        print(f'{report.job.source}: {report.action} skipped, {report.message}')
+    elif not report.ok:
+        print(f'{report.job.source}: {report.action} failed, {report.message}')
+
+
+class ActionBus:
+    """
+    Runs the post-render actions of the completed jobs in a thread pool.
+    :param session: fbcore.Session.
+    :param actions: names of the ACTIONS every job runs, in order.
+    :param workers: jobs whose actions run at the same time.
+    :param on_report: function(ActionReport) called from the worker thread after each action.
+    :param delivery_path: folder the move action moves the renders to.
+    :param notify_url: webhook the notify action posts to, None to print.
+    :raises ValueError: if an action is unknown.
+    """
+
+    def __init__(self, session, actions=(), workers=2, on_report=None, delivery_path=None, notify_url=None):
+        self.session = session
+        self.actions = self.check(actions)
+        self.workers = workers
+        self.on_report = on_report
+        self.delivery_path = delivery_path
+        self.notify_url = notify_url
+        self.notify_timeout = 10.0
+        # fbjobs.Job -> the status it completed with
+        self.statuses = {}
+        # reports of the actions that failed
+        self.failures = []
+        self._pool = None
+        # submit() runs on the render status poller's thread, wait() on another
+        self._lock = threading.Lock()
+        self._futures = []
+
+    @staticmethod
+    def check(actions):
+        """
+        :return: the action names as a list.
+        :raises ValueError: if an action is unknown.
+        """
+        unknown = [name for name in actions if name not in ACTIONS]
+        if unknown:
+            raise ValueError('unknown post-render action ' + ', '.join(map(repr, unknown)) + ', one of: ' +
+                             ', '.join(ACTIONS))
+        return list(actions)
+
+    def submit(self, job, status, actions=None, after=None):
+        """
+        Queue the actions of a completed job.
+        :param job: fbjobs.Job.
+        :param status: the job's status from the render status poller.
+        :param actions: names of the ACTIONS to run, the bus's if None.
+        :param after: Future to wait for first, e.g. the job's verification, the actions are skipped if its result
+            has missing or bad renders.
+        :return: Future of the list of ActionReports, None if there is nothing to run.
+        """
+        actions = self.actions if actions is None else actions
+        if not actions:
+            return None
+        self.statuses[job] = status
+        with self._lock:
+            if self._pool is None:
+                # imported here, like in fbcopy, the pool is only needed once a job completes
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            future = self._pool.submit(self._run, job, status.get('Name'), list(actions), after)
+            # only the ones still running are kept for wait()
+            self._futures = [pending for pending in self._futures if not pending.done()] + [future]
+        return future
+
+    def _run(self, job, timeline_name, actions, after):
+        reports = []
+        failed = None
+        if after is not None:
+            start = time.perf_counter()
+            try:
+                verified = after.result()
+                if verified.missing or verified.bad:
+                    failed = f'{len(verified.missing)} renders missing, {len(verified.bad)} bad'
+            except Exception as e:
+                failed = str(e) or type(e).__name__
+            if failed:
+                reports.append(self._report(ActionReport(job, 'verify', False, failed,
+                                                         time.perf_counter() - start)))
+                failed = 'verify failed'
+        for name in actions:
+            start = time.perf_counter()
+            if failed and name not in ALWAYS:
+                report = ActionReport(job, name, None, failed, 0.0)
+            else:
+                try:
+                    report = ActionReport(job, name, True, ACTIONS[name](self, job, timeline_name, reports),
+                                          time.perf_counter() - start)
+                except Exception as e:
+                    # OSError from the file actions, URLError from the webhook, anything else from a bug in one,
+                    # the job's other actions and the other jobs go on
+                    report = ActionReport(job, name, False, str(e) or type(e).__name__, time.perf_counter() - start)
+                    failed = failed or f'{name} failed'
+            reports.append(self._report(report))
+        self.statuses.pop(job, None)
+        return reports
+
+    def _report(self, report):
+        if report.ok is False:
+            self.failures.append(report)
+        if self.on_report is not None:
+            self.on_report(report)
+        return report
+
+    def wait(self):
+        """
+        Block until the actions of every job submitted so far ran, the reports go to on_report.
+        :return: none
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,106 @@
+"""
+API-cost benchmarks for footbrake's hot paths, run against fakeresolve instead of a live Resolve.
+
+Usage:
+    python3 fbbench.py                          # 10 to 100k clips, no API latency
+    python3 fbbench.py --sizes 10 1000 --latency 0.001 --json
+
+For every tree size it times import_timeline, make_timeline_with_folder, queue_render, update_render_status and
+copy_xml, and reports how many times each Resolve API method was called.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import fakeresolve
+import fbcore
+from fbindex import ScanIndex
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def measure(log, results, name, function, *args):
+    """
+    Run function once, store its wall time and the API calls it made under results[name].
+    :return: whatever function returns.
+    """
+    before = log.snapshot()
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    calls = log.snapshot()
+    calls.subtract(before)
+    calls = {method: count for method, count in sorted(calls.items()) if count}
+    results[name] = {'seconds': seconds, 'api_calls': sum(calls.values()), 'methods': calls}
+    return value
+
+
+def run_size(clips, latency, jobs, workdir):
+    """
+    Benchmark one synthetic tree.
+    :param clips: number of clips in the source folder.
+    :param latency: simulated seconds per Resolve API call.
+    :param jobs: number of render jobs queued before timing update_render_status.
+    :param workdir: scratch folder.
+    :return: dictionary of operation name -> timing and call counts.
+    """
+    watch_path = os.path.join(workdir, 'watch')
+    output_path = os.path.join(workdir, 'output')
+    folder_name = 'CARD_{}'.format(clips)
+    fakeresolve.make_source_tree(os.path.join(watch_path, folder_name), clips)
+    os.makedirs(output_path)
+
+    resolve = fakeresolve.FakeResolve(latency=latency)
+    session = fbcore.Session(resolve, scan_index=ScanIndex(':memory:'))
+    session.copy_xml_flag = True
+    log = resolve.log
+    results = {}
+
+    measure(log, results, 'import_timeline', session.import_timeline, watch_path, folder_name)
+    imported_bin = session.mp.GetRootFolder().GetSubFolders()[1]
+    # free the bin name, so the timeline can be built again with markers on
+    session.proj.GetCurrentTimeline().SetName('imported')
+    measure(log, results, 'make_timeline_with_folder', fbcore.make_timeline_with_folder,
+            imported_bin, 'bench', 1, session.mp)
+    preset = session.proj.GetRenderPresets()[1]
+    measure(log, results, 'queue_render', session.queue_render, preset, folder_name, output_path, watch_path)
+    for _ in range(jobs - 1):
+        session.queue_render(preset, folder_name, output_path, watch_path)
+    measure(log, results, 'update_render_status', session.render_status)
+    measure(log, results, 'copy_xml', session.copy_xml, watch_path, folder_name, output_path)
+    return results
+
+
+def print_table(clips, results):
+    print('\n{} clips'.format(clips))
+    for name, result in results.items():
+        print('  {:<28}{:>10.3f} s{:>10} calls'.format(name, result['seconds'], result['api_calls']))
+        for method, count in result['methods'].items():
+            print('      {:<36}{:>10}'.format(method, count))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark footbrake against an in-process fake Resolve.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='clip counts to benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per Resolve API call')
+    parser.add_argument('--jobs', type=int, default=20, help='render jobs in the queue for update_render_status')
+    parser.add_argument('--json', action='store_true', help='print one JSON object per size')
+    args = parser.parse_args(argv)
+
+    for clips in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='fbbench_')
+        try:
+            results = run_size(clips, args.latency, args.jobs, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if args.json:
+            print(json.dumps({'clips': clips, 'latency': args.latency, 'results': results}))
+        else:
+            print_table(clips, results)
+
+
+if __name__ == '__main__':
+    main()
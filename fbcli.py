@@ -0,0 +1,335 @@
+"""
+Headless batch mode: import, queue and render many source folders without the GUI.
+
+Usage:
+    python3 fbcli.py /Volumes/Cards 'A0*' 'B0*' --preset 'ProRes 422 Proxy' --output /Volumes/Proxies
+    python3 fbcli.py /Volumes/Cards --preset 'ProRes 422 Proxy' --preset 'H.264 Master' --output /Volumes/Out
+
+Progress is printed to stdout as one JSON object per line, e.g.
+    {"event": "queued", "folder": "A001", "preset": "ProRes 422 Proxy", "job": 3}
+    {"event": "status", "job": 3, "status": "Rendering", "percent": 40, "eta": 95.2}
+    {"event": "done", "complete": 12, "failed": 0, "seconds": 1830.2}
+Messages from the engine go to stderr.
+
+Exit status: 0 all jobs complete, 1 some folders or jobs failed, with --verify some renders are missing or broken, or
+a post-render --action failed, 2 bad arguments or no folder matched, 3 Resolve is not reachable.
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import sys
+import time
+
+import fbcore
+import fbmetrics
+from fbactions import ACTIONS
+from fbdedup import DedupIndex
+from fbeta import ORDERS, parse_deadline
+from fbhistory import RenderHistory
+from fbindex import ScanIndex
+from fbprobe import MediaProbe
+from fbverify import Verifier
+from fbjobs import COMPLETE
+from fbpipeline import RenderPipeline
+from fbshard import ShardManager
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_RESOLVE = 3
+
+
+def emit(stream, event, **fields):
+    """
+    Write one progress event as a JSON line.
+    :param stream: file object, stdout.
+    :param event: event name.
+    :param fields: event data.
+    :return: none
+    """
+    fields['event'] = event
+    stream.write(json.dumps(fields, sort_keys=True) + '\n')
+    stream.flush()
+
+
+def match_folders(names, patterns):
+    """
+    :param names: source folder names.
+    :param patterns: shell style globs, all folders if empty.
+    :return: the names matching any pattern, in the order of names.
+    """
+    if not patterns:
+        return list(names)
+    return [name for name in names if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+
+def preset_output_path(output_path, presetname, presets):
+    """
+    With more than one preset, every preset renders into its own sub folder, so the deliverables don't overwrite
+    each other.
+    :return: render target folder for the preset.
+    """
+    if len(presets) == 1:
+        return output_path
+    return os.path.join(output_path, presetname)
+
+
+def folder_deadline(folder, deadlines):
+    """
+    :param folder: source folder name.
+    :param deadlines: list of (shell style glob, Unix timestamp).
+    :return: the deadline of the first glob matching the folder, None if none does.
+    """
+    for pattern, deadline in deadlines:
+        if fnmatch.fnmatchcase(folder, pattern):
+            return deadline
+    return None
+
+
+def queue_folders(session, watch_path, folders, presets, output_path, stream, shards=None, deadlines=()):
+    """
+    Import every folder once and add one render job per preset for its timeline. In incremental mode, the timeline
+    holds the clips that are stale in the output path of any preset.
+    :param shards: fbshard.ShardManager to spread the folders over projects, if None, all go to the current one.
+    :param deadlines: list of (glob, Unix timestamp), the deadline of the jobs of the folders matching the glob.
+    :return: number of folders that failed to import or queue.
+    """
+    importer = shards or session
+    failures = 0
+    preset_outputs = [preset_output_path(output_path, presetname, presets) for presetname in presets]
+    for folder in folders:
+        if session.preserve_levels is not None and not any(
+                session.stale_clips(watch_path, folder, preset_output) for preset_output in preset_outputs):
+            emit(stream, 'skipped', folder=folder, message='every clip is rendered already')
+            continue
+        emit(stream, 'import', folder=folder)
+        for preset_output in preset_outputs:
+            os.makedirs(preset_output, exist_ok=True)
+        prepared = importer.prepare(watch_path, folder, preset_outputs[0], output_paths=preset_outputs)
+        if prepared is None:
+            emit(stream, 'error', folder=folder, message='failed to import')
+            failures += 1
+            continue
+        queued = 0
+        for presetname, preset_output in zip(presets, preset_outputs):
+            # same timeline, only the preset and the target change
+            idx = session.queue_prepared(prepared, presetname, preset_output)
+            if idx:
+                queued += 1
+                # with shards, session.jobs is the registry of the shard the job went to
+                session.jobs.get(idx).deadline = folder_deadline(folder, deadlines)
+                if shards:
+                    # job indexes are per project
+                    emit(stream, 'queued', folder=folder, preset=presetname, job=idx, project=shards.current.name)
+                else:
+                    emit(stream, 'queued', folder=folder, preset=presetname, job=idx)
+            else:
+                emit(stream, 'error', folder=folder, preset=presetname, message='failed to queue')
+        if queued < len(presets):
+            failures += 1
+    return failures
+
+
+def status_emitter(session, stream):
+    """
+    :return: render status poller subscriber that emits a status event per job that changed.
+    """
+    def on_status(changes, statuses):
+        for k in sorted(changes):
+            status = changes[k]
+            if status:
+                eta = session.eta(k, status)
+                emit(stream, 'status', job=k, status=status.get('JobStatus'),
+                     percent=status.get('CompletionPercentage', 0), eta=None if eta is None else round(eta, 1))
+    return on_status
+
+
+def count_finished(owner, started):
+    """
+    :param owner: session or shard, whose registry the jobs are in.
+    :return: (complete, failed) counts of the started jobs.
+    """
+    done = sum(1 for k in started if owner.jobs.get(k) and owner.jobs.get(k).state == COMPLETE)
+    return done, len(started) - done
+
+
+def render(session, stream, shards=None):
+    """
+    Render all queued jobs and wait for them.
+    :param shards: fbshard.ShardManager, if given, its shards are rendered one project after the other.
+    :return: (complete, failed) job counts.
+    """
+    on_status = status_emitter(session, stream)
+    if shards:
+        rendered = shards.render([on_status])
+    else:
+        started = session.start_rendering()
+        if started:
+            session.status_poller(started, [on_status]).run()
+        rendered = [(session, started)]
+    complete = failed = 0
+    for owner, started in rendered:
+        # a shard and the session both carry the registry the jobs are in
+        done, not_done = count_finished(owner, started)
+        complete += done
+        failed += not_done
+    return complete, failed
+
+
+def run_pipeline(session, watch_path, folders, presets, output_path, stream, deadlines=()):
+    """
+    Import the folders while the ones before them render, see fbpipeline.
+    :param deadlines: list of (glob, Unix timestamp), the deadline of the jobs of the folders matching the glob.
+    :return: (number of folders that failed to queue, complete, failed) job counts.
+    """
+    targets = []
+    for presetname in presets:
+        targets.append((presetname, preset_output_path(output_path, presetname, presets)))
+        os.makedirs(targets[-1][1], exist_ok=True)
+    pipeline = RenderPipeline(session, watch_path, targets, [status_emitter(session, stream)])
+    for folder in folders:
+        pipeline.add(folder, deadline=folder_deadline(folder, deadlines))
+    pipeline.close()
+    started = pipeline.run()
+    for folder in pipeline.failed:
+        emit(stream, 'error', folder=folder, message='failed to queue')
+    return (len(pipeline.failed),) + count_finished(session, started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import, queue and render source folders with Resolve, no GUI.')
+    parser.add_argument('watch_path', help='folder the source folders are in')
+    parser.add_argument('folders', nargs='*', metavar='GLOB',
+                        help='source folder names or shell globs, all folders in the watch path if none')
+    parser.add_argument('--preset', action='append', required=True,
+                        help='render preset, repeat for more than one, each gets a sub folder of the output path')
+    parser.add_argument('--output', required=True, help='render target folder')
+    parser.add_argument('--copy-xml', action='store_true', help='copy xml sidecars next to the renders')
+    parser.add_argument('--max-clips', type=int, default=0,
+                        help='spread the folders over new projects of at most this many clips each, 0 to use the '
+                             'current project')
+    parser.add_argument('--max-bins', type=int, default=500,
+                        help='bins per project when --max-clips is set (default 500)')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record Resolve API call latencies and write them to FILE, Prometheus text format if it '
+                             'ends with .prom, JSON otherwise')
+    parser.add_argument('--incremental', type=int, metavar='LEVELS',
+                        help="only render the clips without an up to date render in the output path, LEVELS is the "
+                             "presets' 'Preserve source directory levels'")
+    parser.add_argument('--order', choices=ORDERS, default='fifo',
+                        help='render order: fifo as queued, sjf shortest job first by the render history, or '
+                             'deadline earliest --deadline first (default fifo)')
+    parser.add_argument('--deadline', action='append', default=[], metavar='GLOB=TIME',
+                        help="deadline of the folders matching GLOB, 'YYYY-MM-DD HH:MM' or 'HH:MM', repeatable")
+    parser.add_argument('--pipeline', action='store_true',
+                        help='import the next folders while the ones before render, rendering starts with the first '
+                             'folder, not after the last one')
+    parser.add_argument('--verify', action='store_true',
+                        help='check every completed job has a whole render of each clip, and write checksums of the '
+                             'renders into the output path')
+    parser.add_argument('--action', action='append', default=[], choices=ACTIONS,
+                        help='run after each job completes, repeatable, in order: copy the xml sidecars, write a '
+                             'manifest, move the renders to --delivery, notify --notify-url')
+    parser.add_argument('--delivery', metavar='PATH', help='folder the move action moves the renders to')
+    parser.add_argument('--notify-url', metavar='URL',
+                        help='webhook the notify action posts to, Slack incoming webhook format, printed if not set')
+    parser.add_argument('--queue-only', action='store_true', help='add the render jobs but do not start rendering')
+    args = parser.parse_args(argv)
+    stream = sys.stdout
+    start = time.perf_counter()
+    fbmetrics.enable(bool(args.metrics))
+    if 'move' in args.action and not args.delivery:
+        parser.error('the move action needs --delivery')
+    if 'move' in args.action and args.incremental is not None:
+        parser.error('the move action takes the renders --incremental compares against, use one or the other')
+
+    if args.pipeline and (args.max_clips > 0 or args.queue_only):
+        emit(stream, 'error', message='--pipeline renders in the current project, without --max-clips or --queue-only')
+        return EXIT_USAGE
+    deadlines = []
+    for text in args.deadline:
+        pattern, _, when = text.partition('=')
+        try:
+            deadlines.append((pattern, parse_deadline(when.strip())))
+        except ValueError:
+            emit(stream, 'error', message=f'bad deadline {text!r}, use GLOB=YYYY-MM-DD HH:MM or GLOB=HH:MM')
+            return EXIT_USAGE
+
+    watch_path = os.path.abspath(args.watch_path)
+    output_path = os.path.abspath(args.output)
+    if not os.path.isdir(watch_path):
+        emit(stream, 'error', message=f'watch path not found: {watch_path}')
+        return EXIT_USAGE
+
+    # the engine prints its own messages, keep stdout for the JSON lines
+    with contextlib.redirect_stdout(sys.stderr):
+        db_path = fbcore.default_db_path()
+        session = fbcore.connect(scan_index=ScanIndex(db_path),
+                                 probe=MediaProbe(db_path),
+                                 dedup=DedupIndex(db_path),
+                                 history=RenderHistory(db_path),
+                                 notify=lambda message, title=None: emit(stream, 'error', message=message))
+        if not session:
+            emit(stream, 'error', message='cannot get Resolve API, is Resolve open and External Scripting "Local"?')
+            return EXIT_NO_RESOLVE
+
+        folders = match_folders(session.source_folders(watch_path), args.folders)
+        if not folders:
+            emit(stream, 'error', message='no source folder matched')
+            return EXIT_USAGE
+        missing = [name for name in args.preset if name not in session.render_presets()]
+        if missing:
+            emit(stream, 'error', message='unknown render preset: ' + ', '.join(missing))
+            return EXIT_USAGE
+        if session.is_rendering():
+            emit(stream, 'error', message='Resolve is rendering already')
+            return EXIT_FAILED
+
+        session.copy_xml_flag = args.copy_xml
+        session.preserve_levels = args.incremental
+        session.render_order = args.order
+        verify_failures = []
+        if args.verify:
+            def on_report(report):
+                if report.missing or report.bad:
+                    verify_failures.append(report)
+                emit(stream, 'verified', job=report.job.idx, folder=report.job.source, expected=report.expected,
+                     verified=len(report.outputs), missing=report.missing, bad=[path for path, _ in report.bad],
+                     manifest=report.manifest)
+            session.verifier = Verifier(on_report=on_report)
+        session.actions.actions = args.action
+        session.actions.delivery_path = args.delivery and os.path.abspath(args.delivery)
+        session.actions.notify_url = args.notify_url
+        session.actions.on_report = lambda report: emit(stream, 'action', job=report.job.idx, folder=report.job.source,
+                                                        action=report.action, ok=report.ok, message=report.message)
+        emit(stream, 'start', folders=folders, presets=args.preset, output=output_path)
+        complete = failed = 0
+        if args.pipeline:
+            failures, complete, failed = run_pipeline(session, watch_path, folders, args.preset, output_path, stream,
+                                                      deadlines)
+        else:
+            shards = ShardManager(session, args.max_clips, args.max_bins) if args.max_clips > 0 else None
+            failures = queue_folders(session, watch_path, folders, args.preset, output_path, stream, shards,
+                                     deadlines)
+            if shards:
+                emit(stream, 'shards', projects=[shard.name for shard in shards.shards])
+            if not args.queue_only:
+                complete, failed = render(session, stream, shards)
+        if session.verifier is not None:
+            session.verifier.wait()
+            session.verifier.close()
+        session.actions.wait()
+        session.actions.close()
+
+    if args.metrics:
+        fbmetrics.write(args.metrics)
+    emit(stream, 'done', folders=len(folders), folder_failures=failures, complete=complete, failed=failed,
+         unverified=len(verify_failures), action_failures=len(session.actions.failures),
+         seconds=round(time.perf_counter() - start, 3))
+    return EXIT_FAILED if failures or failed or verify_failures or session.actions.failures else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Config store, config.yaml is loaded once and written back behind the GUI's back.
+
+Changes are merged in memory and written after a quiet period, so typing a path does not dump the file on every
+keystroke. Writes go to a temp file that is renamed over config.yaml, a crash never leaves a half-written config.
+Pending changes are flushed at exit.
+"""
+import atexit
+import os
+import tempfile
+import threading
+
+import yaml
+
+
+def yaml_load(filepath):
+    """
+    Load data from yaml file.
+    :param filepath: the yaml file path.
+    :return: yaml data, if failed to load will return empty dictionary.
+    """
+    try:
+        with open(filepath, 'r') as filehandle:
+            data = yaml.load(filehandle, Loader=yaml.SafeLoader)
+    except (OSError, yaml.YAMLError):
+        data = {}
+    return data if isinstance(data, dict) else {}
+
+
+def yaml_dump(data, filepath):
+    """
+    Write data to a yaml file atomically, through a temp file in the same folder and a rename.
+    :param data: dictionary to dump.
+    :param filepath: the yaml file path.
+    :return: none
+    """
+    fd, temp_path = tempfile.mkstemp(prefix='.config-', suffix='.yaml', dir=os.path.dirname(filepath) or '.')
+    try:
+        with os.fdopen(fd, 'w') as filehandle:
+            yaml.dump(data, filehandle)
+            filehandle.flush()
+            os.fsync(filehandle.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ConfigStore:
+    """
+    :param filepath: the yaml file path.
+    :param delay: seconds without changes before the file is written.
+    """
+
+    def __init__(self, filepath, delay=1.0):
+        self.filepath = filepath
+        self.delay = delay
+        self.data = yaml_load(filepath)
+        self.writes = 0
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, changes):
+        """
+        Merge changes in memory and schedule a write.
+        :param changes: dictionary of config keys and values.
+        :return: none
+        """
+        with self._lock:
+            changed = {key: value for key, value in changes.items() if self.data.get(key) != value}
+            if not changed:
+                return
+            self.data.update(changed)
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """
+        Write pending changes now.
+        :return: none
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                yaml_dump(self.data, self.filepath)
+            except (OSError, yaml.YAMLError) as e:
+                print(f'Failed to write {self.filepath}: {e}')
+                return
+            self._dirty = False
+            self.writes += 1
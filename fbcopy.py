@@ -0,0 +1,144 @@
+"""
+Sidecar copy engine, copies the xml/aaf/edl files of a source folder next to its renders.
+
+Destination folders are created once each, unchanged files are skipped by size and mtime, and the copies run in
+a thread pool, because on network shares most of the time is spent waiting on the server.
+"""
+import errno
+import os
+import shutil
+import time
+from collections import namedtuple
+
+SIDECAR_EXTENSIONS = ('.xml', '.fcpxml', '.aaf', '.edl')
+
+# FAT/exFAT camera media only store mtime with 2 second precision.
+MTIME_TOLERANCE = 2.0
+
+# copy_file_range errors that mean 'not supported here', the copy falls back to shutil.
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.EOPNOTSUPP,
+                    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)}
+
+
+class CopyReport(namedtuple('CopyReport', ['copied', 'skipped', 'failed', 'bytes', 'seconds'])):
+    """
+    Result of copy_sidecars. failed is a list of (source path, error message) tuples.
+    """
+    __slots__ = ()
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+def find_sidecars(source_path, extensions=SIDECAR_EXTENSIONS, walk=os.walk):
+    """
+    List the sidecar files under a folder.
+    :param source_path: folder path in OS.
+    :param extensions: file extensions to pick, lower case.
+    :param walk: os.walk compatible function.
+    :return: list of file paths.
+    """
+    paths = []
+    for rootdir, dirs, files in walk(source_path):
+        for file in files:
+            if file.lower().endswith(extensions):
+                paths.append(os.path.join(rootdir, file))
+    return paths
+
+
+def is_unchanged(src_stat, dst_path):
+    """
+    :return: True if dst_path has the size and mtime of the source, no need to copy again.
+    """
+    try:
+        dst_stat = os.stat(dst_path)
+    except OSError:
+        return False
+    return dst_stat.st_size == src_stat.st_size and abs(dst_stat.st_mtime - src_stat.st_mtime) <= MTIME_TOLERANCE
+
+
+def copy_file(src, dst, src_stat):
+    """
+    Copy file content and mtime.
+    Uses copy_file_range where available, which lets SMB/NFS servers copy without the data crossing the network,
+    otherwise shutil.copyfile, which uses sendfile/fcopyfile on Python 3.8+.
+    """
+    copied = False
+    if hasattr(os, 'copy_file_range'):
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                remaining = src_stat.st_size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                copied = remaining <= 0
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+    if not copied:
+        shutil.copyfile(src, dst)
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+
+def _copy_one(src, dst):
+    """
+    :return: ('copied', bytes), ('skipped', 0) or ('failed', error message).
+    """
+    try:
+        src_stat = os.stat(src)
+        if is_unchanged(src_stat, dst):
+            return 'skipped', 0
+        copy_file(src, dst, src_stat)
+        return 'copied', src_stat.st_size
+    except OSError as e:
+        return 'failed', str(e)
+
+
+def copy_sidecars(watch_path, source, dest, extensions=SIDECAR_EXTENSIONS, workers=8, walk=os.walk):
+    """
+    Copy the files according to file extension, and replicate the folder structure relative to watch_path.
+    Works best in conjunction with the right 'Preserve source directory levels' in Resolve render settings - Files tab.
+    :param watch_path: watch folder path, where source folder is in.
+    :param source: source folder name.
+    :param dest: destination path.
+    :param extensions: file extensions to copy.
+    :param workers: copy threads.
+    :param walk: os.walk compatible function used to list the source folder.
+    :return: CopyReport.
+    """
+    start = time.perf_counter()
+    jobs = []
+    dest_dirs = set()
+    for path in find_sidecars(os.path.join(watch_path, source), extensions, walk):
+        target = os.path.join(dest, os.path.relpath(path, watch_path))
+        jobs.append((path, target))
+        dest_dirs.add(os.path.dirname(target))
+
+    failed = []
+    bad_dirs = set()
+    for dest_dir in sorted(dest_dirs):
+        try:
+            os.makedirs(dest_dir, exist_ok=True)
+        except OSError as e:
+            bad_dirs.add(dest_dir)
+            failed.append((dest_dir, str(e)))
+    jobs = [(src, dst) for src, dst in jobs if os.path.dirname(dst) not in bad_dirs]
+
+    copied = skipped = total_bytes = 0
+    if jobs:
+        # imported here, concurrent.futures pulls in logging and costs more than the rest of fbcore at startup
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = pool.map(lambda job: _copy_one(*job), jobs)
+            for (src, dst), (outcome, value) in zip(jobs, results):
+                if outcome == 'copied':
+                    copied += 1
+                    total_bytes += value
+                elif outcome == 'skipped':
+                    skipped += 1
+                else:
+                    failed.append((src, value))
+    return CopyReport(copied, skipped, failed, total_bytes, time.perf_counter() - start)
@@ -0,0 +1,683 @@
+"""
+FootBrake core, the import/timeline/render engine without the GUI.
+
+Importing this module has no side effects: it does not talk to Resolve or load PySimpleGUI. connect() imports
+Resolve's scripting module and opens a Session, the GUI, the watch folder daemon and other tools drive Resolve through
+the Session's methods. Session(resolve) also accepts any object with the Resolve API, e.g. fakeresolve.FakeResolve.
+
+    import fbcore
+    session = fbcore.connect()
+    session.import_and_queue('/Volumes/Cards', 'A001', 'ProRes 422 Proxy', '/Volumes/Proxies')
+    session.start_rendering()
+"""
+import contextlib
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+import fbmetrics
+from fbactions import ActionBus
+from fbcopy import copy_sidecars
+from fbdedup import find_timeline
+from fbeta import batch_remaining_seconds, format_eta, order_jobs, remaining_seconds
+from fbimport import mp_add_source
+from fbincremental import Manifest, stale_clips
+from fbjobs import JobRegistry, COMPLETE, FAILED, RENDERING
+from fbmetrics import operation
+from fbpresets import PresetCatalogue
+from fbserial import serialize
+from fbtimeline import make_timeline_with_folder
+from renderpoll import RenderStatusPoller
+
+# A source folder imported into a timeline, waiting for its render job, see Session.prepare.
+# size: (clips, bytes of the source files), stale: the clips of an incremental import, None for a whole folder.
+PreparedTimeline = namedtuple('PreparedTimeline', ['watch_path', 'source', 'timeline', 'size', 'stale'])
+
+# name -> seconds of the startup steps wrapped in timed(), printed by footbrake.py --startup-time.
+timings = {}
+
+# the scan index, media probe cache, dedup index and render history, shared by the GUI and the command line tools
+DB_NAME = 'footbrake.db'
+
+
+def default_db_path():
+    """
+    :return: path of footbrake.db, next to the scripts, like config.yaml.
+    """
+    return os.path.join(os.path.split(os.path.abspath(__file__))[0], DB_NAME)
+
+
+@contextlib.contextmanager
+def timed(name):
+    """
+    Record how long the block takes in timings[name].
+    :param name: step name, e.g. 'resolve' or 'gui import'.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def connect(get_resolve=None, **kwargs):
+    """
+    Connect to Resolve and open a session, Resolve's scripting module is only imported here.
+    :param get_resolve: function returning the Resolve object, defaults to python_get_resolve.GetResolve.
+    :param kwargs: passed on to Session.
+    :return: Session, None if Resolve is not reachable.
+    """
+    with timed('resolve'):
+        if get_resolve is None:
+            from python_get_resolve import GetResolve as get_resolve
+        resolve = get_resolve()
+    if not resolve:
+        return None
+    return Session(resolve, **kwargs)
+
+
+def status_row(status, eta=None):
+    """
+    Format a render job status for the status table.
+    :param status: status dictionary from the render status poller.
+    :param eta: remaining seconds, see Session.eta, None if unknown.
+    :return: a list, the order corresponds to the 'headings' list.
+    """
+    return [
+        str(status.get('Idx', 'Unknown')), status.get('Name'),
+        status.get('JobStatus'), status.get('CompletionPercentage', 'NA'),
+        str(datetime.timedelta(milliseconds=status.get('TimeTakenToRenderInMs', 0))).split('.', 2)[0],
+        format_eta(eta)
+    ]
+
+
+def valid_video_track_count(timeline):
+    """
+    Count non-empty video tracks in current Resolve timeline.
+    :param timeline: Resolve timeline object.
+    :return: integer
+    """
+    i = 0
+    for track in range(1, int(timeline.GetTrackCount('video')) + 1):
+        if timeline.GetItemsInTrack('video', track):
+            i += 1
+    return i
+
+
+class Session:
+    """
+    Resolve handles and the render jobs added through them.
+    :param resolve: Resolve object from the scripting API.
+    :param scan_index: fbindex.ScanIndex to list the watch path with, if None, the file system is listed every time.
+    :param extra_builtins: preset names to treat as built-in, see fbpresets.PresetCatalogue.
+    :param notify: function(message, title=None) telling the user about failures, print by default.
+    :param probe: fbprobe.MediaProbe, only the files it finds media in are imported. If None, all files are.
+    :param dedup: fbdedup.DedupIndex, a folder queued again unchanged renders its earlier timeline instead of being
+        imported again. If None, every queue imports.
+    :param history: fbhistory.RenderHistory the finished jobs are recorded in, the ETAs and the render order are
+        estimated from it. If None, ETAs are only known once a job is rendering.
+    :param host: name the jobs are recorded under in the render history, defaults to this machine's host name.
+    With fbmetrics enabled, the Resolve handles are instrumented, and the API calls recorded per operation. The
+    handles are serialized, see fbserial, the session is used from the poller, the pipeline and the GUI threads.
+    """
+
+    def __init__(self, resolve, scan_index=None, extra_builtins=(), notify=None, probe=None, dedup=None,
+                 history=None, host=None):
+        # one Resolve API call at a time
+        self.api_lock = threading.RLock()
+        # held around the call sequences that depend on the current project or timeline: making a timeline, which
+        # makes it the current one, adding a render job for it, starting the renders. Not around the import itself,
+        # so a render job is never added to a timeline another thread is building, and never waits for an import
+        self.lock = threading.RLock()
+        self.resolve = serialize(fbmetrics.instrument(resolve, 'Resolve'), self.api_lock)
+        self.pm = self.resolve.GetProjectManager()
+        self.proj = self.pm.GetCurrentProject()
+        self.mp = self.proj.GetMediaPool()
+        self.ms = self.resolve.GetMediaStorage()
+        self.scan_index = scan_index
+        self.probe = probe
+        self.dedup = dedup
+        self.history = history
+        self.host = host or socket.gethostname()
+        # render order of start_rendering, one of fbeta.ORDERS
+        self.render_order = 'fifo'
+        # timeline made by the last import, and its (clips, bytes of the source files)
+        self.timeline = None
+        self.timeline_size = (0, 0)
+        self.presets = PresetCatalogue(extra_builtins)
+        # Every render job footbrake added, with its source and output paths and state.
+        self.jobs = JobRegistry()
+        self.notify = notify or (lambda message, title=None: print(message))
+        # copy the xml sidecars of a job to its output path as soon as it completes, the 'copy' action
+        self.copy_xml_flag = False
+        # fbactions.ActionBus, runs the post-render actions of the jobs that complete, set its actions to use it
+        self.actions = ActionBus(self)
+        # 'Preserve source directory levels' of the render presets, if set, only the clips that have no render in the
+        # output path yet, or changed since, are imported, see fbincremental. None renders whole folders.
+        self.preserve_levels = None
+        # fbverify.Verifier the outputs of the completed jobs are checked by, None to trust them
+        self.verifier = None
+        # fbjobs.Job -> Future of its verification, the job's actions wait for it
+        self._verifying = {}
+        # held by the subscribers that hand a finished job on once, a stopped pipeline's poller may still be in its
+        # last tick when the next one starts
+        self._finished_lock = threading.Lock()
+        # output path -> fbincremental.Manifest
+        self._manifests = {}
+        # fbjobs.Job -> (Manifest, {clip path: (size, mtime_ns)}), recorded in the manifest when the job completes,
+        # keyed by the job and not its index, the indexes of the shards' projects overlap
+        self._incremental_jobs = {}
+
+    @property
+    def walk(self):
+        return self.scan_index.walk if self.scan_index else os.walk
+
+    def refresh_project(self):
+        """
+        Pick up the project that is open in Resolve now.
+        :return: none
+        """
+        self.proj = self.pm.GetCurrentProject()
+        self.mp = self.proj.GetMediaPool()
+
+    def new_project(self):
+        """
+        Create a new project named '%timestamp%_Transcode' and switch to it.
+        :return: none
+        """
+        self.proj = self.pm.CreateProject(f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + 'Transcode')
+        self.mp = self.proj.GetMediaPool()
+
+    def is_rendering(self):
+        """
+        :return: True if Resolve is rendering. Creates a new project first if the current one was closed.
+        """
+        try:
+            self.proj.IsRenderingInProgress()
+        except TypeError:
+            # Needed to check if 'proj' is accessible before checking rendering is in progress,
+            # otherwise Resolve will raise an error
+            self.new_project()
+        return self.proj.IsRenderingInProgress()
+
+    def source_folders(self, watch_path):
+        """
+        :param watch_path: the path of watch folder.
+        :return: names of the source folders in the watch path, hidden ones left out.
+        """
+        if self.scan_index:
+            names = self.scan_index.subdirs(watch_path)
+        else:
+            names = sorted(entry.name for entry in os.scandir(watch_path) if entry.is_dir())
+        return [name for name in names if not name.startswith('.')]
+
+    def render_presets(self, custom_only=False, refresh=False):
+        """
+        Get render presets from the preset catalogue, it only asks Resolve again when the project changed.
+        :param custom_only: if True, leave out Resolve's built-in presets.
+        :param refresh: if True, fetch the presets from Resolve again.
+        :return: list of preset names.
+        """
+        return self.presets.names(self.proj, custom_only, refresh)
+
+    def import_timeline(self, watch_path, folder_name, only=None):
+        """
+        Import footage and make timeline. Resolve imports while it renders, only making the timeline, which makes it
+        the current one, holds Session.lock.
+        :param watch_path: the path of watch folder.
+        :param folder_name: source folder name.
+        :param only: collection of the file paths to import, e.g. from stale_clips. If None, all the media is.
+        :return: (timeline object, None if it could not be created, (clips, bytes of their source files)), None if
+            failed to create the bin. Read the timeline from here, not self.timeline, another thread may have set
+            another one current since.
+        """
+        with operation('import'):
+            # Add empty folder(bin) in Resolve media pool
+            imported_mp_folder = self.mp.AddSubFolder(self.mp.GetRootFolder(),
+                                                      f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + folder_name)
+            if not imported_mp_folder:
+                return None
+            if only is not None:
+                file_filter = lambda paths: [path for path in paths if path in only]
+            else:
+                file_filter = self.probe.filter if self.probe else None
+            report = mp_add_source(os.path.join(watch_path, folder_name), 1, self.mp, self.ms, imported_mp_folder,
+                                   walk=self.walk, file_filter=file_filter)
+        print(f'Imported {report.files - report.skipped} files into {report.bins + 1} bins, '
+              f'{report.api_calls} Resolve API calls, {report.skipped} '
+              + ('non-media or rendered files skipped.' if only is not None else 'non-media files skipped.'))
+        with operation('timeline'), self.lock:
+            timeline = make_timeline_with_folder(imported_mp_folder, '', 0, self.mp, report.bin_clips)
+            self.timeline, self.timeline_size = timeline, (report.clips, report.bytes)
+        return timeline, (report.clips, report.bytes)
+
+    def reuse_timeline(self, fingerprint, watch_path, source_folder):
+        """
+        Make the timeline of an earlier import of the same files the current one.
+        :param fingerprint: the source folder's fingerprint, see fbdedup.
+        :param watch_path: the path of watch folder.
+        :param source_folder: source folder name.
+        :return: the timeline, if it is found in the current project and set current, otherwise None.
+        """
+        found = self.dedup.lookup(fingerprint, os.path.join(watch_path, source_folder))
+        if not found:
+            return None
+        project, bin_name, timeline_name = found
+        if project != self.proj.GetName():
+            # imported in another project, import again into this one
+            return None
+        timeline = find_timeline(self.proj, timeline_name)
+        with self.lock:
+            if not timeline or not self.proj.SetCurrentTimeline(timeline):
+                # deleted in Resolve since
+                self.dedup.forget(fingerprint)
+                return None
+            self.timeline, self.timeline_size = timeline, (0, 0)
+        print(f'{source_folder}: unchanged since it was imported, queueing timeline {timeline_name} again.')
+        return timeline
+
+    def manifest(self, output_path):
+        """
+        :param output_path: render target folder.
+        :return: fbincremental.Manifest of the output path, loaded once per session.
+        """
+        manifest = self._manifests.get(output_path)
+        if manifest is None:
+            manifest = self._manifests[output_path] = Manifest(output_path)
+        return manifest
+
+    def stale_clips(self, watch_path, source_folder, output_path):
+        """
+        Incremental mode, find the clips of a source folder that need rendering, see fbincremental.stale_clips.
+        :param watch_path: the path of watch folder.
+        :param source_folder: source folder name.
+        :param output_path: render target folder.
+        :return: dictionary of clip path -> (size, mtime_ns), empty if every clip is rendered already.
+        """
+        paths = self.media_files(watch_path, source_folder)
+        return stale_clips(paths, output_path, self.preserve_levels, self.manifest(output_path))
+
+    def media_files(self, watch_path, source_folder):
+        """
+        :param watch_path: the path of watch folder.
+        :param source_folder: source folder name.
+        :return: paths of the files in the source folder an import takes, the media ones if there is a probe.
+        """
+        paths = [os.path.join(root, name)
+                 for root, dirs, files in self.walk(os.path.join(watch_path, source_folder)) for name in files]
+        return self.probe.filter(paths) if self.probe else paths
+
+    def set_output_path(self, output_path):
+        """
+        Submit the output path to Resolve.
+        :param output_path: render target folder.
+        :return: none
+        """
+        if self.proj.IsRenderingInProgress():
+            self.notify('Rendering in progres,try later.')
+        else:
+            self.proj.SetRenderSettings({'TargetDir': output_path})
+
+    def get_newest_renderjob_index(self):
+        """
+        Get the index of the newest job in Resolve's render queue.
+        :return: the index number in integer, None if failed to get any job info.
+        """
+        idx, render_job = self.get_newest_renderjob()
+        return idx
+
+    def get_newest_renderjob(self):
+        """
+        :return: (index, job info dictionary) of the newest job in Resolve's render queue, (None, None) if there is
+            none.
+        """
+        render_jobs = self.proj.GetRenderJobs()
+        if render_jobs:
+            k = max(render_jobs, key=int)
+            return int(k), render_jobs[k]
+        return None, None
+
+    def queue_render(self, presetname, source_folder, output_path, watch_path):
+        """
+        Add a render job for the current timeline.
+        :param presetname: the render preset to use for this job
+        :param source_folder: the source folder name for this job, kept in the job registry for the xml copy
+        :param output_path: render target folder.
+        :param watch_path: the watch folder the source folder is in.
+        :return: the new job index, None if failed.
+        """
+        with operation('queue'):
+            self.proj.LoadRenderPreset(presetname)
+            if int(valid_video_track_count(self.proj.GetCurrentTimeline())) != 0:
+                self.set_output_path(output_path)
+                self.proj.AddRenderJob()
+                new_job_idx, render_job = self.get_newest_renderjob()
+                if new_job_idx:
+                    job = self.jobs.add(new_job_idx, watch_path, source_folder, output_path, presetname)
+                    job.clips, job.bytes = self.timeline_size
+                    try:
+                        job.frames = int(render_job['MarkOut']) - int(render_job['MarkIn']) + 1
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                    return new_job_idx
+                self.notify('Failed to add render job, check Resolve.')
+            else:
+                self.notify('Failed to add render job, empty folder?')
+        return None
+
+    def prepare(self, watch_path, source_folder, output_path, allow_new_project=True, output_paths=None):
+        """
+        Import a source folder into a timeline, or find the timeline of an earlier import of the same files, the first
+        half of import_and_queue. Adds no render job, so it works while Resolve is rendering. Session.lock is only held
+        while the timeline is made or set current, the render jobs of other timelines can be added during the import.
+        :param watch_path: the path of watch folder.
+        :param source_folder: source folder name.
+        :param output_path: render target folder.
+        :param allow_new_project: if True, a failed import is tried again in a new project, unless Resolve is
+            rendering, the render is in the current project.
+        :param output_paths: incremental mode, every render target folder the timeline is rendered to, e.g. one per
+            preset. The clips that are stale in any of them are imported. Defaults to output_path only.
+        :return: PreparedTimeline, None if there is nothing to render.
+        """
+        # Avoid overwriting.
+        if output_path == os.path.join(watch_path, source_folder):
+            self.notify('Output path is same to the source path for:\n\n' + output_path,
+                        title='Overwriting is no fun!')
+            return None
+        stale = None
+        fingerprint = None
+        if self.preserve_levels is not None:
+            # incremental, only the clips without an up to date render. Not deduplicated, the timeline depends on
+            # the renders already in the output path.
+            stale = {}
+            for path in output_paths or [output_path]:
+                stale.update(self.stale_clips(watch_path, source_folder, path))
+            if not stale:
+                print(f'{source_folder}: every clip is rendered in {output_path} already, nothing to queue.')
+                return None
+            print(f'{source_folder}: {len(stale)} new or changed clips to render.')
+        elif self.dedup:
+            fingerprint = self.dedup.fingerprint(os.path.join(watch_path, source_folder), self.walk)
+            timeline = self.reuse_timeline(fingerprint, watch_path, source_folder)
+            if timeline:
+                return PreparedTimeline(watch_path, source_folder, timeline, (0, 0), None)
+        # Try to import timeline, if Resolve project is switched or closed, will get None,
+        # then create a new project named '%timestamp%_Transcode'.
+        imported = self.import_timeline(watch_path, source_folder, only=stale)
+        if imported is None and allow_new_project:
+            with self.lock:
+                # decided inside the lock, a pipeline cannot start a render in between
+                switch = not self.is_rendering()
+                if switch:
+                    self.new_project()
+            if switch:
+                imported = self.import_timeline(watch_path, source_folder, only=stale)
+        timeline, size = imported or (None, (0, 0))
+        if fingerprint and timeline:
+            # the timeline is named after its bin
+            timeline_name = timeline.GetName()
+            self.dedup.record(fingerprint, os.path.join(watch_path, source_folder), self.proj.GetName(),
+                              timeline_name, timeline_name)
+        return PreparedTimeline(watch_path, source_folder, timeline, size, stale)
+
+    def queue_prepared(self, prepared, presetname, output_path):
+        """
+        Add the render job of a prepared timeline, the second half of import_and_queue. Holds Session.lock, the job
+        is added for the current timeline.
+        :param prepared: PreparedTimeline from prepare().
+        :param presetname: render preset name.
+        :param output_path: render target folder.
+        :return: the new job index, None if failed.
+        """
+        if prepared.timeline is None:
+            # the import failed, the current timeline is another folder's
+            return None
+        with self.lock:
+            if prepared.timeline != self.timeline:
+                # more timelines were made since, e.g. by a pipeline importing ahead
+                self.proj.SetCurrentTimeline(prepared.timeline)
+                self.timeline = prepared.timeline
+            self.timeline_size = prepared.size
+            idx = self.queue_render(presetname, prepared.source, output_path, prepared.watch_path)
+        if idx and prepared.stale is not None:
+            job = self.jobs.get(idx)
+            job.sources = list(prepared.stale)
+            self._incremental_jobs[job] = (self.manifest(output_path), prepared.stale)
+        return idx
+
+    def import_and_queue(self, watch_path, source_folder, presetname, output_path):
+        """
+        Import a source folder into a timeline and add its render job.
+        :param watch_path: the path of watch folder.
+        :param source_folder: source folder name.
+        :param presetname: render preset name.
+        :param output_path: render target folder.
+        :return: the new job index, None if nothing was queued.
+        """
+        prepared = self.prepare(watch_path, source_folder, output_path)
+        if prepared is None:
+            return None
+        return self.queue_prepared(prepared, presetname, output_path)
+
+    def start_rendering(self):
+        """
+        Hand the queued jobs to Resolve's renderer, in the render order.
+        :return: list of the job indexes started, empty if there were none.
+        """
+        with self.lock:
+            pending = [self.jobs.get(k) for k in self.jobs.pending_ids()]
+            pending_ids = [job.idx for job in order_jobs(pending, self.render_order, self.history)]
+            if pending_ids:
+                self.proj.StartRendering(pending_ids)
+                self.jobs.start(pending_ids)
+            return pending_ids
+
+    def render_status(self):
+        """
+        Fetch the status of all the jobs once.
+        :return: dictionary of job index -> status.
+        """
+        poller = RenderStatusPoller(self.proj, self.jobs.ids())
+        poller.poll_once()
+        return poller.statuses
+
+    def eta(self, k, status=None):
+        """
+        :param k: job index.
+        :param status: the job's latest status, if known.
+        :return: seconds until the job is rendered, None if unknown.
+        """
+        job = self.jobs.get(k)
+        return remaining_seconds(job, status, self.history) if job else None
+
+    def batch_eta(self, statuses):
+        """
+        :param statuses: dictionary of job index -> latest status.
+        :return: (seconds until every job is rendered, number of jobs without an estimate).
+        """
+        return batch_remaining_seconds([self.jobs.get(k) for k in self.jobs.ids()], statuses, self.history)
+
+    def status_poller(self, job_ids=None, subscribers=()):
+        """
+        Render status poller that keeps the job registry up to date and runs the post-render actions of the jobs
+        that complete.
+        :param job_ids: jobs to follow, all of them if None.
+        :param subscribers: more callbacks(changes, statuses), called after the registry is updated.
+        :return: RenderStatusPoller, not started yet.
+        """
+        poller = RenderStatusPoller(self.proj, self.jobs.ids() if job_ids is None else job_ids)
+        poller.subscribe(self.track_job_status)
+        poller.subscribe(self.record_history)
+        for callback in subscribers:
+            poller.subscribe(callback)
+        poller.subscribe(self.verify_completed)
+        # before the actions, which take the job's verification
+        poller.subscribe(self.record_rendered_clips)
+        poller.subscribe(self.run_completed_actions)
+        return poller
+
+    def track_job_status(self, changes, statuses):
+        """
+        Render status poller subscriber, moves the jobs in the registry to their new state.
+        The jobs start_rendering handed over stay RENDERING while they wait for their turn, the ones Resolve did not
+        reach go back to QUEUED once it stopped rendering.
+        :return: none
+        """
+        for k, status in changes.items():
+            self.jobs.update(k, status)
+        waiting = [k for k, status in statuses.items()
+                   if status and status.get('JobStatus') == 'Ready' and k in self.jobs
+                   and self.jobs.get(k).state == RENDERING]
+        if waiting and not self.proj.IsRenderingInProgress():
+            for k in waiting:
+                self.jobs.update(k, statuses[k], rendering=False)
+
+    def record_history(self, changes, statuses):
+        """
+        Render status poller subscriber, records the jobs that just finished in the render history.
+        :return: none
+        """
+        if self.history is None:
+            return
+        with self._finished_lock:
+            for k, status in changes.items():
+                job = self.jobs.get(k)
+                if status and job and job.state in (COMPLETE, FAILED) and not job.recorded:
+                    self.history.record(job.preset, status.get('Name'), job.frames,
+                                        status.get('TimeTakenToRenderInMs', 0), job.state,
+                                        host=self.host, clips=job.clips, bytes=job.bytes)
+                    job.recorded = True
+
+    def post_render_actions(self):
+        """
+        :return: names of the fbactions.ACTIONS the jobs that complete run, 'copy' first if copy_xml_flag is set.
+        """
+        actions = self.actions.actions
+        if self.copy_xml_flag and 'copy' not in actions:
+            actions = ['copy'] + actions
+        return actions
+
+    def run_completed_actions(self, changes, statuses):
+        """
+        Render status poller subscriber, hands the jobs that just completed to the action bus. The actions run in its
+        worker threads, as soon as the job is complete, so don't have to wait for other jobs to finish.
+        :return: none
+        """
+        with self._finished_lock:
+            for k, status in changes.items():
+                job = self.jobs.get(k)
+                if status and job and job.state == COMPLETE and not job.actions_run:
+                    self.actions.submit(job, status, self.post_render_actions(), after=self._verifying.pop(job, None))
+                    job.actions_run = True
+
+    def record_rendered_clips(self, changes, statuses):
+        """
+        Render status poller subscriber, records the clips of the incremental jobs that just completed in the
+        manifest of their output path. With a verifier, only once the job's renders are verified, a job with missing
+        or broken renders is not recorded, so it is rendered again.
+        :return: none
+        """
+        with self._finished_lock:
+            for k in changes:
+                job = self.jobs.get(k)
+                if job in self._incremental_jobs and job.state == COMPLETE:
+                    manifest, clips = self._incremental_jobs.pop(job)
+                    verifying = self._verifying.get(job)
+                    if verifying is None:
+                        self._update_manifest(manifest, clips)
+                    else:
+                        verifying.add_done_callback(lambda future, manifest=manifest, clips=clips:
+                                                    self._record_verified(future, manifest, clips))
+
+    def _record_verified(self, future, manifest, clips):
+        try:
+            verified = future.result()
+        except Exception as e:
+            print(f'{manifest.path} not updated, verification failed: {e}')
+            return
+        if verified.missing or verified.bad:
+            print(f'{manifest.path} not updated, {len(verified.missing)} renders missing, {len(verified.bad)} bad')
+        else:
+            self._update_manifest(manifest, clips)
+
+    @staticmethod
+    def _update_manifest(manifest, clips):
+        try:
+            manifest.update(clips)
+        except OSError as e:
+            print(f'Failed to write {manifest.path}: {e}')
+
+    def verify_completed(self, changes, statuses):
+        """
+        Render status poller subscriber, hands the jobs that just completed to the verifier.
+        :return: none
+        """
+        if self.verifier is None:
+            return
+        with self._finished_lock:
+            for k, status in changes.items():
+                job = self.jobs.get(k)
+                if status and job and job.state == COMPLETE and not job.verified:
+                    sources = job.sources if job.sources is not None else self.media_files(job.watch_path, job.source)
+                    self._verifying[job] = self.verifier.submit(job, status.get('Name'), sources,
+                                                                self.preserve_levels)
+                    job.verified = True
+
+    def copy_xml(self, watch_path, source, dest):
+        """
+        Copy the files according to file extension, and try to replicate the original folder structure.
+        Works best in conjunction with the right 'Preserve source directory levels' in Resolve render settings.
+        :param watch_path:watch folder path, where source folder is in
+        :param source:source folder name
+        :param dest:destination path
+        :return: CopyReport, with the files that failed to copy.
+        """
+        with operation('copy'):
+            report = copy_sidecars(watch_path, source, dest, walk=self.walk)
+        print(f'{source}: copied {report.copied} xml files ({report.mb_per_second:.1f} MB/s), '
+              f'{report.skipped} unchanged, {len(report.failed)} failed.')
+        for path, error in report.failed:
+            print(f'  failed to copy {path}: {error}')
+        return report
+
+
+def print_render_status(changes, statuses):
+    """
+    Render status poller subscriber for the headless mode, prints the jobs that changed.
+    :return: none
+    """
+    for k in sorted(changes):
+        if changes[k]:
+            print('Job ' + ' | '.join(str(column) for column in status_row(changes[k])[:-1]))
+
+
+def watch_daemon(session, watch_path, presetname, output_path, settle):
+    """
+    Headless mode: import every new source folder in the watch path once it stopped changing, also while Resolve
+    renders, and render it as soon as the renderer is free, see fbpipeline. Runs until interrupted.
+    :param session: Session.
+    :param watch_path: the path of watch folder.
+    :param presetname: render preset for every job.
+    :param output_path: render target folder.
+    :param settle: seconds a source folder's size and mtime have to stay the same before it is imported.
+    :return: none
+    """
+    from fbpipeline import RenderPipeline
+    from fbwatch import FolderWatcher
+    watcher = FolderWatcher(watch_path, settle=settle)
+    pipeline = RenderPipeline(session, watch_path, [(presetname, output_path)], [print_render_status])
+    print(f'Watching {watch_path} ({watcher.mode}), preset: {presetname}, output: {output_path}')
+    threading.Thread(target=pipeline.run, daemon=True).start()
+    try:
+        while True:
+            # sleep until a folder is ready
+            for source_folder in watcher.poll(timeout=None):
+                pipeline.add(source_folder)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        watcher.close()
@@ -0,0 +1,129 @@
+"""
+Import dedup.
+
+A source folder is fingerprinted from its path, file list, sizes and mtimes, optionally with a hash of the first and
+last bytes of every file. The path is part of it: the clips of a timeline point at the folder they were imported
+from, a copy of the folder elsewhere, e.g. made with rsync -a, is imported on its own. The fingerprint is stored in
+SQLite with the project, bin and timeline its import produced.
+Queueing the same folder again, e.g. after fixing a preset, finds the timeline and renders it without importing
+every clip a second time. A file added, removed, resized or with a new mtime changes the fingerprint, and the folder is
+imported fresh. A file rewritten with the same size and mtime only does with sample_bytes.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS imports (
+    fingerprint TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    project TEXT NOT NULL,
+    bin TEXT NOT NULL,
+    timeline TEXT NOT NULL,
+    created REAL NOT NULL
+)
+'''
+
+
+def stat_walk(fpath, walk=os.walk):
+    """
+    Like ScanIndex.walk(fpath, stats=True), with a fresh stat per file.
+    :param walk: os.walk compatible function, e.g. ScanIndex.walk, it only lists the files.
+    :return: generator of (root, dirs, list of [file name, size, mtime_ns]).
+    """
+    for root, dirs, files in walk(fpath):
+        stats = []
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            stats.append([name, st.st_size, st.st_mtime_ns])
+        yield root, dirs, stats
+
+
+def folder_fingerprint(fpath, walk=os.walk, sample_bytes=0):
+    """
+    :param fpath: source folder path.
+    :param walk: os.walk compatible function, e.g. ScanIndex.walk. Its sizes and mtimes are not used, a listing is
+        only refreshed when its folder's mtime changes, a file appended to or overwritten in place does not change it.
+        Every file is stat'ed.
+    :param sample_bytes: if not 0, also hash this many bytes from the start and the end of every file, catches files
+        rewritten with the same size and mtime, at the cost of two reads per file.
+    :return: hex digest.
+    """
+    digest = hashlib.sha1(os.path.abspath(fpath).encode() + b'\n')
+    for root, dirs, files in stat_walk(fpath, walk):
+        dirs.sort()
+        for name, size, mtime_ns in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(f'{os.path.relpath(path, fpath)}\0{size}\0{mtime_ns}\n'.encode())
+            if sample_bytes:
+                try:
+                    with open(path, 'rb') as filehandle:
+                        digest.update(filehandle.read(sample_bytes))
+                        if size > sample_bytes:
+                            filehandle.seek(max(sample_bytes, size - sample_bytes))
+                            digest.update(filehandle.read(sample_bytes))
+                except OSError:
+                    continue
+    return digest.hexdigest()
+
+
+def find_timeline(proj, name):
+    """
+    :param proj: project object from Resolve API.
+    :param name: timeline name.
+    :return: the timeline object, None if the project has none of that name.
+    """
+    for index in range(1, int(proj.GetTimelineCount() or 0) + 1):
+        timeline = proj.GetTimelineByIndex(index)
+        if timeline and timeline.GetName() == name:
+            return timeline
+    return None
+
+
+class DedupIndex:
+    """
+    :param db_path: SQLite database file, ':memory:' for a throwaway index.
+    :param sample_bytes: see folder_fingerprint.
+    """
+
+    def __init__(self, db_path=':memory:', sample_bytes=0):
+        self.db_path = db_path
+        self.sample_bytes = sample_bytes
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def fingerprint(self, fpath, walk=os.walk):
+        return folder_fingerprint(fpath, walk, self.sample_bytes)
+
+    def lookup(self, fingerprint, source):
+        """
+        :param fingerprint: the source folder's fingerprint.
+        :param source: the source folder path, an import of the same files from another folder does not count, its
+            clips point at that folder.
+        :return: (project, bin, timeline) names of the import with that fingerprint, None if there is none.
+        """
+        with self._lock:
+            return self._db.execute('SELECT project, bin, timeline FROM imports WHERE fingerprint = ? AND source = ?',
+                                    (fingerprint, source)).fetchone()
+
+    def record(self, fingerprint, source, project, bin, timeline):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?)',
+                             (fingerprint, source, project, bin, timeline, time.time()))
+            self._db.commit()
+
+    def forget(self, fingerprint):
+        with self._lock:
+            self._db.execute('DELETE FROM imports WHERE fingerprint = ?', (fingerprint,))
+            self._db.commit()
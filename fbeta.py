@@ -0,0 +1,127 @@
+"""
+Render time estimates and render order.
+
+A job that is rendering is extrapolated from its own progress, a job still waiting is estimated from the render
+history of its preset, see fbhistory. The pending jobs are handed to StartRendering in the order order_jobs()
+sorts them in:
+
+    fifo        in the order they were queued, what Resolve does by itself
+    sjf         shortest job first, the most deliverables are done early
+    deadline    earliest deadline first, jobs without a deadline after them, shortest first
+"""
+import datetime
+
+from fbjobs import QUEUED, RENDERING
+
+ORDERS = ('fifo', 'sjf', 'deadline')
+
+# sort key for a job nothing is known about, after all the estimated ones
+UNKNOWN = float('inf')
+
+
+def remaining_seconds(job, status, history):
+    """
+    :param job: fbjobs.Job.
+    :param status: the job's status from the render status poller, None if not polled yet.
+    :param history: fbhistory.RenderHistory.
+    :return: seconds until the job is rendered, 0 once it finished, None if there is nothing to go by.
+    """
+    if job.state not in (QUEUED, RENDERING):
+        return 0
+    status = status or {}
+    percent = status.get('CompletionPercentage') or 0
+    elapsed_ms = status.get('TimeTakenToRenderInMs') or 0
+    if job.state == RENDERING and 0 < percent < 100:
+        if status.get('EstimatedTimeRemainingInMs'):
+            # Resolve's own estimate, while the job is rendering
+            return status['EstimatedTimeRemainingInMs'] / 1000.0
+        if elapsed_ms:
+            return elapsed_ms / 1000.0 * (100 - percent) / percent
+    estimate = history.estimate(job.preset, job.frames) if history else None
+    if estimate is None:
+        return None
+    return estimate * (100 - min(percent, 100)) / 100
+
+
+def batch_remaining_seconds(jobs, statuses, history):
+    """
+    Jobs render one after the other, the batch takes the sum of their remaining times.
+    :param jobs: fbjobs.Jobs.
+    :param statuses: dictionary of job index -> status.
+    :param history: fbhistory.RenderHistory.
+    :return: (seconds, number of unfinished jobs without an estimate, left out of the seconds).
+    """
+    total = 0.0
+    unknown = 0
+    for job in jobs:
+        seconds = remaining_seconds(job, statuses.get(job.idx), history)
+        if seconds is None:
+            unknown += 1
+        else:
+            total += seconds
+    return total, unknown
+
+
+def order_jobs(jobs, policy, history):
+    """
+    :param jobs: fbjobs.Jobs to render, in queue order.
+    :param policy: one of ORDERS.
+    :param history: fbhistory.RenderHistory.
+    :return: the jobs in the order to render them.
+    :raises ValueError: if the policy is unknown.
+    """
+    if policy not in ORDERS:
+        raise ValueError(f'unknown render order {policy!r}, one of: ' + ', '.join(ORDERS))
+    if policy == 'fifo':
+        return list(jobs)
+
+    def estimate(job):
+        seconds = history.estimate(job.preset, job.frames) if history else None
+        return UNKNOWN if seconds is None else seconds
+
+    # sorted() is stable, ties keep the queue order
+    if policy == 'sjf':
+        return sorted(jobs, key=estimate)
+    return sorted(jobs, key=lambda job: (job.deadline is None, job.deadline or 0, estimate(job)))
+
+
+def format_eta(seconds):
+    """
+    :param seconds: remaining seconds, None if unknown.
+    :return: 'h:mm:ss', '?' if unknown.
+    """
+    if seconds is None:
+        return '?'
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+def parse_deadline(text, now=None):
+    """
+    :param text: 'YYYY-MM-DD HH:MM', or 'HH:MM' for the next time the clock shows it.
+    :param now: datetime to count from, defaults to now.
+    :return: deadline as a Unix timestamp.
+    :raises ValueError: if the text is neither.
+    """
+    now = now or datetime.datetime.now()
+    try:
+        return datetime.datetime.strptime(text, '%Y-%m-%d %H:%M').timestamp()
+    except ValueError:
+        clock = datetime.datetime.strptime(text, '%H:%M')
+    deadline = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if deadline <= now:
+        deadline += datetime.timedelta(days=1)
+    return deadline.timestamp()
+
+
+def format_batch_eta(seconds, unknown):
+    """
+    :param seconds: remaining seconds of the batch, see batch_remaining_seconds.
+    :param unknown: jobs without an estimate.
+    :return: text for the GUI, empty if there is nothing left to render.
+    """
+    if not seconds and not unknown:
+        return ''
+    text = 'Batch ETA ' + format_eta(seconds)
+    if unknown:
+        text += f' + {unknown} job{"s" if unknown > 1 else ""} unknown'
+    return text
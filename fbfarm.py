@@ -0,0 +1,339 @@
+"""
+Render farm scheduler, drives several Resolve hosts from one place.
+
+Every node is a Resolve connection with its own fbcore.Session. A source folder is imported and queued on the node
+with the fewest unfinished jobs. When a node stops answering, its unfinished jobs are imported and queued again on
+the others. poll() combines the job statuses of all nodes into one list of FarmJobs.
+The watch and output paths have to be the same on every host, e.g. the same shared storage mounted at the same path.
+
+Usage:
+    python3 fbfarm.py /Volumes/Cards 'A0*' --node 10.0.0.11 --node 10.0.0.12 --preset 'ProRes 422 Proxy' \\
+        --output /Volumes/Proxies
+    python3 fbfarm.py /tmp/cards --fake-node 127.0.0.1:6001 --fake-node 127.0.0.1:6002 ...   # see fakeresolve.py
+"""
+import argparse
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+
+import fbcore
+from fbhistory import RenderHistory
+from fbjobs import QUEUED, COMPLETE, FAILED, FINISHED_STATES
+
+
+class NodeLost(Exception):
+    """
+    Resolve answered, but without a project manager or a current project, e.g. it is quitting or being restarted.
+    """
+
+
+# A node that raises one of these from an API call is considered dead.
+NODE_ERRORS = (EOFError, OSError, NodeLost)
+
+
+def resolve_connector(host):
+    """
+    :param host: IP address of a Resolve Studio host with External Scripting set to 'Network'.
+    :return: function returning that host's Resolve object, or None.
+    """
+    def connect():
+        import DaVinciResolveScript
+        return DaVinciResolveScript.scriptapp('Resolve', host)
+    return connect
+
+
+def fake_connector(address):
+    """
+    :param address: (host, port) of a fakeresolve.serve() process.
+    :return: function returning a proxy of that fake Resolve, or None.
+    """
+    import fakeresolve
+    return functools.partial(fakeresolve.connect, address)
+
+
+class FarmJob:
+    __slots__ = ('id', 'watch_path', 'source', 'preset', 'output_path', 'node', 'idx', 'state', 'status', 'attempts')
+
+    def __init__(self, id, watch_path, source, preset, output_path):
+        self.id = id
+        self.watch_path = watch_path
+        self.source = source
+        self.preset = preset
+        self.output_path = output_path
+        # node name and render job index on that node, None while the job is not placed
+        self.node = None
+        self.idx = None
+        self.state = QUEUED
+        self.status = None
+        self.attempts = 0
+
+    def __repr__(self):
+        return f'FarmJob({self.id}, {self.state}, {self.source!r} on {self.node})'
+
+
+class Node:
+    __slots__ = ('name', 'connect', 'session', 'poller', 'alive', 'lost', 'jobs', 'retry', 'next_connect')
+
+    def __init__(self, name, connect):
+        self.name = name
+        self.connect = connect
+        self.session = None
+        # renderpoll.RenderStatusPoller of the session, ticked by FarmScheduler.poll()
+        self.poller = None
+        self.alive = False
+        # True once the node went down, until it is connected again
+        self.lost = False
+        # farm job id -> FarmJob placed on this node
+        self.jobs = {}
+        # seconds until the next connection attempt after a failed one, and the time.monotonic() of that attempt
+        self.retry = 0
+        self.next_connect = 0
+
+    def load(self):
+        return sum(1 for job in self.jobs.values() if job.state not in FINISHED_STATES)
+
+
+class FarmScheduler:
+    """
+    :param connectors: dictionary of node name -> function returning the node's Resolve object, None if unreachable.
+    :param max_attempts: nodes a job is placed on before it is given up as failed.
+    :param copy_xml: copy the xml sidecars of every completed job to its output path.
+    :param history: fbhistory.RenderHistory the finished jobs of all nodes are recorded in, under the node name.
+    :param notify: function(message, title=None) telling about nodes going down and coming back, print by default.
+    :param retry_interval: seconds before a node that could not be reached is tried again, doubled after every
+        failed attempt.
+    :param max_retry_interval: upper limit of the retry interval.
+    """
+
+    def __init__(self, connectors, max_attempts=3, copy_xml=False, history=None, notify=None, retry_interval=2.0,
+                 max_retry_interval=60.0):
+        self.nodes = [Node(name, connect) for name, connect in connectors.items()]
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.copy_xml = copy_xml
+        self.history = history
+        self.notify = notify or (lambda message, title=None: print(message))
+        # farm job id -> FarmJob, in submit order
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def connect(self):
+        """
+        Connect the nodes that are not connected yet, run() calls it every poll so a restarted node rejoins. A node
+        that could not be reached is tried again after its retry interval only.
+        :return: number of live nodes.
+        """
+        now = time.monotonic()
+        for node in self.nodes:
+            if node.alive or now < node.next_connect:
+                continue
+            try:
+                node.session = self._open_session(node)
+            except NODE_ERRORS:
+                node.session = None
+            node.alive = node.session is not None
+            if not node.alive:
+                self._retry_later(node)
+                continue
+            node.retry = node.next_connect = 0
+            node.session.copy_xml_flag = self.copy_xml
+            node.poller = node.session.status_poller()
+            if node.lost:
+                node.lost = False
+                self.notify(f'Node {node.name} is back.')
+        return len(self.alive_nodes())
+
+    def _open_session(self, node):
+        """
+        :return: fbcore.Session of the node, None if it is unreachable.
+        :raise NodeLost: if the node answers without a project.
+        """
+        resolve = node.connect()
+        if resolve is None:
+            return None
+        pm = resolve.GetProjectManager()
+        if pm is None or pm.GetCurrentProject() is None:
+            raise NodeLost(node.name)
+        return fbcore.Session(resolve, history=self.history, host=node.name)
+
+    def _retry_later(self, node):
+        node.retry = min(node.retry * 2 or self.retry_interval, self.max_retry_interval)
+        node.next_connect = time.monotonic() + node.retry
+
+    def alive_nodes(self):
+        return [node for node in self.nodes if node.alive]
+
+    def submit(self, watch_path, source, preset, output_path):
+        """
+        Import and queue a source folder on the least loaded node.
+        :return: the FarmJob, FAILED if no node could import it.
+        """
+        with self._lock:
+            job = FarmJob(next(self._ids), watch_path, source, preset, output_path)
+            self.jobs[job.id] = job
+            self._place(job)
+            return job
+
+    def _place(self, job):
+        """
+        Try the live nodes from the least loaded up, until one queues the job.
+        :return: True if the job is queued on a node.
+        """
+        for node in sorted(self.alive_nodes(), key=Node.load):
+            try:
+                idx = node.session.import_and_queue(job.watch_path, job.source, job.preset, job.output_path)
+            except NODE_ERRORS:
+                self._node_down(node)
+                continue
+            job.attempts += 1
+            if idx:
+                job.node, job.idx, job.state, job.status = node.name, idx, QUEUED, None
+                node.jobs[job.id] = job
+                node.poller.add_jobs([idx])
+                return True
+            # the node is alive but could not import the folder, another one won't either
+            job.state = FAILED
+            return False
+        # no node left, placed again once poll() finds a live one
+        job.node = job.idx = None
+        return False
+
+    def _node_down(self, node):
+        """
+        Take a node out of the pool and hand its unfinished jobs to the others.
+        """
+        node.alive = False
+        node.lost = True
+        node.session = node.poller = None
+        self._retry_later(node)
+        orphans = [job for job in node.jobs.values() if job.state not in FINISHED_STATES]
+        node.jobs = {job.id: job for job in node.jobs.values() if job.state in FINISHED_STATES}
+        self.notify(f'Node {node.name} is down, moving {len(orphans)} jobs.')
+        for job in orphans:
+            job.node = job.idx = job.status = None
+            job.state = QUEUED
+            if job.attempts >= self.max_attempts:
+                job.state = FAILED
+            else:
+                self._place(job)
+
+    def start(self):
+        """
+        Start rendering on every live node that is idle and has jobs queued.
+        """
+        with self._lock:
+            for node in self.alive_nodes():
+                try:
+                    if node.session.jobs.pending_ids() and not node.session.is_rendering():
+                        node.session.start_rendering()
+                except NODE_ERRORS:
+                    self._node_down(node)
+
+    def poll(self):
+        """
+        Fetch the job statuses of every live node once, fail over the jobs of the dead ones. A node whose Resolve
+        has no current project anymore counts as dead.
+        :return: list of all FarmJobs, in submit order.
+        """
+        with self._lock:
+            for node in self.alive_nodes():
+                session = node.session
+                try:
+                    if session.pm.GetCurrentProject() is None:
+                        raise NodeLost(node.name)
+                    if node.poller.proj is not session.proj:
+                        # the session moved on to a new project
+                        node.poller = session.status_poller()
+                    node.poller.poll_once()
+                except NODE_ERRORS:
+                    self._node_down(node)
+                    continue
+                for job in node.jobs.values():
+                    registered = session.jobs.get(job.idx)
+                    if registered:
+                        job.state = registered.state
+                    job.status = node.poller.statuses.get(job.idx, job.status)
+            for job in self.jobs.values():
+                if job.node is None and job.state == QUEUED:
+                    self._place(job)
+            return list(self.jobs.values())
+
+    def finished(self):
+        return all(job.state in FINISHED_STATES for job in self.jobs.values())
+
+    def run(self, interval=2.0, subscribers=()):
+        """
+        Start and poll the nodes until every job finished, or no node is left. The nodes that are down are connected
+        again first, every poll.
+        :param interval: seconds between polls.
+        :param subscribers: callbacks(jobs) called with poll()'s result after every poll.
+        :return: list of all FarmJobs.
+        """
+        while True:
+            with self._lock:
+                self.connect()
+            self.start()
+            jobs = self.poll()
+            for callback in subscribers:
+                callback(jobs)
+            if self.finished() or not self.alive_nodes():
+                return jobs
+            time.sleep(interval)
+
+
+def status_rows(jobs):
+    """
+    :param jobs: list of FarmJobs.
+    :return: one row per job, [farm id, node, source, preset, state, %].
+    """
+    return [[str(job.id), job.node or '-', job.source, job.preset, job.state,
+             (job.status or {}).get('CompletionPercentage', 0)] for job in jobs]
+
+
+def main(argv=None):
+    from fbcli import match_folders
+    parser = argparse.ArgumentParser(description='Spread import and render of source folders over Resolve hosts.')
+    parser.add_argument('watch_path', help='folder the source folders are in, same path on every host')
+    parser.add_argument('folders', nargs='*', metavar='GLOB', help='source folder names or shell globs')
+    parser.add_argument('--node', action='append', default=[], help='Resolve Studio host, repeat for more')
+    parser.add_argument('--fake-node', action='append', default=[], metavar='HOST:PORT',
+                        help='fakeresolve.py --serve process, for testing without Resolve')
+    parser.add_argument('--preset', required=True, help='render preset, has to exist on every host')
+    parser.add_argument('--output', required=True, help='render target folder, same path on every host')
+    parser.add_argument('--copy-xml', action='store_true', help='copy xml sidecars next to the renders')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between status polls')
+    args = parser.parse_args(argv)
+
+    import fakeresolve
+    connectors = {host: resolve_connector(host) for host in args.node}
+    connectors.update({text: fake_connector(fakeresolve.parse_address(text)) for text in args.fake_node})
+    history = RenderHistory(fbcore.default_db_path())
+    farm = FarmScheduler(connectors, copy_xml=args.copy_xml, history=history)
+    if not farm.connect():
+        print('Cannot reach any Resolve node.')
+        return 3
+
+    watch_path = os.path.abspath(args.watch_path)
+    names = sorted(entry.name for entry in os.scandir(watch_path) if entry.is_dir() and entry.name[0] != '.')
+    folders = match_folders(names, args.folders)
+    if not folders:
+        print('No source folder matched.')
+        return 2
+    for folder in folders:
+        farm.submit(watch_path, folder, args.preset, os.path.abspath(args.output))
+
+    def print_status(jobs):
+        print(' | '.join(f'{row[0]}:{row[1]}:{row[4]}:{row[5]}' for row in status_rows(jobs)))
+
+    jobs = farm.run(args.interval, [print_status])
+    failed = [job for job in jobs if job.state != COMPLETE]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
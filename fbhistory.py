@@ -0,0 +1,224 @@
+"""
+Render history.
+
+Every job footbrake sees finish is appended to a SQLite table with its timeline, preset, host, clip and frame
+counts, the size of its source files and Resolve's TimeTakenToRenderInMs. Rows are never updated or deleted.
+The render speed of a preset, in frames per second over its last jobs, estimates how long a new job of that preset
+will take, see fbeta. report() sums the history up per preset and host over days, weeks or months, in fps and MB/s
+of source media, which shows when a machine got slower and what a preset needs.
+
+    python3 fbhistory.py --by week
+    python3 fbhistory.py --preset 'ProRes 422 Proxy' --since 2026-01-01 --json
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS render_history (
+    finished REAL NOT NULL,
+    preset TEXT,
+    timeline TEXT,
+    frames INTEGER NOT NULL,
+    render_ms INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    host TEXT,
+    clips INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# columns added after the first version of the table, added to an older footbrake.db when it is opened
+_ADDED_COLUMNS = (('host', 'TEXT'), ('clips', 'INTEGER NOT NULL DEFAULT 0'), ('bytes', 'INTEGER NOT NULL DEFAULT 0'))
+
+# report period -> strftime format of the period a job belongs to
+PERIODS = {'day': '%Y-%m-%d', 'week': '%Y-W%W', 'month': '%Y-%m', 'all': 'all'}
+
+REPORT_COLUMNS = ('period', 'preset', 'host', 'jobs', 'failed', 'clips', 'frames', 'hours', 'fps', 'mb_per_s',
+                  'fps_change')
+
+
+class RenderHistory:
+    """
+    :param db_path: SQLite database file, ':memory:' for a throwaway history.
+    :param window: completed jobs per preset the render speed is averaged over, recent jobs tell the speed of
+        the machine as it is now.
+    """
+
+    def __init__(self, db_path=':memory:', window=20):
+        self.db_path = db_path
+        self.window = window
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(render_history)')}
+        for name, definition in _ADDED_COLUMNS:
+            if name not in columns:
+                self._db.execute(f'ALTER TABLE render_history ADD COLUMN {name} {definition}')
+        self._db.commit()
+        self._lock = threading.Lock()
+        # preset -> frames per second, None for all presets, dropped when a job of the preset is recorded
+        self._speeds = {}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def record(self, preset, timeline, frames, render_ms, state, host=None, clips=0, bytes=0):
+        """
+        :param preset: render preset name.
+        :param timeline: timeline name.
+        :param frames: frames rendered, from the job's mark in and out.
+        :param render_ms: Resolve's TimeTakenToRenderInMs.
+        :param state: fbjobs state the job finished in.
+        :param host: Resolve host that rendered it.
+        :param clips: clips on the timeline, 0 if unknown.
+        :param bytes: size of the clips' source files, 0 if unknown.
+        :return: none
+        """
+        with self._lock:
+            self._db.execute('INSERT INTO render_history (finished, preset, timeline, frames, render_ms, state, host, '
+                             'clips, bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (time.time(), preset, timeline, int(frames or 0), int(render_ms or 0), state, host,
+                              int(clips or 0), int(bytes or 0)))
+            self._db.commit()
+            self._speeds.pop(preset, None)
+            self._speeds.pop(None, None)
+
+    def frames_per_second(self, preset=None):
+        """
+        :param preset: render preset name, None for the jobs of all presets.
+        :return: average render speed of the last completed jobs, None if there are none.
+        """
+        with self._lock:
+            if preset in self._speeds:
+                return self._speeds[preset]
+            where = 'state = ? AND frames > 0 AND render_ms > 0'
+            args = ('Complete',)
+            if preset is not None:
+                where += ' AND preset = ?'
+                args += (preset,)
+            frames, render_ms = self._db.execute(
+                'SELECT SUM(frames), SUM(render_ms) FROM (SELECT frames, render_ms FROM render_history '
+                f'WHERE {where} ORDER BY finished DESC LIMIT ?)', args + (self.window,)).fetchone()
+            speed = frames * 1000.0 / render_ms if render_ms else None
+            self._speeds[preset] = speed
+            return speed
+
+    def estimate(self, preset, frames):
+        """
+        :param preset: render preset name.
+        :param frames: frames to render.
+        :return: estimated render time in seconds, from the preset's speed, or the speed of all presets if it has
+            no history yet. None if nothing is known.
+        """
+        if not frames:
+            return None
+        speed = self.frames_per_second(preset) or self.frames_per_second()
+        return frames / speed if speed else None
+
+    def report(self, period='day', since=None, preset=None, host=None):
+        """
+        Render throughput per period, preset and host.
+        :param period: one of PERIODS.
+        :param since: Unix timestamp, leave out the jobs that finished before.
+        :param preset: only this preset, all if None.
+        :param host: only this host, all if None.
+        :return: list of dictionaries with the REPORT_COLUMNS, by preset, host and period. fps and mb_per_s are over
+            the completed jobs, mb_per_s only over the ones whose source size is known. fps_change is the fps against
+            the period before, of the same preset and host, in percent.
+        """
+        where = ['1']
+        args = []
+        for column, value in (('preset', preset), ('host', host)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                args.append(value)
+        if since is not None:
+            where.append('finished >= ?')
+            args.append(since)
+        if period == 'all':
+            period_column = "'all'"
+        else:
+            period_column = "strftime(?, finished, 'unixepoch', 'localtime')"
+            args.insert(0, PERIODS[period])
+        complete = "state = 'Complete' AND render_ms > 0"
+        query = (f"SELECT {period_column} AS period, preset, host, COUNT(*), SUM(state = 'Failed'), "
+                 'SUM(clips), '
+                 f'SUM(CASE WHEN {complete} THEN frames ELSE 0 END), '
+                 f'SUM(CASE WHEN {complete} THEN render_ms ELSE 0 END), '
+                 f'SUM(CASE WHEN {complete} AND bytes > 0 THEN bytes ELSE 0 END), '
+                 f'SUM(CASE WHEN {complete} AND bytes > 0 THEN render_ms ELSE 0 END) '
+                 f"FROM render_history WHERE {' AND '.join(where)} "
+                 'GROUP BY preset, host, period ORDER BY preset, host, period')
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+
+        report = []
+        previous = {}
+        for period_name, row_preset, row_host, jobs, failed, clips, frames, render_ms, size, size_ms in rows:
+            fps = frames * 1000.0 / render_ms if render_ms else None
+            last_fps = previous.get((row_preset, row_host))
+            report.append({
+                'period': period_name, 'preset': row_preset, 'host': row_host, 'jobs': jobs, 'failed': failed,
+                'clips': clips, 'frames': frames, 'hours': render_ms / 3600000.0,
+                'fps': fps, 'mb_per_s': size / 1000.0 / size_ms if size_ms else None,
+                'fps_change': (fps / last_fps - 1) * 100 if fps and last_fps else None})
+            if fps:
+                previous[row_preset, row_host] = fps
+        return report
+
+
+def format_report(report):
+    """
+    :param report: RenderHistory.report() result.
+    :return: the report as a text table.
+    """
+    def cell(value, digits=1):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.{digits}f}'
+        return str(value)
+
+    headings = ('Period', 'Preset', 'Host', 'Jobs', 'Failed', 'Clips', 'Frames', 'Hours', 'fps', 'MB/s', 'fps +/-%')
+    table = [headings] + [(row['period'], row['preset'] or '-', row['host'] or '-', cell(row['jobs']),
+                           cell(row['failed']), cell(row['clips']), cell(row['frames']), cell(row['hours'], 2),
+                           cell(row['fps']), cell(row['mb_per_s']), cell(row['fps_change']))
+                          for row in report]
+    widths = [max(len(line[i]) for line in table) for i in range(len(headings))]
+    return '\n'.join('  '.join(text.ljust(width) if i < 3 else text.rjust(width)
+                               for i, (text, width) in enumerate(zip(line, widths))) for line in table)
+
+
+def main(argv=None):
+    from fbcore import default_db_path
+    parser = argparse.ArgumentParser(description='Render throughput per preset and host, from the render history.')
+    parser.add_argument('--db', default=default_db_path(),
+                        help='history database (default footbrake.db next to this script)')
+    parser.add_argument('--by', choices=PERIODS, default='day', help='report period (default day)')
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help='leave out the jobs that finished before')
+    parser.add_argument('--preset', help='only this render preset')
+    parser.add_argument('--host', help='only this host')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+    since = None
+    if args.since:
+        try:
+            since = datetime.datetime.strptime(args.since, '%Y-%m-%d').timestamp()
+        except ValueError:
+            parser.error('--since takes a date, YYYY-MM-DD')
+    if not os.path.exists(args.db):
+        print(f'No render history at {args.db}')
+        return 1
+    report = RenderHistory(args.db).report(args.by, since, args.preset, args.host)
+    print(json.dumps(report, indent=1) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
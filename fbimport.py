@@ -0,0 +1,82 @@
+"""
+Media import engine.
+
+The source folder is walked once, every OS directory is mapped to a media pool bin, then the files of each bin are
+sent to Resolve with a single list-valued AddItemsToMediaPool call.
+"""
+import os
+from collections import namedtuple
+
+# folders: dictionary of OS directory path -> media pool folder object, the source folder itself maps to the root bin.
+# bin_clips: list of (media pool folder, [clips]) in folder tree order, ready for make_timeline_with_folder.
+# skipped: files the file filter kept away from Resolve.
+# bytes: size of the files handed to Resolve, for the render history's MB/s.
+ImportReport = namedtuple('ImportReport', ['folders', 'bins', 'files', 'clips', 'api_calls', 'bin_clips', 'skipped',
+                                           'bytes'])
+
+
+def mp_add_source(fpath, add_files_flag, media_pool, media_storage, root_folder=None, walk=os.walk,
+                  file_filter=None):
+    """
+    Add source clips to Resolve, one bin per OS directory.
+    :param fpath: footage folder path in OS.
+    :param add_files_flag: if True, add folders and files, if False, add folder structure only.
+    :param media_pool: media pool object from Resolve API.
+    :param media_storage: media storage object from Resolve API.
+    :param root_folder: media pool folder that mirrors fpath, defaults to the current media pool folder.
+    :param walk: os.walk compatible function used to list the source folder.
+    :param file_filter: function taking the list of all file paths and returning the ones to import, called once per
+        import, e.g. fbprobe.MediaProbe.filter. If None, every file is handed to Resolve.
+    :return: ImportReport, api_calls is the number of Resolve API round trips made.
+    """
+    api_calls = 0
+    if root_folder is None:
+        root_folder = media_pool.GetCurrentFolder()
+        api_calls += 1
+
+    # First pass: create the bin tree and remember which files go to which bin.
+    folders = {fpath: root_folder}
+    batches = []
+    file_count = 0
+    for root, dirs, files in walk(fpath):
+        parent = folders[root]
+        kept_dirs = []
+        for dir in sorted(dirs):
+            handle = media_pool.AddSubFolder(parent, dir)
+            api_calls += 1
+            if handle:
+                folders[os.path.join(root, dir)] = handle
+                kept_dirs.append(dir)
+        # prune sub folders we failed to create a bin for, os.walk honors in-place changes
+        dirs[:] = kept_dirs
+        if add_files_flag and files:
+            batches.append((parent, [os.path.join(root, file) for file in sorted(files)]))
+            file_count += len(files)
+
+    skipped = 0
+    if file_filter is not None and batches:
+        kept = set(file_filter([path for folder, paths in batches for path in paths]))
+        filtered = [(folder, [path for path in paths if path in kept]) for folder, paths in batches]
+        skipped = file_count - len(kept)
+        batches = [(folder, paths) for folder, paths in filtered if paths]
+
+    # Second pass: one SetCurrentFolder and one AddItemsToMediaPool per bin.
+    clip_count = 0
+    bin_clips = []
+    total_bytes = 0
+    for folder, paths in batches:
+        for path in paths:
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        media_pool.SetCurrentFolder(folder)
+        clips = media_storage.AddItemsToMediaPool(paths)
+        api_calls += 2
+        if clips:
+            # a list of clips, or a dictionary keyed by index depending on the Resolve version
+            clips = list(clips.values()) if isinstance(clips, dict) else list(clips)
+            clip_count += len(clips)
+            bin_clips.append((folder, clips))
+
+    return ImportReport(folders, len(folders) - 1, file_count, clip_count, api_calls, bin_clips, skipped, total_bytes)
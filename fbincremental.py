@@ -0,0 +1,111 @@
+"""
+Incremental transcode.
+
+A card folder that got a few new clips does not need the whole timeline rendered again. With render presets that
+write individual clips and 'Preserve source directory levels' set, Resolve puts the render of
+/Volumes/Cards/A001/CLIP/C0001.mov under <output path>/A001/CLIP/C0001.<ext> for 2 levels. stale_clips() looks for
+that render of every source clip, and checks the clip against the manifest of the output path, the size and mtime
+each clip had when it was last rendered there. Only the clips without a render, without a manifest entry, or changed
+since, are imported.
+
+The manifest is a JSON file in the output path, updated when a job completes, after its renders are verified if the
+session has a verifier, so a failed render is tried again. A render the manifest does not know of, e.g. one left by
+a cancelled job or from before the manifest existed, may be partial and is rendered again.
+"""
+import json
+import os
+import tempfile
+import threading
+
+MANIFEST_NAME = '.footbrake_manifest.json'
+
+
+def output_dir(output_path, source_path, levels):
+    """
+    :param output_path: render target folder.
+    :param source_path: source clip path.
+    :param levels: 'Preserve source directory levels' of the render preset.
+    :return: the folder Resolve renders the clip into.
+    """
+    parts = []
+    directory = os.path.dirname(source_path)
+    for _ in range(levels):
+        directory, name = os.path.split(directory)
+        if not name:
+            break
+        parts.append(name)
+    return os.path.join(output_path, *reversed(parts))
+
+
+class Manifest:
+    """
+    Source clip path -> [size, mtime_ns] it had when it was rendered into the output path.
+    :param output_path: render target folder, the manifest file is kept in it.
+    """
+
+    def __init__(self, output_path):
+        self.path = os.path.join(output_path, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as filehandle:
+                self.entries = json.load(filehandle)
+        except (OSError, ValueError):
+            self.entries = {}
+        if not isinstance(self.entries, dict):
+            self.entries = {}
+
+    def get(self, source_path):
+        return self.entries.get(source_path)
+
+    def update(self, entries):
+        """
+        Record the clips of a completed render and write the manifest, through a temp file and a rename.
+        :param entries: dictionary of source clip path -> (size, mtime_ns).
+        :return: none
+        """
+        with self._lock:
+            self.entries.update((path, list(stat)) for path, stat in entries.items())
+            directory = os.path.dirname(self.path)
+            fd, temp_path = tempfile.mkstemp(prefix='.manifest-', suffix='.json', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as filehandle:
+                    json.dump(self.entries, filehandle, indent=0, sort_keys=True)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+
+def stale_clips(paths, output_path, levels, manifest):
+    """
+    :param paths: source clip paths, media only, e.g. filtered by fbprobe.
+    :param output_path: render target folder.
+    :param levels: 'Preserve source directory levels' of the render preset.
+    :param manifest: Manifest of output_path.
+    :return: dictionary of source clip path -> (size, mtime_ns), for the clips whose render is missing or not in the
+        manifest, or which changed since they were rendered, in the order of paths.
+    """
+    # output folder -> file names without extension, each folder is listed once
+    listings = {}
+    stale = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        directory = output_dir(output_path, path, levels)
+        rendered = listings.get(directory)
+        if rendered is None:
+            rendered = listings[directory] = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            rendered.add(os.path.splitext(entry.name)[0])
+            except OSError:
+                pass
+        recorded = manifest.get(path)
+        if (os.path.splitext(os.path.basename(path))[0] not in rendered or recorded is None
+                or list(recorded) != [st.st_size, st.st_mtime_ns]):
+            stale[path] = (st.st_size, st.st_mtime_ns)
+    return stale
@@ -0,0 +1,125 @@
+"""
+Persistent scan index of the watch folders.
+
+Every directory is stored in SQLite with its mtime, its sub directories and its files. A directory's mtime changes
+whenever an entry is added, removed or renamed in it, so a rescan only needs one stat per directory, and lists only
+the directories whose mtime moved. Everything else is answered from the index.
+Files modified in place do not touch their directory's mtime, their size/mtime in the index can be stale.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scan_dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    files TEXT NOT NULL
+)
+'''
+
+
+class ScanIndex:
+    """
+    :param db_path: SQLite database file, ':memory:' for a throwaway index.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        # the GUI thread and the render status thread both read the index
+        self._lock = threading.Lock()
+        self.stats = {'stat': 0, 'scandir': 0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _scan(self, path, mtime_ns):
+        subdirs = []
+        files = []
+        self.stats['scandir'] += 1
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_dir():
+                        # like os.walk, symlinked folders are not followed, a link loop on a card or a NAS share
+                        # would recurse forever
+                        continue
+                    else:
+                        st = entry.stat()
+                        files.append([entry.name, st.st_size, st.st_mtime_ns])
+                except OSError:
+                    # vanished while scanning
+                    continue
+        subdirs.sort()
+        files.sort()
+        with self._lock:
+            row = self._db.execute('SELECT subdirs FROM scan_dirs WHERE path = ?', (path,)).fetchone()
+            if row:
+                for gone in set(json.loads(row[0])) - set(subdirs):
+                    self._forget(os.path.join(path, gone))
+            self._db.execute('INSERT OR REPLACE INTO scan_dirs VALUES (?, ?, ?, ?)',
+                             (path, mtime_ns, json.dumps(subdirs), json.dumps(files)))
+        return subdirs, files
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def _forget(self, path):
+        prefix = os.path.join(path, '')
+        self._db.execute('DELETE FROM scan_dirs WHERE path = ? OR substr(path, 1, ?) = ?',
+                         (path, len(prefix), prefix))
+
+    def entries(self, path, commit=True):
+        """
+        Sub directories and files of one directory, listed from disk only if its mtime changed.
+        :param path: directory path in OS.
+        :param commit: write a new listing to the database now, walk() commits once at the end instead.
+        :return: (list of sub directory names, list of [file name, size, mtime_ns]).
+        """
+        self.stats['stat'] += 1
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            row = self._db.execute('SELECT mtime_ns, subdirs, files FROM scan_dirs WHERE path = ?',
+                                   (path,)).fetchone()
+        if row and row[0] == mtime_ns:
+            return json.loads(row[1]), json.loads(row[2])
+        listing = self._scan(path, mtime_ns)
+        if commit:
+            self.commit()
+        return listing
+
+    def subdirs(self, path):
+        """
+        :return: names of the sub directories of path, like the folder list of the watch path.
+        """
+        return self.entries(path)[0]
+
+    def walk(self, top, stats=False):
+        """
+        Drop-in replacement for os.walk(top), top-down, the dirs list can be pruned in place.
+        Unreadable directories are skipped. The listings that changed are committed once, when the walk ends.
+        :param stats: if True, the files are listed as [name, size, mtime_ns] instead of names.
+        """
+        try:
+            yield from self._walk(top, stats)
+        finally:
+            self.commit()
+
+    def _walk(self, top, stats):
+        try:
+            subdirs, files = self.entries(top, commit=False)
+        except OSError:
+            return
+        dirs = list(subdirs)
+        yield top, dirs, files if stats else [file[0] for file in files]
+        for name in dirs:
+            yield from self._walk(os.path.join(top, name), stats)
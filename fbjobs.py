@@ -0,0 +1,198 @@
+"""
+Render job registry.
+
+One slotted Job record per render job, indexed by Resolve's job index, with explicit state transitions.
+Replaces the pending_queue/finished_queue/queue_paths/xml_copied globals: lookups and status updates are O(1), and
+the oldest finished jobs are dropped past max_finished, so a long session does not grow without bound.
+"""
+import threading
+import time
+
+QUEUED = 'Queued'
+RENDERING = 'Rendering'
+COMPLETE = 'Complete'
+FAILED = 'Failed'
+CANCELLED = 'Cancelled'
+
+FINISHED_STATES = (COMPLETE, FAILED, CANCELLED)
+
+# state -> states it may move to. A stopped render sends jobs that were not reached yet back to QUEUED.
+TRANSITIONS = {
+    QUEUED: (RENDERING, CANCELLED),
+    RENDERING: (QUEUED, COMPLETE, FAILED, CANCELLED),
+    COMPLETE: (),
+    FAILED: (QUEUED,),
+    CANCELLED: (QUEUED,),
+}
+
+# Resolve's JobStatus -> registry state, statuses not listed leave the state as it is.
+RESOLVE_STATES = {
+    'Rendering': RENDERING,
+    'Complete': COMPLETE,
+    'Failed': FAILED,
+    'Cancelled': CANCELLED,
+}
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class Job:
+    __slots__ = ('idx', 'state', 'watch_path', 'source', 'output_path', 'preset', 'frames', 'clips', 'bytes',
+                 'sources', 'deadline', 'started', 'recorded', 'verified', 'actions_run')
+
+    def __init__(self, idx, watch_path, source, output_path, preset=None):
+        self.idx = idx
+        self.state = QUEUED
+        self.watch_path = watch_path
+        self.source = source
+        self.output_path = output_path
+        self.preset = preset
+        # frames to render, from the render job's mark in and out, 0 if unknown
+        self.frames = 0
+        # clips on the timeline and bytes of their source files, 0 if unknown, e.g. for a reused timeline
+        self.clips = 0
+        self.bytes = 0
+        # source clip paths on the timeline if only some of the folder's are, e.g. an incremental import, None for all
+        self.sources = None
+        # Unix timestamp the deliverable is due, for the 'deadline' render order, None if there is none
+        self.deadline = None
+        # Unix time the job was last handed to the renderer, None until then
+        self.started = None
+        # True once the finished job is in the render history
+        self.recorded = False
+        # True once the output is handed to the verifier
+        self.verified = False
+        # True once the job is handed to the post-render actions
+        self.actions_run = False
+
+    def __repr__(self):
+        return f'Job({self.idx}, {self.state}, {self.source!r})'
+
+
+class JobRegistry:
+    """
+    :param max_finished: finished jobs kept, the oldest ones are dropped beyond that.
+    """
+
+    def __init__(self, max_finished=1000):
+        self.max_finished = max_finished
+        # dictionaries keep insertion order, they double as ordered sets of job indexes
+        self._jobs = {}
+        self._pending = {}
+        self._finished = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, idx):
+        return idx in self._jobs
+
+    def get(self, idx):
+        return self._jobs.get(idx)
+
+    def ids(self):
+        """
+        :return: all job indexes, sorted.
+        """
+        with self._lock:
+            return sorted(self._jobs)
+
+    def pending_ids(self):
+        """
+        :return: indexes of the jobs queued but not rendering yet, in queue order.
+        """
+        with self._lock:
+            return list(self._pending)
+
+    def add(self, idx, watch_path, source, output_path, preset=None):
+        """
+        Register a new render job in QUEUED state.
+        :return: the Job.
+        """
+        job = Job(idx, watch_path, source, output_path, preset)
+        with self._lock:
+            self._jobs[idx] = job
+            self._pending[idx] = job
+        return job
+
+    def transition(self, idx, state):
+        """
+        Move a job to a new state.
+        :return: True if the state changed, False if it already was in that state.
+        :raises InvalidTransition: if the move is not allowed.
+        """
+        with self._lock:
+            job = self._jobs[idx]
+            if job.state == state:
+                return False
+            if state not in TRANSITIONS[job.state]:
+                raise InvalidTransition(f'job {idx}: {job.state} -> {state}')
+            job.state = state
+            if state == QUEUED:
+                self._pending[idx] = job
+                self._finished.pop(idx, None)
+                # rendered again, recorded again
+                job.recorded = False
+            else:
+                self._pending.pop(idx, None)
+            if state in FINISHED_STATES:
+                self._finished[idx] = job
+                self._evict()
+            return True
+
+    def start(self, ids):
+        """
+        Mark jobs as handed to the renderer.
+        """
+        now = time.time()
+        with self._lock:
+            for idx in ids:
+                self.transition(idx, RENDERING)
+                self._jobs[idx].started = now
+
+    def update(self, idx, status, rendering=True):
+        """
+        Apply a status from Resolve to a job.
+        :param idx: job index.
+        :param status: status dictionary from GetRenderJobStatus, or None if the job is gone from Resolve.
+        :param rendering: Resolve's IsRenderingInProgress. A job handed to the renderer shows 'Ready' until its turn
+            in the batch, it only goes back to QUEUED once Resolve stopped rendering without reaching it.
+        :return: the Job, None if it is not registered.
+        """
+        with self._lock:
+            job = self._jobs.get(idx)
+            if job is None:
+                return None
+            if status is None:
+                self.remove(idx)
+                return job
+            resolve_status = status.get('JobStatus')
+            if resolve_status == 'Ready' and job.state == RENDERING:
+                if not rendering:
+                    # rendering was stopped before this job was reached
+                    self.transition(idx, QUEUED)
+            elif resolve_status in RESOLVE_STATES:
+                state = RESOLVE_STATES[resolve_status]
+                if state == job.state or state in TRANSITIONS[job.state]:
+                    self.transition(idx, state)
+            return job
+
+    def remove(self, idx):
+        with self._lock:
+            self._jobs.pop(idx, None)
+            self._pending.pop(idx, None)
+            self._finished.pop(idx, None)
+
+    def clear(self):
+        with self._lock:
+            self._jobs.clear()
+            self._pending.clear()
+            self._finished.clear()
+
+    def _evict(self):
+        while len(self._finished) > self.max_finished:
+            idx = next(iter(self._finished))
+            self.remove(idx)
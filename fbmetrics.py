@@ -0,0 +1,201 @@
+"""
+Resolve API call instrumentation.
+
+instrument() wraps a Resolve handle in a proxy that times every method call, and wraps the API objects the calls
+return, so a whole session is covered from the resolve handle down. Calls are grouped by the footbrake operation they
+run in (import, timeline, queue, poll, copy), set with the operation() context manager, and recorded as latency
+histograms per operation and 'Object.Method'. registry.to_json() and registry.to_prometheus() export them.
+
+Off by default. While disabled instrument() returns the handle as it is and operation() is one flag check, so the
+engine runs on the bare Resolve objects.
+
+    fbmetrics.enable()
+    session = fbcore.connect()      # the session's handles are instrumented now
+    ...
+    print(fbmetrics.registry.to_prometheus())
+"""
+import bisect
+import contextlib
+import json
+import threading
+import time
+
+from fbproxy import Proxy
+
+# Histogram bucket upper bounds in seconds, a local Resolve call takes about a millisecond, an import seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Resolve returns every object as the same PyRemoteObject type, the object kind is told by the call that returned it.
+RETURN_KINDS = {
+    'GetProjectManager': 'ProjectManager', 'GetMediaStorage': 'MediaStorage',
+    'GetCurrentProject': 'Project', 'CreateProject': 'Project', 'LoadProject': 'Project',
+    'GetMediaPool': 'MediaPool',
+    'GetRootFolder': 'Folder', 'GetCurrentFolder': 'Folder', 'AddSubFolder': 'Folder', 'GetSubFolders': 'Folder',
+    'GetClips': 'MediaPoolItem', 'AddItemsToMediaPool': 'MediaPoolItem', 'GetMediaPoolItem': 'MediaPoolItem',
+    'CreateEmptyTimeline': 'Timeline', 'GetCurrentTimeline': 'Timeline', 'GetTimelineByIndex': 'Timeline',
+    'GetItemsInTrack': 'TimelineItem', 'AppendToTimeline': 'TimelineItem',
+}
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], self.counts))}
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        # (operation, 'Object.Method') -> Histogram of the Resolve call latency
+        self.calls = {}
+        # operation -> Histogram of the whole operation's wall time
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def observe_call(self, operation, method, seconds):
+        with self._lock:
+            histogram = self.calls.get((operation, method))
+            if histogram is None:
+                histogram = self.calls[operation, method] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_operation(self, operation, seconds):
+        with self._lock:
+            histogram = self.operations.get(operation)
+            if histogram is None:
+                histogram = self.operations[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.operations.clear()
+
+    def to_json(self):
+        """
+        :return: JSON text, {'operations': {operation: histogram}, 'calls': {operation: {method: histogram}}}.
+        """
+        with self._lock:
+            calls = {}
+            for (operation, method), histogram in sorted(self.calls.items()):
+                calls.setdefault(operation, {})[method] = histogram.to_dict()
+            operations = {operation: histogram.to_dict() for operation, histogram in sorted(self.operations.items())}
+        return json.dumps({'operations': operations, 'calls': calls}, indent=1)
+
+    def to_prometheus(self):
+        """
+        :return: the histograms in Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, help_text, series in (
+                    ('footbrake_resolve_call_seconds', 'Resolve API call latency.',
+                     [({'operation': op, 'method': method}, h) for (op, method), h in sorted(self.calls.items())]),
+                    ('footbrake_operation_seconds', 'Wall time of footbrake operations.',
+                     [({'operation': op}, h) for op, h in sorted(self.operations.items())])):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in series:
+                    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                    cumulative = 0
+                    for bound, count in zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Metrics()
+_local = threading.local()
+_null_context = contextlib.suppress()
+
+
+def enable(on=True):
+    """
+    Turn instrumentation on, for the handles instrumented from now on.
+    """
+    registry.enabled = on
+
+
+def write(path):
+    """
+    Write the recorded metrics to a file, in Prometheus text format if the name ends with '.prom', JSON otherwise.
+    :param path: file path.
+    :return: none
+    """
+    with open(path, 'w') as filehandle:
+        filehandle.write(registry.to_prometheus() if path.endswith('.prom') else registry.to_json())
+
+
+def current_operation():
+    return getattr(_local, 'operation', 'other')
+
+
+def operation(name):
+    """
+    Context manager, the Resolve calls made inside it are recorded under operation name, and its wall time too.
+    Nested operations record the calls under the innermost one.
+    """
+    if not registry.enabled:
+        return _null_context
+    return _operation(name)
+
+
+@contextlib.contextmanager
+def _operation(name):
+    outer = getattr(_local, 'operation', 'other')
+    _local.operation = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe_operation(name, time.perf_counter() - start)
+        _local.operation = outer
+
+
+def instrument(handle, kind):
+    """
+    :param handle: Resolve API object.
+    :param kind: object name used in the method labels, e.g. 'Project'.
+    :return: an instrumented proxy, or the handle itself while instrumentation is disabled.
+    """
+    if not registry.enabled or handle is None or isinstance(handle, Instrumented):
+        return handle
+    return Instrumented(handle, kind)
+
+
+class Instrumented(Proxy):
+    """
+    Proxy of a Resolve API object that times every method call, see fbproxy.Proxy.
+    """
+    __slots__ = ('_kind',)
+
+    def __init__(self, target, kind):
+        super().__init__(target)
+        self._kind = kind
+
+    def _call(self, name, method, args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            registry.observe_call(current_operation(), f'{self._kind}.{name}', time.perf_counter() - start)
+
+    def _proxy(self, target, name):
+        return Instrumented(target, RETURN_KINDS.get(name, 'Object'))
+
+    def __repr__(self):
+        return f'Instrumented({self._kind}, {self._target!r})'
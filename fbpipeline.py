@@ -0,0 +1,147 @@
+"""
+Import while rendering.
+
+Resolve can import media and build timelines while it renders, it only refuses new render jobs. RenderPipeline runs
+the imports in a producer thread, each source folder ends up as a prepared timeline. The consumer, the thread calling
+run(), adds the render jobs of every prepared timeline as soon as the renderer is free, starts them, and follows them
+until they are done, while the producer imports the next folders. The renderer only waits for an import when the
+imports are slower than the renders.
+
+Both threads hold Session.lock while they use Resolve's current project and timeline: the producer only while it
+makes a timeline, which makes it the current one, not during the import, the consumer from adding the render jobs to
+starting them. The consumer can start the renderer while the producer imports. Whether the producer may switch to a
+new project is decided inside the lock, so a render cannot start in between. The render status poller only needs the
+session's per call lock and keeps polling during an import.
+
+    pipeline = RenderPipeline(session, '/Volumes/Cards', [('ProRes 422 Proxy', '/Volumes/Proxies')])
+    for folder in session.source_folders('/Volumes/Cards'):
+        pipeline.add(folder)
+    pipeline.close()
+    pipeline.run()
+"""
+import queue
+import threading
+
+# the end of the folders, put on the import queue by close()
+_CLOSED = object()
+
+
+class RenderPipeline:
+    """
+    :param session: fbcore.Session.
+    :param watch_path: the path of watch folder, for the folders added without one.
+    :param targets: list of (render preset, output path), every folder gets one render job per target, unless it is
+        added with its own. The first output path is the one an incremental import compares against.
+    :param subscribers: render status poller callbacks(changes, statuses), see Session.status_poller.
+    :param lookahead: prepared timelines waiting for the renderer at most, the producer waits beyond that.
+    :param interval: seconds between checks while someone else's render is running.
+    """
+
+    def __init__(self, session, watch_path, targets, subscribers=(), lookahead=2, interval=2.0):
+        self.session = session
+        self.watch_path = watch_path
+        self.targets = list(targets)
+        self.subscribers = list(subscribers)
+        self.interval = interval
+        self.imports = queue.Queue()
+        self.prepared = queue.Queue(maxsize=lookahead)
+        # job indexes of every render started, in start order
+        self.started = []
+        # source folders that failed to import or queue
+        self.failed = []
+        self.poller = None
+        self._stop = threading.Event()
+        self._producer = None
+
+    def add(self, source_folder, targets=None, watch_path=None, deadline=None):
+        """
+        Queue a source folder for import, also while run() is running.
+        :param source_folder: source folder name.
+        :param targets: list of (render preset, output path) for this folder, the pipeline's if None.
+        :param watch_path: the watch folder it is in, the pipeline's if None.
+        :param deadline: Unix timestamp the folder's jobs are due, for the 'deadline' render order.
+        """
+        self.imports.put((watch_path or self.watch_path, source_folder, targets or self.targets, deadline))
+
+    def close(self):
+        """
+        No more folders, run() returns once the ones added are rendered.
+        """
+        self.imports.put(_CLOSED)
+
+    def stop(self):
+        """
+        Stop importing and starting renders, the render running now is stopped by the caller.
+        """
+        self._stop.set()
+        self.imports.put(_CLOSED)
+        if self.poller is not None:
+            self.poller.stop()
+
+    def produce(self):
+        """
+        Producer thread, imports the folders one after the other.
+        """
+        while not self._stop.is_set():
+            item = self.imports.get()
+            if item is _CLOSED:
+                break
+            watch_path, source_folder, targets, deadline = item
+            print('Importing ' + source_folder)
+            # takes Session.lock only to make the timeline, no new project while rendering
+            prepared = self.session.prepare(watch_path, source_folder, targets[0][1])
+            if prepared is not None:
+                self.prepared.put((prepared, targets, deadline))
+        self.prepared.put(_CLOSED)
+
+    def queue_ready(self, first):
+        """
+        Add the render jobs of the prepared timelines waiting, the caller holds Session.lock.
+        :param first: (PreparedTimeline, targets, deadline) already taken off the queue.
+        :return: True if the producer is done.
+        """
+        ready = [first]
+        while True:
+            try:
+                ready.append(self.prepared.get_nowait())
+            except queue.Empty:
+                break
+        closed = ready[-1] is _CLOSED
+        if closed:
+            ready.pop()
+        for prepared, targets, deadline in ready:
+            queued = [self.session.queue_prepared(prepared, presetname, output_path)
+                      for presetname, output_path in targets]
+            for idx in queued:
+                if idx:
+                    self.session.jobs.get(idx).deadline = deadline
+            if not all(queued):
+                self.failed.append(prepared.source)
+        return closed
+
+    def run(self):
+        """
+        Start the producer and render the prepared timelines until close() or stop().
+        :return: list of the job indexes rendered.
+        """
+        self._producer = threading.Thread(target=self.produce, daemon=True)
+        self._producer.start()
+        closed = False
+        while not closed and not self._stop.is_set():
+            first = self.prepared.get()
+            if first is _CLOSED:
+                break
+            started = None
+            while started is None and not self._stop.is_set():
+                with self.session.lock:
+                    # a render started elsewhere, e.g. from the GUI, no render jobs can be added until it is done
+                    if not self.session.is_rendering():
+                        closed = self.queue_ready(first)
+                        started = self.session.start_rendering()
+                if started is None:
+                    self._stop.wait(self.interval)
+            if started:
+                self.started += started
+                self.poller = self.session.status_poller(started, self.subscribers)
+                self.poller.run()
+        return self.started
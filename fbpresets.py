@@ -0,0 +1,57 @@
+"""
+Render preset catalogue.
+
+Fetches the project's render presets once and keeps them until the project changes or a refresh is asked for.
+Custom presets are told apart from Resolve's built-in ones by name, not by their position in the list, which moves
+between Resolve versions.
+"""
+
+# Built-in render presets of Resolve 16/17, the web platform presets are matched by their platform below.
+BUILTIN_PRESETS = frozenset([
+    'Custom', 'H.264 Master', 'H.265 Master', 'ProRes Master', 'HyperDeck', 'IMF', 'ID Master',
+    'Final Cut Pro 7', 'Final Cut Pro X', 'Premiere XML', 'AVID AAF', 'Pro Tools', 'Audio Only',
+])
+
+# Resolve names them '<platform> - <resolution>', e.g. 'YouTube - 1080p'. A user preset named 'Boxed 4K' is custom.
+BUILTIN_PLATFORMS = ('YouTube', 'Vimeo', 'Twitter', 'Dropbox', 'Frame.io', 'Box', 'Replay', 'TikTok')
+BUILTIN_PREFIXES = tuple(platform + ' - ' for platform in BUILTIN_PLATFORMS)
+
+
+def is_builtin(name, extra_builtins=()):
+    """
+    :param name: render preset name.
+    :param extra_builtins: more built-in names, for Resolve versions this list does not know about.
+    :return: True if the preset comes with Resolve.
+    """
+    return (name in BUILTIN_PRESETS or name in BUILTIN_PLATFORMS or name in extra_builtins or
+            name.startswith(BUILTIN_PREFIXES))
+
+
+class PresetCatalogue:
+    """
+    :param extra_builtins: preset names to treat as built-in on top of BUILTIN_PRESETS.
+    """
+
+    def __init__(self, extra_builtins=()):
+        self.extra_builtins = frozenset(extra_builtins)
+        self._project = None
+        self._names = None
+
+    def invalidate(self):
+        self._project = None
+        self._names = None
+
+    def names(self, proj, custom_only=False, refresh=False):
+        """
+        Preset names of the project, in Resolve's order.
+        :param proj: project object from Resolve API.
+        :param custom_only: if True, leave out Resolve's built-in presets.
+        :param refresh: if True, fetch from Resolve even if the project did not change.
+        :return: list of preset names.
+        """
+        if refresh or self._names is None or proj is not self._project:
+            self._names = list((proj.GetRenderPresets() or {}).values())
+            self._project = proj
+        if custom_only:
+            return [name for name in self._names if not is_builtin(name, self.extra_builtins)]
+        return list(self._names)
@@ -0,0 +1,214 @@
+"""
+Media pre-flight probe.
+
+Card dumps carry .DS_Store files, xml sidecars, PDFs and half-copied clips next to the media, and Resolve takes its
+time rejecting each of them. probe_file() tells media from the rest by the container header, the first bytes of the
+file. Formats without a magic number, e.g. TGA, or not in the list, are let through by their extension, unless the
+header is one of known junk. MediaProbe.filter() probes a whole import in a process pool and caches the results in
+SQLite by path, size and mtime, so a folder is only read once until its files change.
+"""
+import os
+import sqlite3
+import threading
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS probe_cache (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT
+)
+'''
+
+HEADER_SIZE = 400
+
+# ISO base media / QuickTime atom types that can open a file: .mov .mp4 .m4v .braw .crm .cr3 .3gp
+QUICKTIME_ATOMS = (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot', b'uuid')
+
+# (offset, magic bytes, kind), checked in order
+SIGNATURES = (
+    (0, b'\x06\x0e\x2b\x34\x02\x05\x01\x01', 'mxf'),
+    (0, b'\x1a\x45\xdf\xa3', 'matroska'),
+    (0, b'II*\x00', 'tiff'),
+    (0, b'MM\x00*', 'tiff'),
+    (0, b'SDPX', 'dpx'),
+    (0, b'XPDS', 'dpx'),
+    (0, b'\x76\x2f\x31\x01', 'exr'),
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'\x89PNG', 'png'),
+    (0, b'ARRI', 'arriraw'),
+    (4, b'RED1', 'r3d'),
+    (4, b'RED2', 'r3d'),
+    (0, b'\x00\x00\x01\xba', 'mpeg'),
+    (0, b'\x00\x00\x01\xb3', 'mpeg-video'),
+    (0, b'ID3', 'mp3'),
+    (0, b'fLaC', 'flac'),
+    (0, b'\x0b\x77', 'ac3'),
+    (0, b'\x80\x2a\x5f\xd7', 'cineon'),
+    (0, b'\xd7\x5f\x2a\x80', 'cineon'),
+    (0, b'8BPS', 'psd'),
+    (0, b'GIF8', 'gif'),
+    (0, b'BM', 'bmp'),
+)
+
+# headers of files that are never media, whatever their extension: PDF, zip, xml, html, rtf, .DS_Store, plists
+JUNK_SIGNATURES = (b'%PDF', b'PK\x03\x04', b'<?xml', b'<!DOCTYPE', b'<html', b'{\\rtf', b'\x00\x00\x00\x01Bud1',
+                   b'bplist')
+
+# extensions of formats Resolve imports that have no magic number, or one not listed above
+MEDIA_EXTENSIONS = frozenset([
+    '.tga', '.mp3', '.aac', '.m4a', '.wav', '.aif', '.aiff', '.ac3', '.ec3', '.flac', '.mpg', '.mpeg', '.m2v', '.vob',
+    '.mxf', '.mov', '.mp4', '.avi', '.mkv', '.webm', '.cin', '.dpx', '.exr', '.bmp', '.gif', '.psd', '.tif', '.tiff',
+    '.jpg', '.jpeg', '.png', '.dng', '.ari', '.r3d', '.braw', '.crm', '.cr3', '.mts', '.m2ts', '.ts', '.3gp', '.m4v',
+])
+
+# Probes below this many files run inline, starting the process pool costs more.
+POOL_THRESHOLD = 64
+
+
+def quicktime_complete(filehandle, size):
+    """
+    Walk the top level atoms, a clip still being copied has one that runs past the end of the file.
+    :param filehandle: file opened in binary mode.
+    :param size: file size.
+    :return: True if the atoms add up to the file size.
+    """
+    offset = 0
+    for _ in range(64):
+        if offset == size:
+            return True
+        filehandle.seek(offset)
+        atom = filehandle.read(16)
+        if len(atom) < 8:
+            return False
+        atom_size = int.from_bytes(atom[:4], 'big')
+        if atom_size == 1 and len(atom) == 16:
+            atom_size = int.from_bytes(atom[8:16], 'big')
+        elif atom_size == 0:
+            # the last atom runs to the end of the file
+            return True
+        if atom_size < 8 or offset + atom_size > size:
+            return False
+        offset += atom_size
+    # more atoms than a camera writes, don't read the whole file
+    return True
+
+
+def probe_file(path):
+    """
+    :param path: file path.
+    :return: container kind, e.g. 'quicktime' or 'mxf', or the extension, e.g. 'tga', for a media file recognised
+        by it. None if it is not media Resolve can import, is truncated, or unreadable.
+    """
+    try:
+        with open(path, 'rb') as filehandle:
+            header = filehandle.read(HEADER_SIZE)
+            if len(header) >= 8 and header[4:8] in QUICKTIME_ATOMS:
+                complete = quicktime_complete(filehandle, os.fstat(filehandle.fileno()).st_size)
+                return 'quicktime' if complete else None
+    except OSError:
+        return None
+    if len(header) < 8:
+        return None
+    if header[:4] in (b'RIFF', b'RF64'):
+        return {b'WAVE': 'wav', b'AVI ': 'avi'}.get(header[8:12])
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    for offset, magic, kind in SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return kind
+    # MPEG transport stream, 188 byte packets, or 192 with the 4 byte timecode of AVCHD .mts/.m2ts
+    if len(header) >= 377 and header[0] == header[188] == header[376] == 0x47:
+        return 'mpeg-ts'
+    if len(header) >= 389 and header[4] == header[196] == header[388] == 0x47:
+        return 'mpeg-ts'
+    # MPEG audio frame sync, an mp3 without ID3 tag, or ADTS AAC
+    if header[0] == 0xff and header[1] & 0xe0 == 0xe0:
+        return 'mpeg-audio'
+    if header.lstrip().startswith(JUNK_SIGNATURES):
+        return None
+    extension = os.path.splitext(path)[1].lower()
+    return extension[1:] if extension in MEDIA_EXTENSIONS else None
+
+
+def _probe_batch(paths):
+    return [probe_file(path) for path in paths]
+
+
+class MediaProbe:
+    """
+    :param db_path: SQLite database file, ':memory:' for a throwaway cache.
+    :param workers: probe processes, defaults to the CPU count.
+    """
+
+    def __init__(self, db_path=':memory:', workers=None):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {'cached': 0, 'probed': 0, 'rejected': 0}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        with self._lock:
+            self._db.close()
+
+    def _probe(self, paths):
+        if len(paths) < POOL_THRESHOLD or self.workers == 1:
+            return _probe_batch(paths)
+        if self._pool is None:
+            # imported here, like in fbcopy, the pool is only needed for big imports
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunk = -(-len(paths) // (self.workers * 4))
+        batches = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+        return [kind for kinds in self._pool.map(_probe_batch, batches) for kind in kinds]
+
+    def kinds(self, paths):
+        """
+        :param paths: file paths.
+        :return: dictionary of path -> container kind or None, files that vanished are left out.
+        """
+        stats = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (st.st_size, st.st_mtime_ns)
+
+        results = {}
+        with self._lock:
+            for path, (size, mtime_ns) in stats.items():
+                row = self._db.execute('SELECT size, mtime_ns, kind FROM probe_cache WHERE path = ?',
+                                       (path,)).fetchone()
+                if row and row[0] == size and row[1] == mtime_ns:
+                    results[path] = row[2]
+        self.stats['cached'] += len(results)
+
+        todo = [path for path in stats if path not in results]
+        if todo:
+            probed = dict(zip(todo, self._probe(todo)))
+            self.stats['probed'] += len(todo)
+            results.update(probed)
+            with self._lock:
+                self._db.executemany('INSERT OR REPLACE INTO probe_cache VALUES (?, ?, ?, ?)',
+                                     [(path, stats[path][0], stats[path][1], probed[path]) for path in todo])
+                self._db.commit()
+        return results
+
+    def filter(self, paths):
+        """
+        File filter for fbimport.mp_add_source.
+        :param paths: file paths.
+        :return: the paths that hold media, in the given order.
+        """
+        kinds = self.kinds(paths)
+        media = [path for path in paths if kinds.get(path)]
+        self.stats['rejected'] += len(paths) - len(media)
+        return media
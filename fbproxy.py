@@ -0,0 +1,81 @@
+"""
+Resolve API object proxies.
+
+fbmetrics times the Resolve API calls and fbserial serializes them, both with a proxy around the resolve handle that
+sees every method call and wraps the API objects the calls return, so every object of a session is covered from the
+resolve handle down. Proxy does the wrapping and unwrapping, its subclasses the one thing they do around a call, in
+_call(). Proxies stack, each one unwraps its own layer of the arguments.
+"""
+
+PLAIN_TYPES = (type(None), bool, int, float, str, bytes)
+
+
+def unwrap(value):
+    """
+    :param value: a call argument, may be a list, tuple or dictionary of proxies.
+    :return: the value with the outermost proxy layer taken off.
+    """
+    if isinstance(value, Proxy):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    if isinstance(value, dict):
+        return {key: unwrap(item) for key, item in value.items()}
+    return value
+
+
+class Proxy:
+    """
+    Proxy of a Resolve API object. Arguments are unwrapped before they reach Resolve, returned objects are wrapped in
+    a proxy of the same kind, see _proxy().
+    Two proxies of the same object compare equal, 'is' does not hold between them.
+    """
+    __slots__ = ('_target',)
+
+    def __init__(self, target):
+        self._target = target
+
+    def _call(self, name, method, args):
+        """
+        The hook around every method call.
+        :param name: method name.
+        :param method: the bound method of the target.
+        :param args: the unwrapped arguments.
+        :return: what the method returns.
+        """
+        return method(*args)
+
+    def _proxy(self, target, name):
+        """
+        :param target: API object returned by a call.
+        :param name: the method that returned it.
+        :return: a proxy of target, like this one.
+        """
+        raise NotImplementedError
+
+    def _wrap(self, value, name):
+        if isinstance(value, PLAIN_TYPES):
+            return value
+        if isinstance(value, list):
+            return [self._wrap(item, name) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item, name) for key, item in value.items()}
+        return self._proxy(value, name)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args):
+            return self._wrap(self._call(name, attribute, unwrap(args)), name)
+        return call
+
+    def __eq__(self, other):
+        return self._target == unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __bool__(self):
+        return bool(self._target)
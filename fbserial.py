@@ -0,0 +1,44 @@
+"""
+Serialized Resolve API calls.
+
+The scripting API is one connection to Resolve, made for one script at a time. footbrake calls it from more than one
+thread: the render status poller, the pipeline's producer importing while the consumer adds render jobs, the GUI.
+serialize() wraps a Resolve handle in a proxy that makes every method call hold one lock, and wraps the API objects
+the calls return, so every object of a session shares the session's lock.
+
+The lock only keeps two calls from overlapping. A sequence of calls that depends on Resolve's current project or
+timeline, making a timeline or adding a render job, holds Session.lock around the whole of it as well.
+"""
+from fbproxy import Proxy
+
+
+def serialize(handle, lock):
+    """
+    :param handle: Resolve API object, may be an fbmetrics.Instrumented proxy.
+    :param lock: threading.RLock every call holds, reentrant, an API call may come from a callback inside another.
+    :return: a serialized proxy of the handle, the handle itself if it is None or serialized already.
+    """
+    if handle is None or isinstance(handle, Serialized):
+        return handle
+    return Serialized(handle, lock)
+
+
+class Serialized(Proxy):
+    """
+    Proxy of a Resolve API object that holds the lock around every method call, see fbproxy.Proxy.
+    """
+    __slots__ = ('_lock',)
+
+    def __init__(self, target, lock):
+        super().__init__(target)
+        self._lock = lock
+
+    def _call(self, name, method, args):
+        with self._lock:
+            return method(*args)
+
+    def _proxy(self, target, name):
+        return Serialized(target, self._lock)
+
+    def __repr__(self):
+        return f'Serialized({self._target!r})'
@@ -0,0 +1,169 @@
+"""
+Project sharding.
+
+Resolve slows down once a media pool holds tens of thousands of clips, every API call on the project pays for it.
+ShardManager spreads the imports over auto-created projects, each one capped by clip and bin count. A shard keeps its
+own JobRegistry, since Resolve numbers render jobs per project, and rendering goes shard by shard: load the project,
+render its jobs, move on to the next one.
+"""
+import datetime
+import os
+
+from fbjobs import JobRegistry
+
+
+class Shard:
+    __slots__ = ('name', 'clips', 'bins', 'jobs')
+
+    def __init__(self, name):
+        self.name = name
+        self.clips = 0
+        self.bins = 0
+        self.jobs = JobRegistry()
+
+    def __repr__(self):
+        return f'Shard({self.name!r}, {self.clips} clips, {self.bins} bins, {len(self.jobs)} jobs)'
+
+
+def count_source(fpath, walk=os.walk):
+    """
+    :param fpath: source folder path.
+    :param walk: os.walk compatible function.
+    :return: (files, bins) an import of the folder would add, the folder's own bin included.
+    """
+    files = 0
+    bins = 1
+    for root, dirs, filenames in walk(fpath):
+        files += len(filenames)
+        bins += len(dirs)
+    return files, bins
+
+
+class ShardManager:
+    """
+    :param session: fbcore.Session, its project, media pool and job registry are switched to the shard in use.
+    :param max_clips: clips per project before a new one is started.
+    :param max_bins: bins per project before a new one is started.
+    :param prefix: project name suffix, the projects are named '%timestamp%_<prefix>_<shard number>'.
+    """
+
+    def __init__(self, session, max_clips=20000, max_bins=500, prefix='Transcode'):
+        self.session = session
+        self.max_clips = max_clips
+        self.max_bins = max_bins
+        self.prefix = prefix
+        self.shards = []
+        self.current = None
+        self._stopped = False
+
+    def has_room(self, shard, clips, bins):
+        """
+        An empty shard always has room, a source folder bigger than the caps gets a project of its own.
+        """
+        if not shard.clips and not shard.bins:
+            return True
+        return shard.clips + clips <= self.max_clips and shard.bins + bins <= self.max_bins
+
+    def new_shard(self):
+        """
+        Create a project for a new shard and switch to it.
+        :return: the Shard, None if Resolve could not create the project.
+        """
+        name = f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{self.prefix}_{len(self.shards) + 1:02d}"
+        session = self.session
+        session.pm.SaveProject()
+        proj = session.pm.CreateProject(name)
+        if not proj:
+            return None
+        shard = Shard(name)
+        self.shards.append(shard)
+        self.current = shard
+        session.proj = proj
+        session.mp = proj.GetMediaPool()
+        session.jobs = shard.jobs
+        return shard
+
+    def switch(self, shard):
+        """
+        Load the shard's project, if it is not the one open.
+        :return: True if the shard is open now.
+        """
+        session = self.session
+        if shard is not self.current:
+            session.pm.SaveProject()
+            proj = session.pm.LoadProject(shard.name)
+            if not proj:
+                return False
+            session.proj = proj
+            session.mp = proj.GetMediaPool()
+            self.current = shard
+        session.jobs = shard.jobs
+        return True
+
+    def shard_for(self, clips, bins):
+        """
+        :return: the open shard if the import fits, otherwise a new one. None if no project could be opened.
+        """
+        if self.current is not None and self.has_room(self.current, clips, bins) and self.switch(self.current):
+            return self.current
+        return self.new_shard()
+
+    def prepare(self, watch_path, source_folder, output_path, output_paths=None):
+        """
+        Same as Session.prepare, into the shard the folder fits in, its render jobs are added with
+        Session.queue_prepared.
+        A failed import is not tried again in a new project, the way Session.prepare does: the job would sit in a
+        project the shard does not know, and never render. Only shard_for() starts projects.
+        :return: PreparedTimeline, None if there is nothing to render.
+        """
+        clips, bins = count_source(os.path.join(watch_path, source_folder), self.session.walk)
+        shard = self.shard_for(clips, bins)
+        if shard is None:
+            self.session.notify('Failed to create a new project, check Resolve.')
+            return None
+        prepared = self.session.prepare(watch_path, source_folder, output_path, allow_new_project=False,
+                                        output_paths=output_paths)
+        if prepared is not None:
+            shard.clips += clips
+            shard.bins += bins
+        return prepared
+
+    def import_and_queue(self, watch_path, source_folder, presetname, output_path):
+        """
+        Same as Session.import_and_queue, into the shard the folder fits in.
+        :return: the new job index, None if nothing was queued.
+        """
+        prepared = self.prepare(watch_path, source_folder, output_path)
+        return None if prepared is None else self.session.queue_prepared(prepared, presetname, output_path)
+
+    def pending(self):
+        """
+        :return: list of (shard, pending job indexes) for the shards with jobs left to render.
+        """
+        return [(shard, shard.jobs.pending_ids()) for shard in self.shards if shard.jobs.pending_ids()]
+
+    def render(self, subscribers=()):
+        """
+        Render the pending jobs of every shard, one project after the other, and wait for them.
+        :param subscribers: render status poller callbacks(changes, statuses), see Session.status_poller.
+        :return: list of (shard, job indexes rendered).
+        """
+        rendered = []
+        self._stopped = False
+        for shard, pending_ids in self.pending():
+            if self._stopped:
+                break
+            if not self.switch(shard):
+                self.session.notify(f'Cannot open project {shard.name}, its jobs are not rendered.')
+                continue
+            started = self.session.start_rendering()
+            if started:
+                self.session.status_poller(started, subscribers).run()
+                rendered.append((shard, started))
+        return rendered
+
+    def stop(self):
+        """
+        Stop render() from moving on to the next shard, the project rendering now is stopped by the caller.
+        """
+        self._stopped = True
@@ -0,0 +1,94 @@
+"""
+Timeline builder.
+
+Collects the whole bin tree once and appends every clip with a single AppendToTimeline call. Bin markers are placed
+at the end of the timeline item of each bin's last clip, from the items the append returns, one GetEnd call per bin.
+Right after an import the bin tree and its clips are already known from the ImportReport, then building the timeline
+takes five API calls when markers are off.
+"""
+
+
+def get_all_subfolders(mp_folder):
+    """
+    Returns a list of all sub folders/bins objects inside the provided folder object, parents before their children,
+    the same order as os.walk imports them in. One GetSubFolders call per folder.
+    :param mp_folder: Resolve media pool folder object
+    :return: a list of all the sub folders' folder object.
+    """
+    folderlist = []
+    for sub_folder in mp_folder.GetSubFolders().values():
+        folderlist.append(sub_folder)
+        folderlist += get_all_subfolders(sub_folder)
+    return folderlist
+
+
+def clip_frames(clip):
+    """
+    :param clip: media pool item.
+    :return: the clip's length in frames, 0 if Resolve does not know it.
+    """
+    try:
+        return int(clip.GetClipProperty('Frames'))
+    except (TypeError, ValueError):
+        return 0
+
+
+def bin_end_frames(timeline, bin_clips, items):
+    """
+    :param timeline: timeline object the clips were appended to.
+    :param bin_clips: list of (bin, [clips]) in timeline order.
+    :param items: timeline items AppendToTimeline returned for the clips.
+    :return: list of (bin, frame after its last clip, relative to the timeline start) for the bins with clips.
+    """
+    ends = []
+    if isinstance(items, dict):
+        items = [items[k] for k in sorted(items)]
+    if items and len(items) == sum(len(clips) for bin, clips in bin_clips):
+        start = timeline.GetStartFrame()
+        last = -1
+        for bin, clips in bin_clips:
+            if clips:
+                last += len(clips)
+                ends.append((bin, items[last].GetEnd() - start))
+        return ends
+    # Resolve left clips out, the items don't line up with the bins, count the frames of every clip instead
+    position = 0
+    for bin, clips in bin_clips:
+        if clips:
+            position += sum(clip_frames(clip) for clip in clips)
+            ends.append((bin, position))
+    return ends
+
+
+def make_timeline_with_folder(mp_folder, notes, timeline_notes_flag, media_pool, bin_clips=None):
+    """
+      Makes a timeline with all clips in a Resolve media pool bin and its sub-bins.
+    :param mp_folder: media pool bin object from Resolve's API.
+    :param notes: note string for makers.
+    :param timeline_notes_flag: if True,  each bin/sub-bin will be marked on the timeline, at its last clip.
+        Costs a GetEnd call per bin, see bin_end_frames.
+    :param media_pool: medida pool object from Resolve's API.
+    :param bin_clips: list of (bin, [clips]) in timeline order, e.g. ImportReport.bin_clips, if None, collected from
+        the bin tree.
+    :return: Resolve object of the newly created timeline, None if it could not be created.
+    """
+    mp_folder_name = mp_folder.GetName()
+    if bin_clips is None:
+        bin_clips = [(bin, list(bin.GetClips().values())) for bin in [mp_folder] + get_all_subfolders(mp_folder)]
+
+    # initialize timeline in the root bin
+    media_pool.SetCurrentFolder(media_pool.GetRootFolder())
+    new_timeline = media_pool.CreateEmptyTimeline(mp_folder_name)
+    if not new_timeline:
+        return None
+    all_clips = [clip for bin, clips in bin_clips for clip in clips]
+    items = media_pool.AppendToTimeline(all_clips) if all_clips else None
+
+    '''Below adds a marker at the last clip of each bin if required.
+    (because note function is written for another tool, don't see too much use here, thus the note parameter is
+    not exposed to the GUI)'''
+    if timeline_notes_flag and all_clips:
+        for bin, position in bin_end_frames(new_timeline, bin_clips, items):
+            name = mp_folder_name if bin == mp_folder else bin.GetName()
+            new_timeline.AddMarker(position, 'Green', name, notes, 1)
+    return new_timeline
@@ -0,0 +1,231 @@
+"""
+Render output verification.
+
+When a job completes, Verifier checks its deliverable in a worker thread while the next jobs render: every source
+clip needs its render in the output path, found by file name, non-empty and with a complete container (see
+fbprobe.probe_file, a truncated QuickTime file fails). A render of the whole timeline into one file is found by the
+timeline name. The outputs are checksummed, xxHash64 if the xxhash package is installed, MD5 otherwise, and the
+checksums are written next to the deliverable as <timeline>.xxh64 or <timeline>.md5, in the format xxhsum -c and
+md5sum -c read.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+from fbincremental import output_dir
+from fbprobe import probe_file
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+CHUNK_SIZE = 1 << 20
+
+# FAT/exFAT and some network shares only store mtime with 2 second precision, see fbcopy.
+MTIME_TOLERANCE = 2.0
+
+# files in the output path that are not renders
+IGNORED_EXTENSIONS = ('.xml', '.fcpxml', '.aaf', '.edl', '.md5', '.xxh64', '.json')
+
+# job: fbjobs.Job. expected: renders looked for. outputs: list of (path, checksum) of the renders found.
+# missing: source clips without a render. bad: list of (path, reason) of renders that are empty or truncated.
+# manifest: checksum file written, None if there was nothing to write.
+VerifyReport = namedtuple('VerifyReport', ['job', 'expected', 'outputs', 'missing', 'bad', 'manifest', 'seconds'])
+
+
+def checksum_algorithm():
+    """
+    :return: 'xxh64' if the xxhash package is installed, 'md5' otherwise.
+    """
+    return 'xxh64' if xxhash is not None else 'md5'
+
+
+def checksum_file(path, algorithm=None):
+    """
+    :param path: file path.
+    :param algorithm: 'xxh64' or 'md5', defaults to checksum_algorithm().
+    :return: hex digest, read in 1 MB chunks.
+    """
+    algorithm = algorithm or checksum_algorithm()
+    digest = xxhash.xxh64() if algorithm == 'xxh64' else hashlib.md5()
+    with open(path, 'rb') as filehandle:
+        for chunk in iter(lambda: filehandle.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_outputs(output_path):
+    """
+    :param output_path: render target folder.
+    :return: dictionary of file name without extension -> paths of the renders under the output path.
+    """
+    index = {}
+    for root, dirs, files in os.walk(output_path):
+        for name in files:
+            stem, extension = os.path.splitext(name)
+            if not name.startswith('.') and extension.lower() not in IGNORED_EXTENSIONS:
+                index.setdefault(stem, []).append(os.path.join(root, name))
+    return index
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def find_outputs(sources, output_path, timeline_name, levels=None, since=None):
+    """
+    Match the source clips to their renders.
+    :param sources: source clip paths of the job.
+    :param output_path: render target folder.
+    :param timeline_name: the job's timeline, the name of a single file render.
+    :param levels: 'Preserve source directory levels' if known, the render is looked for where Resolve puts it.
+    :param since: Unix time the job started rendering, older files of the same name are an earlier job's renders.
+    :return: (list of render paths, list of source clips without one).
+    """
+    index = index_outputs(output_path)
+    if since is not None:
+        index = {stem: [path for path in paths if _mtime(path) >= since - MTIME_TOLERANCE]
+                 for stem, paths in index.items()}
+    outputs = []
+    missing = []
+    for source in sources:
+        candidates = index.get(os.path.splitext(os.path.basename(source))[0], [])
+        if levels is not None:
+            directory = output_dir(output_path, source, levels)
+            candidates = [path for path in candidates if os.path.dirname(path) == directory]
+        if candidates:
+            # the same clip name on two cards, the latest render is this job's
+            outputs.append(max(candidates, key=_mtime))
+        else:
+            missing.append(source)
+    if missing and not outputs and index.get(timeline_name):
+        # the preset renders the timeline into a single clip
+        return [max(index[timeline_name], key=_mtime)], []
+    return outputs, missing
+
+
+def check_output(path):
+    """
+    :return: None if the render looks whole, otherwise the reason it does not.
+    """
+    try:
+        if os.path.getsize(path) == 0:
+            return 'empty'
+    except OSError as e:
+        return str(e)
+    if probe_file(path) is None:
+        return 'truncated or unknown container'
+    return None
+
+
+def verify_job(job, timeline_name, sources, levels=None, algorithm=None):
+    """
+    Verify the deliverable of a completed job and write its checksum manifest.
+    :param job: fbjobs.Job.
+    :param timeline_name: the job's timeline name.
+    :param sources: the source clip paths rendered.
+    :param levels: 'Preserve source directory levels' if known.
+    :param algorithm: 'xxh64' or 'md5', defaults to checksum_algorithm().
+    :return: VerifyReport.
+    """
+    start = time.perf_counter()
+    algorithm = algorithm or checksum_algorithm()
+    paths, missing = find_outputs(sources, job.output_path, timeline_name, levels, job.started)
+    outputs = []
+    bad = []
+    for path in paths:
+        reason = check_output(path)
+        if reason is None:
+            try:
+                outputs.append((path, checksum_file(path, algorithm)))
+                continue
+            except OSError as e:
+                reason = str(e)
+        bad.append((path, reason))
+    manifest = None
+    if outputs:
+        manifest = os.path.join(job.output_path, f'{timeline_name}.{algorithm}')
+        try:
+            with open(manifest, 'w') as filehandle:
+                for path, checksum in sorted(outputs):
+                    filehandle.write(f'{checksum}  {os.path.relpath(path, job.output_path)}\n')
+        except OSError as e:
+            bad.append((manifest, str(e)))
+            manifest = None
+    return VerifyReport(job, len(paths) + len(missing), outputs, missing, bad, manifest, time.perf_counter() - start)
+
+
+def print_report(report):
+    """
+    Print a VerifyReport, on_report for the GUI and the watch folder daemon.
+    :return: none
+    """
+    job = report.job
+    print(f'{job.source}: {len(report.outputs)} of {report.expected} renders verified in {report.seconds:.1f} s, '
+          f'{len(report.missing)} missing, {len(report.bad)} bad' +
+          (f', checksums in {report.manifest}' if report.manifest else '') + '.')
+    for source in report.missing:
+        print(f'  no render of {source}')
+    for path, reason in report.bad:
+        print(f'  {path}: {reason}')
+
+
+class Verifier:
+    """
+    Verifies completed jobs in a thread pool.
+    :param workers: jobs verified at the same time.
+    :param on_report: function(VerifyReport) called from the worker thread when a job is verified.
+    :param algorithm: 'xxh64' or 'md5', defaults to checksum_algorithm().
+    """
+
+    def __init__(self, workers=2, on_report=None, algorithm=None):
+        self.workers = workers
+        self.on_report = on_report
+        self.algorithm = algorithm or checksum_algorithm()
+        self._pool = None
+        # submit() runs on the render status poller's thread, wait() on another
+        self._lock = threading.Lock()
+        self._futures = []
+
+    def submit(self, job, timeline_name, sources, levels=None):
+        """
+        Queue a completed job for verification.
+        :return: Future of the VerifyReport.
+        """
+        with self._lock:
+            if self._pool is None:
+                # imported here, like in fbcopy, the pool is only needed once a job completes
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            future = self._pool.submit(self._verify, job, timeline_name, sources, levels)
+            # only the ones still running are kept for wait()
+            self._futures = [pending for pending in self._futures if not pending.done()] + [future]
+        return future
+
+    def _verify(self, job, timeline_name, sources, levels):
+        report = verify_job(job, timeline_name, sources, levels, self.algorithm)
+        if self.on_report is not None:
+            self.on_report(report)
+        return report
+
+    def wait(self):
+        """
+        Block until every job submitted so far is verified, the reports go to on_report.
+        :return: none
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,291 @@
+"""
+Watch folder monitor for the headless daemon mode.
+
+New source folders appearing in the watch path are followed until their size and mtime stop changing for a settle
+window, then reported as ready. On Linux it sleeps on inotify, only the watch root and the subtrees of the folders
+still being copied are watched. Elsewhere, or when inotify is not available, it lists the watch root every
+poll_interval seconds and only walks the folders still being copied.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+ROOT_MASK = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+FOLDER_MASK = IN_CREATE | IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed', path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read(self, timeout=None):
+        """
+        Wait for events.
+        :param timeout: seconds, None to block until something happens.
+        :return: list of (wd, mask, name) tuples, empty on timeout.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def folder_signature(path):
+    """
+    Size and mtime summary of a folder tree.
+    :param path: folder path in OS.
+    :return: tuple of (file count, total bytes, newest mtime), None if the folder is gone.
+    """
+    count = size = 0
+    newest = 0.0
+    try:
+        newest = os.stat(path).st_mtime
+    except OSError:
+        return None
+    for root, dirs, files in os.walk(path):
+        for name in dirs:
+            try:
+                newest = max(newest, os.stat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                # removed or renamed while walking, still settling
+                continue
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            newest = max(newest, st.st_mtime)
+            count += 1
+            size += st.st_size
+    return count, size, newest
+
+
+class Candidate:
+    __slots__ = ('name', 'signature', 'last_change', 'watches')
+
+    def __init__(self, name, now):
+        self.name = name
+        self.signature = None
+        self.last_change = now
+        self.watches = []
+
+
+class FolderWatcher:
+    """
+    Report source folders that appear in watch_path once they stop changing.
+    :param watch_path: the watch folder.
+    :param settle: seconds a folder's size and mtime have to stay the same before it is ready.
+    :param poll_interval: seconds between scans when polling.
+    :param use_inotify: True/False to force a mode, None to use inotify where available.
+    :param include_existing: if True, folders already in watch_path at start are reported too.
+    """
+
+    def __init__(self, watch_path, settle=30.0, poll_interval=5.0, use_inotify=None, include_existing=False,
+                 clock=time.monotonic):
+        self.watch_path = watch_path
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.candidates = {}
+        self.known = set() if include_existing else set(self._list_root())
+        self._inotify = None
+        self._root_wd = None
+        self._wd_folder = {}
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux')
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._root_wd = self._inotify.add_watch(watch_path, ROOT_MASK)
+            except (OSError, AttributeError):
+                # no inotify in this libc, or out of watches, fall back to polling
+                self._inotify = None
+        for name in self._list_root():
+            if name not in self.known:
+                self._add_candidate(name)
+
+    @property
+    def mode(self):
+        return 'inotify' if self._inotify else 'polling'
+
+    def _list_root(self):
+        try:
+            return [entry.name for entry in os.scandir(self.watch_path)
+                    if entry.is_dir() and not entry.name.startswith('.')]
+        except OSError:
+            return []
+
+    def _add_candidate(self, name):
+        candidate = Candidate(name, self.clock())
+        self.candidates[name] = candidate
+        if self._inotify:
+            for root, dirs, files in os.walk(os.path.join(self.watch_path, name)):
+                self._watch_dir(candidate, root)
+
+    def _watch_dir(self, candidate, path):
+        try:
+            wd = self._inotify.add_watch(path, FOLDER_MASK)
+        except OSError:
+            return
+        candidate.watches.append(wd)
+        self._wd_folder[wd] = (candidate.name, path)
+
+    def _drop_candidate(self, name):
+        candidate = self.candidates.pop(name, None)
+        if candidate and self._inotify:
+            for wd in candidate.watches:
+                if self._wd_folder.pop(wd, None):
+                    self._inotify.rm_watch(wd)
+
+    def _handle_events(self, events):
+        now = self.clock()
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, treat every candidate as changed and catch up on the root
+                for candidate in self.candidates.values():
+                    candidate.last_change = now
+                self._rescan_root()
+            elif wd == self._root_wd:
+                if not mask & IN_ISDIR or name.startswith('.'):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in self.known and name not in self.candidates:
+                    self._add_candidate(name)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_candidate(name)
+                    self.known.discard(name)
+            elif wd in self._wd_folder:
+                if mask & IN_IGNORED:
+                    self._wd_folder.pop(wd, None)
+                    continue
+                folder, path = self._wd_folder[wd]
+                candidate = self.candidates.get(folder)
+                if candidate is None:
+                    continue
+                candidate.last_change = now
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    for root, dirs, files in os.walk(os.path.join(path, name)):
+                        self._watch_dir(candidate, root)
+
+    def _rescan_root(self):
+        names = set(self._list_root())
+        for name in names - self.known - set(self.candidates):
+            self._add_candidate(name)
+        for name in set(self.candidates) - names:
+            self._drop_candidate(name)
+        self.known &= names
+
+    def _check_candidates(self):
+        """
+        Check the candidates that have been quiet for the settle window.
+        :return: list of folder names that are ready.
+        """
+        ready = []
+        now = self.clock()
+        for candidate in list(self.candidates.values()):
+            # with inotify a folder is only walked once it went quiet, when polling it is walked every interval
+            if self._inotify and now - candidate.last_change < self.settle:
+                continue
+            signature = folder_signature(os.path.join(self.watch_path, candidate.name))
+            if signature is None:
+                self._drop_candidate(candidate.name)
+            elif signature != candidate.signature:
+                candidate.signature = signature
+                candidate.last_change = now
+                if self._inotify:
+                    # the tree went quiet, confirm with a second walk after poll_interval instead of a full window
+                    # (writes from other machines to a network share do not show up as inotify events)
+                    candidate.last_change -= max(0.0, self.settle - self.poll_interval)
+            elif now - candidate.last_change >= self.settle:
+                self._drop_candidate(candidate.name)
+                self.known.add(candidate.name)
+                ready.append(candidate.name)
+        return ready
+
+    def _next_deadline(self):
+        if not self._inotify:
+            return self.poll_interval
+        if not self.candidates:
+            return None
+        return max(0.0, min(c.last_change for c in self.candidates.values()) + self.settle - self.clock())
+
+    def poll(self, timeout=None):
+        """
+        Wait for folders to become ready.
+        :param timeout: longest time to wait in seconds, None to wait until a folder is ready.
+        :return: list of ready folder names, may be empty when timeout is reached.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self._next_deadline()
+            if deadline is not None:
+                remaining = max(0.0, deadline - self.clock())
+                wait = remaining if wait is None else min(wait, remaining)
+            if self._inotify:
+                self._handle_events(self._inotify.read(wait))
+            else:
+                time.sleep(wait)
+                self._rescan_root()
+            ready = self._check_candidates()
+            if ready or (deadline is not None and self.clock() >= deadline):
+                return ready
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
@@ -1,166 +1,65 @@
-import PySimpleGUI as sg
-import os
-import shutil
-import datetime
 import time
-import yaml
-import threading
-from python_get_resolve import GetResolve
-
-
-def mp_add_source(fpath, add_files_flag, media_pool, media_storage):
-    """
-        add source clips to Resolve.
-    :param fpath: footage folder path in OS.
-    :param add_files_flag: if True,add folders and files, if Fasle, add folder structure only.
-    :param media_pool: media pool object from Resolve API.
-    :param media_storage: media storage object from Resolve API.
-    :return: none
-    """
-    folder_handles = []
-    i = 1
-    for root, dirs, files in os.walk(fpath):
-        # walk the folders
-        if dirs:
-            sub_temp = []
-            cf = media_pool.GetCurrentFolder()
-            # remember handle of current mediapool root
-            for dir in dirs:
-                sub_temp.append(media_pool.AddSubFolder(cf, dir))
-            media_pool.SetCurrentFolder(cf)
-            # AddSubFolder changes currentfolder to new added, return to cf
-            if add_files_flag:
-                for file in files:
-                    media_storage.AddItemsToMediaPool(os.path.join(root, file))
-            media_pool.SetCurrentFolder(sub_temp[0])
-            # change current folder to the next root folder os.walk() returns, which is sub_temp[0]
-            folder_handles.extend(sub_temp)
-            # store sub folders handles to the list
-        if not dirs:
-            # if subfolder does not exist, move on to the next folder in the folder_handles list
-
-            # add the files  first
-            if add_files_flag:
-                for file in files:
-                    media_storage.AddItemsToMediaPool(os.path.join(root, file))
-
-            # if next folder exist, change to next folder
-            try:
-                if folder_handles[i]:
-                    media_pool.SetCurrentFolder(folder_handles[i])
-                    i += 1
-            except IndexError:
-                pass
-
-
-def get_all_subfolders(mp_folder):
-    """
-    Returns a list of all sub folders/bins objects inside the provided folder object.
-    :param mp_folder: Resolve media pool folder object
-    :return: a list of all the sub folders' folder object.
-    """
-    folderlist = []
-    folderlist += mp_folder.GetSubFolders().values()
-    for sub_folder in mp_folder.GetSubFolders().values():
-        folderlist += get_all_subfolders(sub_folder)
-    return folderlist
-
-
-def make_timeline_with_folder(mp_folder, notes, timeline_notes_flag, media_pool):
-    """
-      Makes a timeline with all clips in a Resolve media pool bin;
-    :param mp_folder: media pool bin object from Resolve's API.
-    :param notes: note string for makers.
-    :param timeline_notes_flag: if True,  each bin/sub-bin will be marked on the timeline.
-    :param media_pool: medida pool object from Resolve's API.
-    :return: Resolve object of the newly created timeline.
-    """
-    mp_folder_name = mp_folder.GetName()
-
-    # initialize timeline and marker
-    media_pool.SetCurrentFolder(media_pool.GetRootFolder())
-    new_timeline = media_pool.CreateEmptyTimeline(mp_folder_name)
-    media_pool.SetCurrentFolder(mp_folder)
-    media_pool.AppendToTimeline(list(mp_folder.GetClips().values()))
-
-    if timeline_notes_flag:
-        new_timeline.AddMarker(new_timeline.GetEndFrame() - new_timeline.GetStartFrame(),
-                               'Green', mp_folder_name, notes, 1)
-
-    '''Below adds clips inside bin to timeline, and adds marker at the last clip of each bin if required.
-    (because note function is written for another tool, don't see too much use here, thus the note parameter is
-    not exposed to the GUI)'''
-
-    bin_list = get_all_subfolders(mp_folder)
-    for bin in bin_list:
-        clips_in_this_subfolder = []
-        for clip in bin.GetClips().values():
-            clips_in_this_subfolder.append(clip)
-            # Get all clip objects
-        media_pool.AppendToTimeline(clips_in_this_subfolder)
-        if timeline_notes_flag:
-            new_timeline.AddMarker(new_timeline.GetEndFrame() - new_timeline.GetStartFrame(),
-                                   'Green', bin.GetName(), notes, 1)
-    return new_timeline
-
-
-def yaml_load(filepath):
-    """
-    Load data from yaml file.
-    :param filepath: the yaml file path.
-    :return: yaml data, if failed to load will return empty dictionary.
-    """
-    try:
-        with open(filepath, 'r') as filehandle:
-            try:
-                data = yaml.load(filehandle, Loader=yaml.SafeLoader)
-            except:
-                data = {}
-    except:
-        data = {}
-    return data
-
-
-def yaml_dump(data, filepath):
-    with open(filepath, 'w') as filehandle:
-        try:
-            yaml.dump(data, filehandle)
-        except:
-            pass
 
+_import_start = time.perf_counter()
 
-def yaml_config_write():
-    """
-    Writes config file.
+import atexit
+import os
+import threading
+import argparse
+import fbcore
+import fbmetrics
+from fbactions import ActionBus, print_action_report
+from fbcore import status_row
+from fbeta import ORDERS, format_batch_eta
+from fbdedup import DedupIndex
+from fbhistory import RenderHistory
+from fbindex import ScanIndex
+from fbpipeline import RenderPipeline
+from fbprobe import MediaProbe
+from fbverify import Verifier, print_report
+from fbconfig import ConfigStore
+from fbshard import ShardManager
+
+fbcore.timings['core import'] = time.perf_counter() - _import_start
+
+# PySimpleGUI is imported when the window is built, the --watch daemon never loads it.
+sg = None
+
+# event the render status poller threads post the changed table rows with, see on_render_status
+STATUS_EVENT = '-STATUS-'
+
+
+def notify(message, title=None):
+    """
+    Tell the user something in a popup.
+    :param message: message text.
+    :param title: popup title.
     :return: none
     """
-    yaml_dump(config, os.path.join(config_path, 'config.yaml'))
+    sg.Popup(message, title=title)
 
 
-def get_render_presets():
+def get_render_presets(refresh=False):
     """
-    Get render presets from Resolve's API.
-    On my mac, custom render presets is from No.19 and on, if it differs on your system, you may see some presets missing.
-    Just need to figure out your magic number by running:
-    print(proj.GetRenderPresets())
-    And replace the 19 with it.
+    Get render presets from the preset catalogue, it only asks Resolve again when the project changed.
+    Custom presets are found by comparing against Resolve's built-in preset names. If your Resolve version has
+    built-in presets that show up as custom, list them under 'Built-in presets' in config.yaml.
+    :param refresh: if True, fetch the presets from Resolve again.
     :return: none
     """
     global preset_list
-    if custom_preset_flag:
-        preset_list = list(proj.GetRenderPresets().values())[19:len(proj.GetRenderPresets())]
-    else:
-        preset_list = list(proj.GetRenderPresets().values())[0:len(proj.GetRenderPresets())]
+    preset_list = session.render_presets(custom_preset_flag, refresh)
 
 
-def refresh_presets():
+def refresh_presets(refresh=False):
     """
     Update the presets list in the GUI.
+    :param refresh: if True, fetch the presets from Resolve again.
     :return: none
     """
     global preset_list
     global latest_preset
-    get_render_presets()
+    get_render_presets(refresh)
     window['RENDERPRESET'](preset_list)
     # restore previously selected preset after refresh
     if latest_preset in preset_list:
@@ -176,427 +75,458 @@ def refresh_folders(watch_path):
     :param watch_path: the latest watch folder path.
     :return: none
     """
-    path_list = []
-    for item in os.listdir(watch_path):
-        if os.path.isdir(os.path.join(watch_path, item)) and not item.startswith('.'):
-            path_list.append(item)
-    window['SOURCEPATHS'](path_list)
-
+    window['SOURCEPATHS'](session.source_folders(watch_path))
+
+
+class StatusTable:
+    """
+    The render queue table, only ever touched from the GUI thread.
+    Rows are merged in as they come, and written to the table at most max_rate times a second. While the same jobs
+    are shown, the rows whose status changed are updated in place, in the Tk Treeview under the sg.Table, they keep
+    their row colours and the selection, and a redraw stays cheap with hundreds of jobs. Once a job is added or
+    removed, the table is written again with sg.Table.update().
+    :param table: sg.Table element of a finalized window.
+    :param eta_text: sg.Text element showing the batch ETA.
+    :param max_rate: redraws per second at most, 0 for no limit.
+    """
+
+    def __init__(self, table, eta_text, max_rate=5.0):
+        self.table = table
+        self.eta_text = eta_text
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        # (shard, job index) -> row, and the keys and rows in table order as shown
+        self.rows = {}
+        self.order = []
+        self.values = []
+        # (shard, job index) -> row to show, None to remove it, waiting for the next redraw
+        self.pending = {}
+        self.pending_eta = None
+        self.last_draw = 0.0
+        # the placeholder row the table was made with
+        self.table.update(values=[])
+
+    def merge(self, rows, batch_eta):
+        """
+        :param rows: dictionary of (shard, job index) -> row, None to remove the job's row. See table_shard.
+        :param batch_eta: text of the batch ETA.
+        :return: none
+        """
+        self.pending.update(rows)
+        self.pending_eta = batch_eta
+
+    def timeout(self):
+        """
+        :return: milliseconds until the next redraw is due, None if there is nothing to draw, for window.read().
+        """
+        if not self.pending and self.pending_eta is None:
+            return None
+        return max(0, int((self.last_draw + self.interval - time.perf_counter()) * 1000))
+
+    def draw(self, force=False):
+        """
+        Write the merged rows to the table, if the redraw is due.
+        :param force: redraw now, e.g. after the table is cleared.
+        :return: none
+        """
+        wait = self.timeout()
+        if wait is None or (wait and not force):
+            return
+        for k, row in self.pending.items():
+            if row is not None:
+                self.rows[k] = row
+            else:
+                self.rows.pop(k, None)
+        order = sorted(self.rows)
+        values = [self.rows[k] for k in order]
+        if order == self.order:
+            tree = self.table.Widget
+            for iid, row, shown in zip(tree.get_children(), values, self.values):
+                if row != shown:
+                    tree.item(iid, values=row)
+        else:
+            self.table.update(values=values)
+        self.order = order
+        self.values = values
+        if self.pending_eta is not None:
+            self.eta_text(self.pending_eta)
+        self.pending = {}
+        self.pending_eta = None
+        self.last_draw = time.perf_counter()
 
-def import_timeline(watch_path, folder_name):
-    """
-    Import footage and make timeline.
-    :param watch_path: the path of watch folder.
-    :param folder_name: source folder name.
-    :return: True if media is imported and timeline is created successfully, False if failed.
-    """
-    # Add empty folder(bin) in Resolve media pool
-    imported_mp_folder = mp.AddSubFolder(mp.GetRootFolder(), f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + folder_name)
-    if imported_mp_folder:
-        mp_add_source(os.path.join(watch_path, folder_name), 1, mp, ms)
-        make_timeline_with_folder(imported_mp_folder, '', 0, mp)
-        return True
-    else:
-        # If failed to create a new bin in media pool
-        return False
+    def clear(self):
+        self.pending = dict.fromkeys(self.rows)
+        self.pending_eta = ''
+        self.draw(force=True)
 
 
-def update_render_status():
-    """
-        Get job status by index, updates the render status table in the GUI
-    :return: none
-    """
-    status_table = []
-    for k in sorted(set(finished_queue + pending_queue)):
-        try:
-            status = proj.GetRenderJobStatus(k)
-            status.update({'Idx': k, 'Name': proj.GetRenderJobs()[k]['TimelineName']})
-            # The status_table is a list of lists, the order corresponds to the 'headings' list
-            status_table.append([
-                str(status.get('Idx', 'Unknown')), status.get('Name'),
-                status.get('JobStatus'), status.get('CompletionPercentage', 'NA'),
-                str(datetime.timedelta(milliseconds=status.get('TimeTakenToRenderInMs', 0))).split('.', 2)[0]
-            ])
-        except:
-            pass
-    window['TABLE'](status_table)
-    window.refresh()
-
-
-def queue_render(presetname, queue_source_folder):
+def table_shard():
     """
-    Add a render job to the queue.
-    :param presetname: the render preset to use for this job
-    :param queue_source_folder: the source folder name for this job, will be added to queue_path, for the xml copy function
-    :return: none
+    :return: name of the shard project whose jobs the session follows, '' without shards. Every project numbers its
+        render jobs from 1, the table rows are keyed by (shard, job index).
     """
-    global pending_queue
-    global queue_paths
-    proj.LoadRenderPreset(presetname)
-    if int(valid_video_track_count(proj.GetCurrentTimeline())) != 0:
-        set_output_path()
-        proj.AddRenderJob()
-        new_job_idx = get_newest_renderjob_index()
-        if new_job_idx:
-            pending_queue.append(new_job_idx)
-            # There is already a render_status table for showing job info on the GUI.
-            # This queue_path dictionary is added later, to correspond each job index to its source and output paths.
-            # Maybe can use a better data structure to manage both?
-            queue_paths.update({new_job_idx: [latest_watch_path, queue_source_folder, latest_output_path]})
-            update_render_status()
-        else:
-            sg.Popup('Failed to add render job, check Resolve.')
-    else:
-        sg.Popup('Failed to add render job, empty folder?')
+    return shards.current.name if shards and shards.current else ''
 
 
-def get_newest_renderjob_index():
+def on_render_status(changes, statuses):
     """
-    Get the index of the newest job in Resolve's render queue.
-    :return: the index number in integer, None if failed to get any job info.
+    Render status poller subscriber, runs in the poller's thread. Tk is not thread safe, the rows of the jobs that
+    changed are posted to the GUI thread as a STATUS_EVENT, which merges them into the table.
+    :param changes: dictionary of job index -> status, only the jobs that changed in this tick.
+    :param statuses: dictionary of job index -> status, all the jobs.
+    :return: none
     """
-    if proj.GetRenderJobs():
-        newest_index = int(max(k for k, v in proj.GetRenderJobs().items()))
-        return newest_index
-    else:
-        return None
+    shard = table_shard()
+    rows = {(shard, k): status_row(status, session.eta(k, status)) if status else None
+            for k, status in changes.items()}
+    window.write_event_value(STATUS_EVENT, (rows, format_batch_eta(*session.batch_eta(statuses))))
 
 
-def valid_video_track_count(timeline):
+def follow_render_status(poller):
     """
-    Count non-empty video tracks in current Resolve timeline.
-    :param timeline: Resolve timeline object.
-    :return: integer
+    Get the render status of all the jobs, finished and ongoing, from Resolve in a poller thread, until Resolve stops
+    rendering, and update the GUI. The poller threads are the only callers of the session's subscribers. The poller
+    only re-queries unfinished jobs, and slows down from 0.2 to 2 seconds while nothing changes.
+    :param poller: the poller started last time, None if there was none. It is stopped and waited for, it may be in
+        its last tick, and would miss the jobs added and the render started since.
+    :return: the new poller, running.
     """
-    i = 0
-    for track in range(1, int(timeline.GetTrackCount('video')) + 1):
-        if timeline.GetItemsInTrack('video', track):
-            i += 1
-    return i
+    if poller is not None:
+        poller.stop()
+    poller = session.status_poller(subscribers=[on_render_status])
+    poller.start()
+    return poller
 
 
-def update_table_while_rendering():
-    """
-    Continuously get render status of all the jobs, finished and ongoing, from Resolve, and update the GUI.
-    :return: none
-    """
-    while proj.IsRenderingInProgress():
-        update_render_status()
-        # update info every 0.2 second
-        time.sleep(0.2)
-        if copy_xml_flag:
-            for k in pending_queue:
-                if k not in xml_copied:
-                    # copy xml as soon as job status is 'complete', so don't have to wait for other jobs to finish
-                    if proj.GetRenderJobStatus(k)['JobStatus'] == 'Complete':
-                        copy_xml(queue_paths[k][0], queue_paths[k][1], queue_paths[k][2])
-                        xml_copied.append(k)
-    update_render_status()
-
-
-def set_output_path():
+def print_startup_time():
     """
-    Get the latest output path from the GUI and submit to Resolve.
+    Print how long each startup step took, see fbcore.timings.
     :return: none
     """
-    global latest_output_path
-    latest_output_path = values['OUTPUTPATH']
-    if proj.IsRenderingInProgress():
-        sg.Popup('Rendering in progres,try later.')
-    else:
-        proj.SetRenderSettings({'TargetDir': latest_output_path})
-
-
-def copy_xml(watch_path, source, dest):
-    """
-    Copy the files according to file extension, and try to replicate the original folder structure.
-    Works best in conjunction with the right 'Preserve source directory levels' in Resolve render settings - Files tab.
-    :param watch_path:watch folder path, where source folder is in
-    :param source:source folder name
-    :param dest:destination path
-    :return:none
-    """
-    xmlpath_list = []
-    for rootdir, dirs, files in os.walk(os.path.join(watch_path, source)):
-        for file in files:
-            # set the file extensions here
-            if file.endswith(('.xml', '.fcpxml', '.aaf', '.edl')):
-                xmlpath_list.append(os.path.join(rootdir, file))
-    for xmlpath in xmlpath_list:
-        relpath = os.path.relpath(xmlpath, watch_path)
-        newpath = os.path.split(os.path.join(dest, relpath))[0]
-        if not os.path.exists(newpath):
-            os.makedirs(newpath)
-        try:
-            shutil.copy(xmlpath, newpath)
-        except:
-            pass
-
-
-# init Resolve handles, a script from Resolve's scripting documentation is used.
-resolve = GetResolve()
-if not resolve:
-    sg.PopupError(
-        'Cannot get Resolve API. \n Is Resolve open? '
-        '\n Is "Davinci Resolve > Preference > System > General > External Scripting Using" set to "Local"?',
-        title='Ahhh!!', keep_on_top=True, auto_close_duration=4,
-        line_width=40, font=('Default', 15))
-    exit()
-
-pm = resolve.GetProjectManager()
-proj = pm.GetCurrentProject()
-mp = proj.GetMediaPool()
-ms = resolve.GetMediaStorage()
-
-# put yaml config file in the same path as the .py script
-config_path = os.path.split(os.path.abspath(__file__))[0]
-
-'''Start initialize the config'''
-config = yaml_load(os.path.join(config_path, 'config.yaml'))
-try:
-    latest_watch_path = config['Watch path']
-except:
-    latest_watch_path = 'insert watch path here'
-
-try:
-    latest_output_path = config['Output path']
-except:
-    latest_output_path = 'insert output path here'
-try:
-    latest_preset = config['Preset']
-except:
-    latest_preset = []
-try:
-    copy_xml_flag = config['Copy xml']
-except:
-    copy_xml_flag = False
-try:
-    custom_preset_flag = config['Show custom presets only']
-except:
-    custom_preset_flag = True
-
-get_render_presets()
-if latest_preset not in preset_list:
-    # If the stored preset config no longer exists in Resolve.
-    latest_preset = []
-
-# Initialize some global variables.
-finished_queue = []
-pending_queue = []
-queue_paths = {}
-xml_copied = []
-
-# Headings of the render queue status table.
-headings = ['ID', 'Timeline', 'Status', '%', 'Time']
-
-# Uncomment below line to see more themes:
-# sg.theme_previewer()
-# Change to your preferred one in below line.
-sg.theme('GreenTan')
-
-sg.SetOptions(font=('Helvetica', 14))
-
-watch_path_frame = [[sg.FolderBrowse('Browse', font=('Futura', 18), size=(6, 1), pad=(0, 5), target='WATCHPATH'),
-                     sg.InputText(latest_watch_path, size=(95, 1), pad=((26, 2), 0), key='WATCHPATH',
-                                  enable_events=True)
-                     ]]
-
-folder_list = [[sg.Button('Refresh', font=('Futura', 18), size=(6, 1), pad=(3, (2, 5)), key='REFRESH')],
-               [sg.Listbox('', [], size=(30, 20), key='SOURCEPATHS')],
-               [sg.Listbox(preset_list, size=(30, 10), key='RENDERPRESET', default_values=latest_preset,
-                           enable_events=True, pad=(5, (15, 5)))],
-               [sg.Checkbox('Custom only', key='CUSTOMPRESET', default=custom_preset_flag, font=('Futura', 15),
-                            enable_events=True),
-                sg.Button('Queue', font=('Futura', 18), size=(6, 1), pad=(3, (7, 7)),
-                          key='QUEUE')]]
-
-job_status_frame = [[sg.Button('Abort', font=('Futura', 18), size=(6, 1), pad=((465, 0), (2, 5)),
-                               button_color=('#EE3550', '#475841'), key='ABORT')],
-                    [sg.Table([['' for col in range(6)]], headings=headings, key='TABLE',
-                              auto_size_columns=False, max_col_width=40, col_widths=[4, 31, 10, 6, 8], num_rows=26)],
-                    [sg.Button('Render', font=('Futura', 18), size=(6, 1), pad=(0, (7, 7)), key='RENDER'),
-                     sg.Checkbox('Copy xml', key='COPYXML', default=copy_xml_flag, enable_events=True,
-                                 font=('Futura', 15),
-                                 pad=(20, 0)),
-                     sg.Button('Clear', font=('Futura', 18), size=(6, 1), pad=((248, 0), (7, 7)), key='CLEAR')
-                     ]
-                    ]
-
-output_folder_frame = [[sg.FolderBrowse('Browse', font=('Futura', 18), size=(6, 1), pad=(0, 5), target='OUTPUTPATH'),
-                        sg.InputText(latest_output_path, size=(95, 1), pad=((26, 2), 0), key='OUTPUTPATH',
-                                     enable_events=True)
-                        ]]
-
-exit_frame = [[sg.Quit('Exit', font=('Futura', 18), size=(6, 1), pad=(2, 0), key='Exit')]]
-
-col1 = sg.Column([
-    [sg.Frame('Folders & Presets', folder_list, element_justification='right')]
-
-])
-
-col2 = sg.Column([
-    [sg.Frame('Render Queue', job_status_frame, key='-QUEUE-', element_justification='left', pad=(0, (3, 0)))]])
-
-layout = [[sg.Frame('Watch Path', watch_path_frame, pad=(20, 20))], [col1, col2],
-          [sg.Frame('Output Path', output_folder_frame, pad=(20, (20, 40)))]
-          # ,[sg.Frame('', exit_frame, border_width=0, pad=(20, (0,10)))]
-          # uncomment if you want the 'Exit' button
-          ]
-
-window = sg.Window('FootBrake v0.2a', layout, finalize=True)
-
-# Initialize source paths with config
-if os.path.exists(latest_watch_path):
-    refresh_folders(latest_watch_path)
-else:
-    window['WATCHPATH'](text_color='red')
-    window.refresh()
-if not os.path.exists(latest_output_path):
-    window['OUTPUTPATH'](text_color='red')
-
-# GUI loop and events handling
-while True:
-    # read PySimpleGUI window
-    event, values = window.read()
-    if event in (None, 'Exit'):
-        yaml_config_write()
-        break
-
-    if event == 'WATCHPATH':
-        if os.path.isdir(values['WATCHPATH']):
-            window['WATCHPATH'](text_color='black')
-            latest_watch_path = values['WATCHPATH']
-            refresh_folders(latest_watch_path)
-            config.update({'Watch path': latest_watch_path})
-            yaml_config_write()
+    for name, seconds in fbcore.timings.items():
+        print(f'{name:<16}{seconds * 1000:>10.1f} ms')
+    print(f'{"total":<16}{(time.perf_counter() - _import_start) * 1000:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FootBrake, transcode with Resolve in as few clicks as possible.')
+    parser.add_argument('--watch', action='store_true',
+                        help='run without GUI, import and queue every new folder in the watch path automatically')
+    parser.add_argument('--settle', type=float, default=30.0,
+                        help='seconds a new folder has to stay unchanged before it is imported (default 30)')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='print how long the imports, the Resolve connection and the window took')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record Resolve API call latencies and write them to FILE at exit, Prometheus text '
+                             'format if it ends with .prom, JSON otherwise')
+    args = parser.parse_args()
+    headless = args.watch
+    if args.metrics:
+        fbmetrics.enable()
+        atexit.register(fbmetrics.write, args.metrics)
+
+    if not headless:
+        with fbcore.timed('gui import'):
+            import PySimpleGUI as sg
+
+    # put yaml config file in the same path as the .py script
+    config_path = os.path.split(os.path.abspath(__file__))[0]
+    db_path = fbcore.default_db_path()
+
+    # init Resolve handles, a script from Resolve's scripting documentation is used.
+    # footbrake.db caches the watch path listings (only changed folders are rescanned), the media header checks,
+    # and the bin and timeline each source folder was imported to, so queueing it again reuses them. It also keeps
+    # the render history the ETAs are estimated from.
+    session = fbcore.connect(scan_index=ScanIndex(db_path),
+                             probe=MediaProbe(db_path),
+                             dedup=DedupIndex(db_path),
+                             history=RenderHistory(db_path),
+                             notify=None if headless else notify)
+    if not session and headless:
+        print('Cannot get Resolve API. Is Resolve open? Is External Scripting set to "Local"?')
+        exit(1)
+    elif not session:
+        sg.PopupError(
+            'Cannot get Resolve API. \n Is Resolve open? '
+            '\n Is "Davinci Resolve > Preference > System > General > External Scripting Using" set to "Local"?',
+            title='Ahhh!!', keep_on_top=True, auto_close_duration=4,
+            line_width=40, font=('Default', 15))
+        exit()
+
+    '''Start initialize the config'''
+    # Changes are written back one second after the last one, and at exit.
+    config = ConfigStore(os.path.join(config_path, 'config.yaml'))
+    try:
+        latest_watch_path = config['Watch path']
+    except:
+        latest_watch_path = 'insert watch path here'
 
-        else:
-            window['WATCHPATH'](text_color='red')
-            window['QUEUE'](disabled=True)
-
-    if event == 'RENDERPRESET':
-        latest_preset = values['RENDERPRESET'][0]
-        config.update({'Render preset': latest_preset})
-        yaml_config_write()
-
-    if event == 'OUTPUTPATH':
-        if os.path.isdir(values['OUTPUTPATH']):
-            window['OUTPUTPATH'](text_color='black')
-            latest_output_path = values['OUTPUTPATH']
-            config.update({'Output path': latest_output_path})
-            yaml_config_write()
-        else:
-            window['OUTPUTPATH'](text_color='red')
+    try:
+        latest_output_path = config['Output path']
+    except:
+        latest_output_path = 'insert output path here'
+    try:
+        latest_preset = config['Render preset']
+    except:
+        latest_preset = []
+    try:
+        copy_xml_flag = config['Copy xml']
+    except:
+        copy_xml_flag = False
+    try:
+        custom_preset_flag = config['Show custom presets only']
+    except:
+        custom_preset_flag = True
+    session.copy_xml_flag = copy_xml_flag
+
+    session.presets.extra_builtins = frozenset(config.get('Built-in presets', ()))
+    # With 'Preserve source directory levels' set, only the clips without an up to date render are queued.
+    session.preserve_levels = config.get('Preserve source directory levels')
+    # With 'Verify outputs' set, the renders of every completed job are checked and checksummed, see fbverify.
+    if config.get('Verify outputs'):
+        session.verifier = Verifier(on_report=print_report)
+    # 'Post-render actions' in config.yaml, e.g. [manifest, move, notify], run as each job completes, see fbactions.
+    try:
+        session.actions = ActionBus(session, config.get('Post-render actions', ()), on_report=print_action_report,
+                                    delivery_path=config.get('Delivery path'), notify_url=config.get('Notify URL'))
+    except ValueError as e:
+        print(f'{e}, in config.yaml, no post-render actions are run.')
+    # 'Render order' in config.yaml: fifo, sjf (shortest first) or deadline, see fbeta.
+    session.render_order = config.get('Render order', 'fifo')
+    if session.render_order not in ORDERS:
+        print(f"Unknown 'Render order' {session.render_order!r} in config.yaml, one of: " + ', '.join(ORDERS))
+        session.render_order = 'fifo'
+    # With 'Max clips per project' set, imports go to new projects of at most that many clips and bins each.
+    if config.get('Max clips per project'):
+        shards = ShardManager(session, config['Max clips per project'], config.get('Max bins per project', 500))
+    else:
+        shards = None
+    # imports the folders queued while Resolve renders, their jobs start when it is done, see fbpipeline
+    pipeline = None
+    # the poller following the render started with the Render button
+    status_poller = None
+    get_render_presets()
+    if latest_preset not in preset_list:
+        # If the stored preset config no longer exists in Resolve.
+        latest_preset = []
 
-    if event == 'REFRESH':
-        proj = pm.GetCurrentProject()
-        mp = proj.GetMediaPool()
-        if os.path.exists(latest_watch_path):
-            refresh_folders(latest_watch_path)
+    if headless:
+        # The watch path, output path and preset are the ones last used in the GUI.
+        if not os.path.isdir(latest_watch_path) or not latest_preset:
+            print('Set the watch path and a render preset in the GUI first.')
+            exit(1)
+        if args.startup_time:
+            print_startup_time()
+        fbcore.watch_daemon(session, latest_watch_path, latest_preset, latest_output_path, args.settle)
+        exit()
+
+    # Headings of the render queue status table.
+    headings = ['ID', 'Timeline', 'Status', '%', 'Time', 'ETA']
+
+    # Uncomment below line to see more themes:
+    # sg.theme_previewer()
+    # Change to your preferred one in below line.
+    sg.theme('GreenTan')
+
+    sg.SetOptions(font=('Helvetica', 14))
+
+    watch_path_frame = [[sg.FolderBrowse('Browse', font=('Futura', 18), size=(6, 1), pad=(0, 5), target='WATCHPATH'),
+                         sg.InputText(latest_watch_path, size=(95, 1), pad=((26, 2), 0), key='WATCHPATH',
+                                      enable_events=True)
+                         ]]
+
+    folder_list = [[sg.Button('Refresh', font=('Futura', 18), size=(6, 1), pad=(3, (2, 5)), key='REFRESH')],
+                   [sg.Listbox('', [], size=(30, 20), key='SOURCEPATHS')],
+                   [sg.Listbox(preset_list, size=(30, 10), key='RENDERPRESET', default_values=latest_preset,
+                               enable_events=True, pad=(5, (15, 5)))],
+                   [sg.Checkbox('Custom only', key='CUSTOMPRESET', default=custom_preset_flag, font=('Futura', 15),
+                                enable_events=True),
+                    sg.Button('Queue', font=('Futura', 18), size=(6, 1), pad=(3, (7, 7)),
+                              key='QUEUE')]]
+
+    job_status_frame = [[sg.Text('', key='BATCHETA', size=(30, 1), pad=((5, 0), (2, 5))),
+                         sg.Button('Abort', font=('Futura', 18), size=(6, 1), pad=((165, 0), (2, 5)),
+                                   button_color=('#EE3550', '#475841'), key='ABORT')],
+                        [sg.Table([['' for col in range(6)]], headings=headings, key='TABLE',
+                                  auto_size_columns=False, max_col_width=40, col_widths=[4, 25, 10, 6, 8, 8],
+                                  num_rows=26)],
+                        [sg.Button('Render', font=('Futura', 18), size=(6, 1), pad=(0, (7, 7)), key='RENDER'),
+                         sg.Checkbox('Copy xml', key='COPYXML', default=copy_xml_flag, enable_events=True,
+                                     font=('Futura', 15),
+                                     pad=(20, 0)),
+                         sg.Button('Clear', font=('Futura', 18), size=(6, 1), pad=((248, 0), (7, 7)), key='CLEAR')
+                         ]
+                        ]
+
+    output_folder_frame = [[sg.FolderBrowse('Browse', font=('Futura', 18), size=(6, 1), pad=(0, 5),
+                                            target='OUTPUTPATH'),
+                            sg.InputText(latest_output_path, size=(95, 1), pad=((26, 2), 0), key='OUTPUTPATH',
+                                         enable_events=True)
+                            ]]
+
+    exit_frame = [[sg.Quit('Exit', font=('Futura', 18), size=(6, 1), pad=(2, 0), key='Exit')]]
+
+    col1 = sg.Column([
+        [sg.Frame('Folders & Presets', folder_list, element_justification='right')]
+
+    ])
+
+    col2 = sg.Column([
+        [sg.Frame('Render Queue', job_status_frame, key='-QUEUE-', element_justification='left', pad=(0, (3, 0)))]])
+
+    layout = [[sg.Frame('Watch Path', watch_path_frame, pad=(20, 20))], [col1, col2],
+              [sg.Frame('Output Path', output_folder_frame, pad=(20, (20, 40)))]
+              # ,[sg.Frame('', exit_frame, border_width=0, pad=(20, (0,10)))]
+              # uncomment if you want the 'Exit' button
+              ]
+
+    with fbcore.timed('window'):
+        window = sg.Window('FootBrake v0.2a', layout, finalize=True)
+    # 'Table redraws per second' in config.yaml, fewer keep the window responsive with many jobs on a slow machine.
+    status_table = StatusTable(window['TABLE'], window['BATCHETA'], config.get('Table redraws per second', 5))
+    if args.startup_time:
+        print_startup_time()
+
+    # Initialize source paths with config
+    if os.path.exists(latest_watch_path):
+        refresh_folders(latest_watch_path)
+    else:
+        window['WATCHPATH'](text_color='red')
+        window.refresh()
+    if not os.path.exists(latest_output_path):
+        window['OUTPUTPATH'](text_color='red')
+
+    # GUI loop and events handling
+    while True:
+        # read PySimpleGUI window, wake up for the next table redraw if rows are waiting
+        event, values = window.read(timeout=status_table.timeout())
+        if event in (None, 'Exit'):
+            config.flush()
+            break
+
+        if event == STATUS_EVENT:
+            status_table.merge(*values[STATUS_EVENT])
+        status_table.draw()
+
+        if event == 'WATCHPATH':
+            if os.path.isdir(values['WATCHPATH']):
+                window['WATCHPATH'](text_color='black')
+                latest_watch_path = values['WATCHPATH']
+                refresh_folders(latest_watch_path)
+                config.update({'Watch path': latest_watch_path})
+            else:
+                window['WATCHPATH'](text_color='red')
+                window['QUEUE'](disabled=True)
+
+        if event == 'RENDERPRESET':
+            latest_preset = values['RENDERPRESET'][0]
+            config.update({'Render preset': latest_preset})
+
+        if event == 'OUTPUTPATH':
+            if os.path.isdir(values['OUTPUTPATH']):
+                window['OUTPUTPATH'](text_color='black')
+                latest_output_path = values['OUTPUTPATH']
+                config.update({'Output path': latest_output_path})
+            else:
+                window['OUTPUTPATH'](text_color='red')
+
+        if event == 'REFRESH':
+            session.refresh_project()
+            if os.path.exists(latest_watch_path):
+                refresh_folders(latest_watch_path)
+                refresh_presets(refresh=True)
+
+        if event == 'QUEUE':
+            if not values['SOURCEPATHS']:
+                sg.Popup('Please select a source folder.',
+                         title='Select Source')
+            elif not values['RENDERPRESET']:
+                sg.Popup('Please select a render preset.(Create in Resolve render page first.)',
+                         title='Select Preset')
+            else:
+                if session.is_rendering() and shards:
+                    sg.Popup('Resolve rendering is in progress, go grab a coffee.', title='Rendering in progress')
+                elif session.is_rendering():
+                    # import now, render as soon as Resolve is done
+                    if pipeline is None:
+                        pipeline = RenderPipeline(session, latest_watch_path, [], [on_render_status])
+                        threading.Thread(target=pipeline.run, daemon=True).start()
+                    for source_folder in values['SOURCEPATHS']:
+                        pipeline.add(source_folder, [(latest_preset, values['OUTPUTPATH'])], latest_watch_path)
+                    latest_output_path = values['OUTPUTPATH']
+                else:
+                    # Listbox multi-select is enabled, values['SOURCEPATHS'] is a list
+                    source_folders = values['SOURCEPATHS']
+                    queued = False
+                    for source_folder in source_folders:
+                        if (shards or session).import_and_queue(latest_watch_path, source_folder, latest_preset,
+                                                                values['OUTPUTPATH']):
+                            latest_output_path = values['OUTPUTPATH']
+                            queued = True
+                            # Below seems no longer needed.
+                            # except IndexError:
+                            #     sg.Popup('Please select a render preset.')
+                    if queued:
+                        # the new jobs show up through one poller tick, not polled from the GUI thread
+                        status_poller = follow_render_status(status_poller)
+
+        '''Starts the event handling part.'''
+
+        if event == 'CUSTOMPRESET':
+            if values['CUSTOMPRESET']:
+                custom_preset_flag = True
+                config.update({'Show custom presets only': True})
+            else:
+                custom_preset_flag = False
+                config.update({'Show custom presets only': False})
             refresh_presets()
 
-    if event == 'QUEUE':
-        if not resolve:
-            print('lost connection with Resolve API')
-        elif not values['SOURCEPATHS']:
-            sg.Popup('Please select a source folder.',
-                     title='Select Source')
-        elif not values['RENDERPRESET']:
-            sg.Popup('Please select a render preset.(Create in Resolve render page first.)',
-                     title='Select Preset')
-        else:
-            #
+        if event == 'COPYXML':
+            if values['COPYXML']:
+                copy_xml_flag = True
+                session.copy_xml_flag = True
+                config.update({'Copy xml': True})
+            else:
+                copy_xml_flag = False
+                session.copy_xml_flag = False
+                config.update({'Copy xml': False})
+
+        if event == 'RENDER':
             try:
-                proj.IsRenderingInProgress()
+                session.proj.IsRenderingInProgress()
+                if session.proj.IsRenderingInProgress():
+                    sg.Popup('Rendering in progres,try later.')
+                elif shards and shards.pending():
+                    # one project after the other, the table follows the shard being rendered
+                    threading.Thread(target=shards.render, args=([on_render_status],), daemon=True).start()
+                elif session.start_rendering():
+                    # finally submit the render list
+                    status_poller = follow_render_status(status_poller)
+                else:
+                    sg.Popup('Add some jobs first.')
+            # Yet there seems no need for further error handling, because the job index will be out of track anyway.
             except TypeError:
-                proj = pm.CreateProject(f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + 'Transcode')
-                mp = proj.GetMediaPool()
-                # Above is needed to check if 'proj' is accessible, before checking rendering is in progress,
-                # otherwise Resolve will raise an error
-            if proj.IsRenderingInProgress():
-                sg.Popup('Resolve rendering is in progress, go grab a coffee.', title='Rendering in progress')
-            else:
-                # Listbox multi-select is enabled, values['SOURCEPATHS'] is a list
-                source_folders = values['SOURCEPATHS']
-                for source_folder in source_folders:
-                    # Avoid overwriting.
-                    if latest_output_path == os.path.join(latest_watch_path, source_folder):
-                        sg.popup('Output path is same to the source path for:\n\n' + latest_output_path,
-                                 title='Overwriting is no fun!')
-                    else:
-                        # Try to import timeline, if Resolve project is switched or closed, will get 'False',
-                        # then create a new project named '%timestamp%_Transcode'.
-                        if not import_timeline(latest_watch_path, source_folder):
-                            proj = pm.CreateProject(f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + 'Transcode')
-                            mp = proj.GetMediaPool()
-                            import_timeline(latest_watch_path, source_folder)
-
-                        queue_render(latest_preset, source_folder)
-                        # Below seems no longer needed.
-                        # except IndexError:
-                        #     sg.Popup('Please select a render preset.')
-
-    '''Starts the event handling part.'''
-
-    if event == 'CUSTOMPRESET':
-        if values['CUSTOMPRESET']:
-            custom_preset_flag = True
-            config.update({'Show custom presets only': True})
-        else:
-            custom_preset_flag = False
-            config.update({'Show custom presets only': False})
-        yaml_config_write()
-        refresh_presets()
-
-    if event == 'COPYXML':
-        if values['COPYXML']:
-            copy_xml_flag = True
-            config.update({'Copy xml': True})
-        else:
-            copy_xml_flag = False
-            config.update({'Copy xml': False})
-        yaml_config_write()
-
-    if event == 'RENDER':
-        try:
-            proj.IsRenderingInProgress()
-            if proj.IsRenderingInProgress():
+                sg.Popup('Resolve project is unreachable!')
+                session.jobs.clear()
+                status_table.clear()
+
+        if event == 'ABORT':
+            if shards:
+                shards.stop()
+            if pipeline is not None:
+                # the folders not rendered yet are dropped, queue them again
+                pipeline.stop()
+                pipeline = None
+            if session.proj.IsRenderingInProgress():
+                # jobs not reached yet go back to queued, Render picks them up again
+                session.proj.StopRendering()
+            # the cancelled and requeued jobs show up through the poller, not polled from the GUI thread
+            status_poller = follow_render_status(status_poller)
+
+        if event == 'CLEAR':
+            if session.proj.IsRenderingInProgress():
                 sg.Popup('Rendering in progres,try later.')
-            elif pending_queue:
-                # finally submit the render list
-                proj.StartRendering(pending_queue)
-                status_update_thread=threading.Thread(target=update_table_while_rendering,daemon=True)
-                status_update_thread.start()
-                finished_queue += pending_queue
-                pending_queue = []
-                xml_copied = []
-                queue_paths = {}
             else:
-                sg.Popup('Add some jobs first.')
-        # Yet there seems no need for further error handling, because the job index will be out of track anyway.
-        except TypeError:
-            sg.Popup('Resolve project is unreachable!')
-            pending_queue = []
-            finished_queue = []
-            window['TABLE']([])
-            window.refresh()
-
-    if event == 'ABORT':
-        if proj.IsRenderingInProgress():
-            proj.StopRendering()
-            finished_queue += pending_queue
-            pending_queue = []
-            xml_copied = []
-            queue_paths = {}
-        update_table_while_rendering()
-
-    if event == 'CLEAR':
-        if proj.IsRenderingInProgress():
-            sg.Popup('Rendering in progres,try later.')
-        else:
-            pending_queue = []
-            finished_queue = []
-            window['TABLE']([])
-            window.refresh()
+                session.jobs.clear()
+                status_table.clear()
 
-window.close()
+    window.close()
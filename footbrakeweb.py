@@ -1,456 +1,382 @@
-import PySimpleGUIWeb as sg
-import os
-import shutil
-import datetime
-import time
-from python_get_resolve import GetResolve
-
-
-def mp_add_source(fpath, add_files_flag, media_pool, media_storage):
-    """
-        add source clips to Resolve.
-    :param fpath: footage folder path in OS.
-    :param add_files_flag: if True,add folders and files, if Fasle, add folder structure only.
-    :param media_pool: media pool object from Resolve API.
-    :param media_storage: media storage object from Resolve API.
-    :return: none
-    """
-    folder_handles = []
-    i = 1
-    for root, dirs, files in os.walk(fpath):
-        # walk the folders
-        if dirs:
-            sub_temp = []
-            cf = media_pool.GetCurrentFolder()
-            # remember handle of current mediapool root
-            for dir in dirs:
-                sub_temp.append(media_pool.AddSubFolder(cf, dir))
-            media_pool.SetCurrentFolder(cf)
-            # AddSubFolder changes currentfolder to new added, return to cf
-            if add_files_flag:
-                for file in files:
-                    media_storage.AddItemsToMediaPool(os.path.join(root, file))
-            media_pool.SetCurrentFolder(sub_temp[0])
-            # change current folder to the next root folder os.walk() returns, which is sub_temp[0]
-            folder_handles.extend(sub_temp)
-            # store sub folders handles to the list
-        if not dirs:
-            # if subfolder does not exist, move on to the next folder in the folder_handles list
-
-            # add the files  first
-            if add_files_flag:
-                for file in files:
-                    media_storage.AddItemsToMediaPool(os.path.join(root, file))
-
-            # if next folder exist, change to next folder
-            try:
-                if folder_handles[i]:
-                    media_pool.SetCurrentFolder(folder_handles[i])
-                    i += 1
-            except IndexError:
-                pass
-
-
-def get_all_subfolders(mp_folder):
-    """
-    Returns a list of all sub folders/bins objects inside the provided folder object.
-    :param mp_folder: Resolve media pool folder object
-    :return: a list of all the sub folders' folder object.
-    """
-    folderlist = []
-    folderlist += mp_folder.GetSubFolders().values()
-    for sub_folder in mp_folder.GetSubFolders().values():
-        folderlist += get_all_subfolders(sub_folder)
-    return folderlist
-
-
-def make_timeline_with_folder(mp_folder, notes, timeline_notes_flag, media_pool):
-    """
-      Makes a timeline with all clips in a Resolve media pool bin;
-    :param mp_folder: media pool bin object from Resolve's API.
-    :param notes: note string for makers.
-    :param timeline_notes_flag: if True,  each bin/sub-bin will be marked on the timeline.
-    :param media_pool: medida pool object from Resolve's API.
-    :return: Resolve object of the newly created timeline.
-    """
-    mp_folder_name = mp_folder.GetName()
-
-    # initialize timeline and marker
-    media_pool.SetCurrentFolder(media_pool.GetRootFolder())
-    new_timeline = media_pool.CreateEmptyTimeline(mp_folder_name)
-    media_pool.SetCurrentFolder(mp_folder)
-    media_pool.AppendToTimeline(list(mp_folder.GetClips().values()))
-
-    if timeline_notes_flag:
-        new_timeline.AddMarker(new_timeline.GetEndFrame() - new_timeline.GetStartFrame(),
-                               'Green', mp_folder_name, notes, 1)
-
-    '''Below adds clips inside bin to timeline, and adds marker at the last clip of each bin if required.
-    (because note function is written for another tool, don't see too much use here, thus the note parameter is
-    not exposed to the GUI)'''
-
-    bin_list = get_all_subfolders(mp_folder)
-    for bin in bin_list:
-        clips_in_this_subfolder = []
-        for clip in bin.GetClips().values():
-            clips_in_this_subfolder.append(clip)
-            # Get all clip objects
-        media_pool.AppendToTimeline(clips_in_this_subfolder)
-        if timeline_notes_flag:
-            new_timeline.AddMarker(new_timeline.GetEndFrame() - new_timeline.GetStartFrame(),
-                                   'Green', bin.GetName(), notes, 1)
-    return new_timeline
-
-
-def refresh_presets():
-    if values['CUSTOMPRESET']:
-        preset_list = list(proj.GetRenderPresets().values())[19:len(proj.GetRenderPresets())]
-    else:
-        preset_list = list(proj.GetRenderPresets().values())[0:len(proj.GetRenderPresets())]
-    window['RENDERPRESET'](preset_list)
-    window.refresh()
-    return preset_list
+"""
+FootBrake web version, a phone sized control page served from the Resolve machine.
 
+A small asyncio HTTP server, no web framework needed. Every Resolve call runs on one worker thread, so imports and
+renders never block the server and the scripting API is never called from two threads at once. Job status changes
+are pushed to the browsers with Server-Sent Events, one row per changed job, nothing polls from the browser side.
 
-def refresh_folders(watch_path):
-    path_list = []
-    for item in os.listdir(watch_path):
-        if os.path.isdir(os.path.join(watch_path, item)):
-            path_list.append(item)
-    window['SOURCEPATHS'](path_list)
-    window.refresh()
+    python3 footbrakeweb.py --port 29259
 
-def refresh_outputfolder(output_path):
-    path_list = []
-    for item in os.listdir(output_path):
-        if os.path.isdir(os.path.join(output_path, item)):
-            path_list.append(item)
-    window['OUTPUTSUB'](path_list)
-    window.refresh()
-
-def import_timeline(watch_path, folder_name):
-    """
-    Import footage and make timeline.
-    :param watch_path: the path of watch folder.
-    :param folder_name: source folder name.
-    :return: True if media is imported and timeline is created successfully, False if failed.
-    """
-    # Add empty folder(bin) in Resolve media pool
-    imported_mp_folder = mp.AddSubFolder(mp.GetRootFolder(), f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + folder_name)
-    if imported_mp_folder:
-        mp_add_source(os.path.join(watch_path, folder_name), 1, mp, ms)
-        make_timeline_with_folder(imported_mp_folder, '', 0, mp)
-        return True
-    else:
-        # If failed to create a new bin in media pool
-        return False
-
-
-def update_render_status():
-    status_table = []
-    for k in sorted(set(finished_queue + pending_queue)):
-        try:
-            status = proj.GetRenderJobStatus(k)
-            status.update({'Idx': k, 'Name': proj.GetRenderJobs()[k]['TimelineName']})
-            status_table += [
-                'Job ' + str(status.get('Idx', 'Unknown')) + '---' + str(status.get('Name', 'Unknown')) + '---' +
-                str(status.get('JobStatus', 'Unknown')) + '---' + str(status.get('CompletionPercentage', 'NA'))
-                + '---' + str(datetime.timedelta(milliseconds=status.get('TimeTakenToRenderInMs', 0))).split('.', 2)[0]]
-        except:
-            pass
-    window['TABLE'](status_table)
-    window.refresh()
+Then open http://<resolve machine>:29259 on any device in the local network.
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import fbcore
+from fbcore import status_row
+from fbactions import ActionBus, print_action_report
+from fbconfig import ConfigStore
+from fbdedup import DedupIndex
+from fbeta import ORDERS, format_batch_eta
+from fbhistory import RenderHistory
+from fbindex import ScanIndex
+from fbprobe import MediaProbe
+from fbverify import Verifier, print_report
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict'}
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>FootBrake</title>
+<style>
+body { font-family: Helvetica, sans-serif; background: #e6e2c8; margin: 12px; font-size: 16px; }
+input, select, button { font-size: 18px; width: 100%; box-sizing: border-box; margin: 4px 0; }
+button { font-family: Futura, sans-serif; padding: 8px; }
+#render { height: 100px; font-size: 28px; }
+#abort { background: yellow; }
+table { width: 100%; border-collapse: collapse; } td { border-bottom: 1px solid #aaa; padding: 2px; }
+#messages { color: #a00; }
+</style></head>
+<body>
+<input id="watch" placeholder="Watch path">
+<button onclick="folders()">Refresh Source</button>
+<select id="sources" multiple size="8"></select>
+<button onclick="presets(true)">Refresh Presets</button>
+<label><input type="checkbox" id="custom" checked onchange="presets(false)" style="width:auto"> Custom only</label>
+<select id="presets" size="5"></select>
+<label><input type="checkbox" id="copyxml" checked style="width:auto"> Copy xml</label>
+<input id="output" placeholder="Output path">
+<button onclick="queue()">Queue</button>
+<table id="jobs"></table>
+<div id="eta"></div>
+<button id="render" onclick="post('/api/render', {})">Render</button>
+<button onclick="post('/api/clear', {})">Clear</button>
+<button id="abort" onclick="post('/api/abort', {})">ABORT</button>
+<div id="messages"></div>
+<script>
+function $(id) { return document.getElementById(id); }
+function options(select, names) {
+  select.innerHTML = '';
+  names.forEach(function (name) { var o = document.createElement('option'); o.textContent = name; select.add(o); });
+}
+function post(url, body) {
+  return fetch(url, {method: 'POST', body: JSON.stringify(body)}).then(function (r) { return r.json(); });
+}
+function folders() {
+  fetch('/api/folders?path=' + encodeURIComponent($('watch').value)).then(function (r) { return r.json(); })
+    .then(function (data) { options($('sources'), data.folders || []); });
+}
+function presets(refresh) {
+  post('/api/presets', {custom_only: $('custom').checked, refresh: refresh})
+    .then(function (data) { options($('presets'), data.presets); });
+}
+function queue() {
+  var sources = Array.prototype.map.call($('sources').selectedOptions, function (o) { return o.value; });
+  post('/api/queue', {watch_path: $('watch').value, folders: sources, preset: $('presets').value,
+                      output_path: $('output').value, copy_xml: $('copyxml').checked});
+}
+function row(job) {
+  var tr = $('job-' + job[0]);
+  if (!tr) { tr = document.createElement('tr'); tr.id = 'job-' + job[0]; $('jobs').appendChild(tr); }
+  tr.innerHTML = '';
+  job.forEach(function (value) { var td = document.createElement('td'); td.textContent = value; tr.appendChild(td); });
+}
+fetch('/api/state').then(function (r) { return r.json(); }).then(function (state) {
+  $('watch').value = state.watch_path; $('output').value = state.output_path; $('copyxml').checked = state.copy_xml;
+  options($('presets'), state.presets); folders();
+});
+var events = new EventSource('/events');
+events.addEventListener('jobs', function (e) { $('jobs').innerHTML = ''; JSON.parse(e.data).forEach(row); });
+events.addEventListener('job', function (e) { row(JSON.parse(e.data)); });
+events.addEventListener('remove', function (e) { var tr = $('job-' + JSON.parse(e.data)); if (tr) tr.remove(); });
+events.addEventListener('eta', function (e) { $('eta').textContent = JSON.parse(e.data); });
+events.addEventListener('message', function (e) { $('messages').textContent = JSON.parse(e.data); });
+</script>
+</body></html>
+'''
 
 
-def queue_render(presetname, queue_source_folder):
+class WebApp:
     """
-    Add a render job to the queue.
-    :param presetname: the render preset to use for this job
-    :param queue_source_folder: the source folder name for this job, will be added to queue_path, for the xml copy function
-    :return: none
+    :param session: fbcore.Session.
+    :param config: ConfigStore shared with the desktop version.
+    :param loop: asyncio event loop the server runs on.
     """
-    global pending_queue
-    global queue_paths
-    proj.LoadRenderPreset(presetname)
-    if int(valid_video_track_count(proj.GetCurrentTimeline())) != 0:
-        set_output_path()
-        proj.AddRenderJob()
-        new_job_idx = get_newest_renderjob_index()
-        if new_job_idx:
-            pending_queue.append(new_job_idx)
-            # There is already a render_status table for showing job info on the GUI.
-            # This queue_path dictionary is added later, to correspond each job index to its source and output paths.
-            # Maybe can use a better data structure to manage both?
-            queue_paths.update({new_job_idx: [values['WATCHPATH'], queue_source_folder, latest_output_path]})
-            update_render_status()
-        else:
-            sg.Popup('Failed to add render job, check Resolve.')
-    else:
-        sg.Popup('Failed to add render job, empty folder?')
 
-
-def update_table_while_rendering():
-    """
-        Continuously get render status of all the jobs, finished and ongoing, from Resolve, and update the GUI.
-        :return: none
+    def __init__(self, session, config, loop):
+        self.session = session
+        self.config = config
+        self.loop = loop
+        # one thread for everything that talks to Resolve
+        self.resolve_executor = ThreadPoolExecutor(max_workers=1)
+        # one asyncio.Queue per connected browser
+        self.clients = set()
+        self.monitor = None
+        # job index -> last row sent to the browsers
+        self.rows = {}
+        # batch ETA text last sent
+        self.eta = ''
+        session.notify = self.notify_threadsafe
+
+    def resolve_call(self, function, *args):
+        return self.loop.run_in_executor(self.resolve_executor, function, *args)
+
+    def broadcast(self, event, data):
         """
-    while proj.IsRenderingInProgress():
-        update_render_status()
-        # update info every 0.5 second
-        time.sleep(0.5)
-        if values['COPYXML']:
-            for k in pending_queue:
-                if k not in xml_copied:
-                    # copy xml as soon as job status is 'complete', so don't have to wait for other jobs to finish
-                    if proj.GetRenderJobStatus(k)['JobStatus'] == 'Complete':
-                        copy_xml(queue_paths[k][0], queue_paths[k][1], queue_paths[k][2])
-                        xml_copied.append(k)
-    update_render_status()
-
-
-def set_output_path():
-    """
-    Get the latest output path from the GUI and submit to Resolve.
-    :return: none
-    """
-    global latest_output_path
-    latest_output_path = values['OUTPUTPATH']
-    if proj.IsRenderingInProgress():
-        sg.Popup('Rendering in progres,try later.')
-    else:
-        proj.SetRenderSettings({'TargetDir': latest_output_path})
-
-
-def copy_xml(watch_path, source, dest):
-    """
-    Copy the files according to file extension, and try to replicate the original folder structure.
-    Works best in conjunction with the right 'Preserve source directory levels' in Resolve render settings - Files tab.
-    :param watch_path:watch folder path, where source folder is in
-    :param source:source folder name
-    :param dest:destination path
-    :return:none
-    """
-    xmlpath_list = []
-    for rootdir, dirs, files in os.walk(os.path.join(watch_path, source)):
-        for file in files:
-            # set the file extensions here
-            if file.endswith(('.xml', '.fcpxml', '.aaf', '.edl')):
-                xmlpath_list.append(os.path.join(rootdir, file))
-    for xmlpath in xmlpath_list:
-        relpath = os.path.relpath(xmlpath, watch_path)
-        newpath = os.path.split(os.path.join(dest, relpath))[0]
-        if not os.path.exists(newpath):
-            os.makedirs(newpath)
-        try:
-            shutil.copy(xmlpath, newpath)
-        except:
-            pass
-
-
-def valid_video_track_count(timeline):
-    """
-    Count non-empty video tracks in current Resolve timeline.
-    :param timeline: Resolve timeline object.
-    :return: integer
-    """
-    i = 0
-    for track in range(1, int(timeline.GetTrackCount('video')) + 1):
-        if timeline.GetItemsInTrack('video', track):
-            i += 1
-    return i
-
-
-def get_newest_renderjob_index():
-    """
-    Get the index of the newest job in Resolve's render queue.
-    :return: the index number in integer, None if failed to get any job info.
-    """
-    if proj.GetRenderJobs():
-        newest_index = int(max(k for k, v in proj.GetRenderJobs().items()))
-        return newest_index
-    else:
-        return None
-
-
-# init Resolve handles
-resolve = GetResolve()
-pm = resolve.GetProjectManager()
-proj = pm.GetCurrentProject()
-mp = proj.GetMediaPool()
-ms = resolve.GetMediaStorage()
-
-# def  get directory list
-status_table = []
-finished_queue = []
-queue_paths={}
-pending_queue = []
-xml_copied = []
-preset_list = list(proj.GetRenderPresets().values())[19:len(proj.GetRenderPresets())]
-headings = ['ID', 'Timeline', 'Status', '%', 'Time']
-
-sg.theme('GreenTan')
-
-sg.SetOptions(font=('Helvetica', 14))
-
-'''PC OPTIMIZED
-Below is obsolete, don't use.
-'''
-# col1 = sg.Column([
-#     [sg.Button('Folder Refresh',font=('Futura', 18), key='REFRESH')],
-#     [sg.Listbox('', [], size=(400, 800), key='SOURCEPATHS', enable_events=True)]
-# ])
-#
-# col2 = sg.Column([
-#     [sg.Button('Refresh Preset', font=('Futura', 18), key='REFRESHPR')],
-#     [sg.Listbox(preset_list, key='RENDERPRESET', size=(300, 800))],
-# ])
-#
-# col3 = sg.Column([
-#     [sg.Button('Queue', font=('Futura', 18), key='QUEUE')],
-#     [sg.Listbox('', [], key='TABLE', size=(600, 800), )],
-# ])
-#
-# col4 = sg.Column([
-#     [sg.Button('Render', font=('Futura', 18),pad=(0,100), size=(300,100),key='RENDER')],
-#     [sg.Button('ABORT', font=('Futura', 18),button_color='yellow', key='QUEUE',pad=(0,(450,0)))]
-# ])
-# layout = [[sg.Frame('Watch Folder',[]),sg.InputText('', size=(65, 1), key='WATCHPATH')],[col1, col2, col3,col4]]
-
-"""CELLPHONE"""
-col1 = sg.Column([
-    [sg.Button('Refresh Source', font=('Futura', 18), key='REFRESH')],
-    [sg.Listbox('', [], size=(360, 200), key='SOURCEPATHS', enable_events=True)]
-])
-
-col2 = sg.Column([
-    [sg.Button('Refresh Presets', font=('Futura', 18), key='REFRESHPR')],
-    [sg.Checkbox('Custom only', key='CUSTOMPRESET', default=True, font=('Futura', 15))],
-    [sg.Listbox(preset_list, key='RENDERPRESET', size=(360, 100))]
-])
-
-col3 = sg.Column([
-    [sg.Button('Queue', font=('Futura', 18), key='QUEUE'), sg.Button('Clear', font=('Futura', 18), key='CLEAR')],
-    [sg.Listbox('', [], key='TABLE', size=(360, 200), )],
-])
-
-col5 = sg.Column([
-    [sg.Button('Render', font=('Futura', 18), pad=(5, 5), size=(360, 100), key='RENDER')],
-    [sg.Button('List Folders in Destination', font=('Futura', 18), key='REFRESHOUTPUT')],
-    [sg.Listbox('', [], size=(360, 200), key='OUTPUTSUB', enable_events=True)],
-    [sg.Button('ABORT', font=('Futura', 18), button_color='yellow', key='ABORT', pad=(305, 5))]
-])
-
-col4 = sg.Column([
-    [
-     sg.Checkbox('Copy xml', key='COPYXML', default=True, font=('Futura', 15))]
-])
-layout = [[sg.InputText('', size=(36, 1), key='WATCHPATH')],
-          [col1], [col2], [col3], [col4],
-          [sg.InputText('', size=(36, 1), key='OUTPUTPATH')],
-          [col5]]
-
-# must include disable_close=True to let the server run in background
-window = sg.Window('Resolve Transkode v0.1a', layout, web_port=29259, finalize=True, disable_close=True)
-window['WATCHPATH'].update('/Users/')
-
-while True:
-    # read PySimpleGUI window
-    event, values = window.read()
-
-
-    if event == 'SOURCEPATHS':
-        print('listbox event!')
-
-
-
-    if event == 'REFRESH':
-        print('refresh event!')
-        if os.path.exists(values['WATCHPATH']):
-            refresh_folders(values['WATCHPATH'])
-
-    if event == 'REFRESHOUTPUT':
-        print('REFRESHOUTPUT event!')
-        if os.path.exists(values['OUTPUTPATH']):
-            refresh_outputfolder(values['OUTPUTPATH'])
-
-    if event == 'REFRESHPR':
-        refresh_presets()
-
-    if event == 'QUEUE':
-        if not resolve:
-            print('lost connection with Resolve API')
-        elif not values['SOURCEPATHS']:
-            sg.Popup('Please select a source folder.',
-                     title='Select Source')
-        elif not values['RENDERPRESET']:
-            sg.Popup('Please select a render preset.(Create in Resolve render page first.)',
-                     title='Select Preset')
-        else:
-            #
+        Push an SSE event to every connected browser, a browser that can't keep up is dropped.
+        """
+        message = f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+        for queue in list(self.clients):
             try:
-                proj.IsRenderingInProgress()
-            except TypeError:
-                proj = pm.CreateProject(f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + 'Transcode')
-                mp = proj.GetMediaPool()
-                # Above is needed to check if 'proj' is accessible, before checking rendering is in progress,
-                # otherwise Resolve will raise an error
-            if proj.IsRenderingInProgress():
-                sg.Popup('Resolve still rendering, go grab a coffee.')
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # the browser reconnects by itself and gets the whole table again
+                self.clients.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def notify_threadsafe(self, message, title=None):
+        self.loop.call_soon_threadsafe(self.broadcast, 'message', message)
+
+    def publish_statuses(self, changes, statuses):
+        """
+        Render status poller subscriber, runs on the Resolve thread, sends only the rows that changed.
+        """
+        rows = {k: status_row(changes[k], self.session.eta(k, changes[k])) if changes[k] else None
+                for k in sorted(changes)}
+        eta = format_batch_eta(*self.session.batch_eta(statuses))
+
+        def send():
+            for k, row in rows.items():
+                if row is None:
+                    self.rows.pop(k, None)
+                    self.broadcast('remove', k)
+                elif self.rows.get(k) != row:
+                    self.rows[k] = row
+                    self.broadcast('job', row)
+            self.send_eta(eta)
+        self.loop.call_soon_threadsafe(send)
+
+    def send_eta(self, eta):
+        if eta != self.eta:
+            self.eta = eta
+            self.broadcast('eta', eta)
+
+    async def monitor_render(self, job_ids):
+        """
+        Poll the render status on the Resolve thread until rendering stops, backing off while nothing changes.
+        """
+        poller = self.session.status_poller(job_ids, [self.publish_statuses])
+        interval = poller.min_interval
+        while await self.resolve_call(self.session.proj.IsRenderingInProgress):
+            if await self.resolve_call(poller.poll_once):
+                interval = poller.min_interval
             else:
-                watch_path = values['WATCHPATH']
-                source_folders = values['SOURCEPATHS']
-                for source_folder in source_folders:
-                    # Avoid overwriting.
-                    if values['OUTPUTPATH'] == os.path.join(watch_path, source_folder):
-                        sg.popup('Output path is same to the source path for:\n\n' + latest_output_path)
-                    elif not os.path.exists(os.path.join(watch_path, source_folder)):
-                        sg.Popup('Source path error, please check!')
-                        window['WATCHPATH'](text_color='red')
-                    else:
-                        # Try to import timeline, if Resolve project is switched or closed, will get 'False',
-                        # then create a new project named '%timestamp%_Transcode'.
-                        if not import_timeline(values['WATCHPATH'], source_folder):
-                            proj = pm.CreateProject(f"{datetime.datetime.now():%Y%m%d_%H%M%S_}" + 'Transcode')
-                            mp = proj.GetMediaPool()
-                            import_timeline(watch_path, source_folder)
-                        try:
-                            queue_render(values['RENDERPRESET'][0], os.path.join(watch_path, source_folder))
-                        except IndexError:
-                            sg.Popup('Please select a render preset.')
-
-    if event == 'CLEAR':
-        if proj.IsRenderingInProgress():
-            sg.Popup('Rendering in progres,try later.')
-        else:
-            pending_queue = []
-            finished_queue = []
-            window['TABLE']([])
-            window.refresh()
-
-    if event == 'RENDER':
+                interval = min(interval * poller.backoff, poller.max_interval)
+            await asyncio.sleep(interval)
+        await self.resolve_call(poller.poll_once)
+
+    def refresh_rows(self):
+        statuses = self.session.render_status()
+        rows = {k: status_row(statuses[k], self.session.eta(k, statuses[k])) for k in sorted(statuses)}
+        self.loop.call_soon_threadsafe(self._merge_rows, rows)
+        self.loop.call_soon_threadsafe(self.send_eta, format_batch_eta(*self.session.batch_eta(statuses)))
+
+    def _merge_rows(self, rows):
+        for k in [k for k in self.rows if k not in rows]:
+            del self.rows[k]
+            self.broadcast('remove', k)
+        for k, row in rows.items():
+            if self.rows.get(k) != row:
+                self.rows[k] = row
+                self.broadcast('job', row)
+
+    async def handle_api(self, method, path, query, body):
+        """
+        :return: (status code, JSON response).
+        """
+        session = self.session
+        if path == '/api/state' and method == 'GET':
+            presets = await self.resolve_call(session.render_presets, True)
+            return 200, {'watch_path': self.config.get('Watch path', ''), 'presets': presets,
+                         'output_path': self.config.get('Output path', ''),
+                         'copy_xml': session.copy_xml_flag, 'jobs': list(self.rows.values())}
+        if path == '/api/folders' and method == 'GET':
+            watch_path = query.get('path', [''])[0]
+            if not os.path.isdir(watch_path):
+                return 400, {'error': 'watch path not found'}
+            self.config.update({'Watch path': watch_path})
+            return 200, {'folders': await self.loop.run_in_executor(None, session.source_folders, watch_path)}
+        if method != 'POST':
+            return (404, {'error': 'not found'}) if not path.startswith('/api/') else (405, {'error': 'use POST'})
+
+        if path == '/api/presets':
+            presets = await self.resolve_call(session.render_presets, bool(body.get('custom_only')),
+                                              bool(body.get('refresh')))
+            return 200, {'presets': presets}
+        if path == '/api/queue':
+            watch_path, output_path = body.get('watch_path', ''), body.get('output_path', '')
+            if not body.get('folders') or not body.get('preset'):
+                return 400, {'error': 'select source folders and a render preset'}
+            if not os.path.isdir(watch_path) or not os.path.isdir(output_path):
+                return 400, {'error': 'watch or output path not found'}
+            if await self.resolve_call(session.is_rendering):
+                return 409, {'error': 'Resolve still rendering, go grab a coffee.'}
+            session.copy_xml_flag = bool(body.get('copy_xml'))
+            self.config.update({'Watch path': watch_path, 'Output path': output_path,
+                                'Copy xml': session.copy_xml_flag})
+            queued = []
+            for folder in body['folders']:
+                idx = await self.resolve_call(session.import_and_queue, watch_path, folder, body['preset'],
+                                              output_path)
+                if idx:
+                    queued.append(idx)
+                    await self.resolve_call(self.refresh_rows)
+            return 200, {'queued': queued}
+        if path == '/api/render':
+            if self.monitor and not self.monitor.done():
+                return 409, {'error': 'Rendering in progres,try later.'}
+            started = await self.resolve_call(session.start_rendering)
+            if not started:
+                return 409, {'error': 'Add some jobs first.'}
+            self.monitor = asyncio.ensure_future(self.monitor_render(started))
+            return 200, {'started': started}
+        if path == '/api/abort':
+            await self.resolve_call(session.proj.StopRendering)
+            return 200, {}
+        if path == '/api/clear':
+            if await self.resolve_call(session.proj.IsRenderingInProgress):
+                return 409, {'error': 'Rendering in progres,try later.'}
+            session.jobs.clear()
+            self._merge_rows({})
+            self.send_eta('')
+            return 200, {}
+        return 404, {'error': 'not found'}
+
+    async def handle(self, reader, writer):
+        """
+        One HTTP/1.1 request per connection, /events is kept open as an SSE stream.
+        """
         try:
-            proj.IsRenderingInProgress()
-            if proj.IsRenderingInProgress():
-                sg.Popup('Rendering in progres,try later.')
-            elif pending_queue:
-                # finally submit the render list
-                proj.StartRendering(pending_queue)
-                update_table_while_rendering()
-                finished_queue += pending_queue
-                xml_copied = []
-                pending_queue = []
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            method, target = request_line[0], request_line[1]
+            url = urlsplit(target)
+            length = int(headers.get('content-length', 0) or 0)
+            raw_body = await reader.readexactly(length) if length else b''
+
+            if url.path == '/events':
+                await self.stream_events(writer)
+                return
+            if url.path == '/' and method == 'GET':
+                self.respond(writer, 200, PAGE.encode(), 'text/html; charset=utf-8')
             else:
-                sg.Popup('Add some jobs first.')
-        # Yet there seems no need for further error handling, because the job index will be out of track anyway.
-        except TypeError:
-            sg.Popup('Resolve project is unreachable!')
-            pending_queue = []
-            finished_queue = []
-            window['TABLE']([])
-            window.refresh()
-    if event == 'ABORT':
-        proj.StopRendering()
-        pending_queue = []
-        finished_queue = []
-        window['TABLE']([])
-        window.refresh()
+                try:
+                    body = json.loads(raw_body.decode() or '{}')
+                except ValueError:
+                    self.respond_json(writer, 400, {'error': 'bad JSON'})
+                    return
+                status, data = await self.handle_api(method, url.path, parse_qs(url.query), body)
+                self.respond_json(writer, status, data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, writer, status, payload, content_type):
+        writer.write(f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\nContent-Type: {content_type}\r\n'
+                     f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode() + payload)
+
+    def respond_json(self, writer, status, data):
+        self.respond(writer, status, json.dumps(data).encode(), 'application/json')
+
+    async def stream_events(self, writer):
+        queue = asyncio.Queue(maxsize=1000)
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n\r\n')
+        # the current table first, then only the changes
+        queue.put_nowait(f'event: jobs\ndata: {json.dumps(list(self.rows.values()))}\n\n'.encode())
+        queue.put_nowait(f'event: eta\ndata: {json.dumps(self.eta)}\n\n'.encode())
+        self.clients.add(queue)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # keeps proxies and phones from closing an idle stream
+                    message = b': keep-alive\n\n'
+                if message is None:
+                    break
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.clients.discard(queue)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='FootBrake web version.')
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen on (default all)')
+    parser.add_argument('--port', type=int, default=29259, help='port to listen on (default 29259)')
+    args = parser.parse_args(argv)
+
+    # config.yaml and footbrake.db are shared with the desktop version
+    config_path = os.path.split(os.path.abspath(__file__))[0]
+    db_path = fbcore.default_db_path()
+    session = fbcore.connect(scan_index=ScanIndex(db_path),
+                             probe=MediaProbe(db_path),
+                             dedup=DedupIndex(db_path),
+                             history=RenderHistory(db_path))
+    if not session:
+        print('Cannot get Resolve API. Is Resolve open? Is External Scripting set to "Local"?')
+        return 1
+    config = ConfigStore(os.path.join(config_path, 'config.yaml'))
+    session.presets.extra_builtins = frozenset(config.get('Built-in presets', ()))
+    # off unless set, like in the desktop version
+    session.copy_xml_flag = config.get('Copy xml', False)
+    session.preserve_levels = config.get('Preserve source directory levels')
+    session.render_order = config.get('Render order', 'fifo')
+    if config.get('Verify outputs'):
+        session.verifier = Verifier(on_report=print_report)
+    # 'Post-render actions' in config.yaml, e.g. [manifest, move, notify], run as each job completes, see fbactions.
+    try:
+        session.actions = ActionBus(session, config.get('Post-render actions', ()), on_report=print_action_report,
+                                    delivery_path=config.get('Delivery path'), notify_url=config.get('Notify URL'))
+    except ValueError as e:
+        print(f'{e}, in config.yaml, no post-render actions are run.')
+    if session.render_order not in ORDERS:
+        print(f"Unknown 'Render order' {session.render_order!r} in config.yaml, one of: " + ', '.join(ORDERS))
+        session.render_order = 'fifo'
+
+    # a loop of our own, get_event_loop() without a running loop is deprecated since Python 3.10
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    app = WebApp(session, config, loop)
+    server = loop.run_until_complete(asyncio.start_server(app.handle, args.host, args.port))
+    print(f'FootBrake web on http://{args.host}:{args.port}')
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+        config.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
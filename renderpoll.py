@@ -0,0 +1,124 @@
+"""
+Render status poller.
+
+Fetches Resolve's render job list once per tick, re-queries only the jobs that have not finished yet, backs off while
+nothing changes and publishes the changed job statuses to its subscribers.
+"""
+import threading
+
+from fbmetrics import operation
+
+# A job in one of these states will not change anymore, it is not queried again.
+TERMINAL_STATES = ('Complete', 'Failed', 'Cancelled')
+
+
+class RenderStatusPoller:
+    """
+    Poll the status of a set of render jobs, by job index.
+    :param proj: project object from Resolve API.
+    :param job_ids: render job indexes to follow.
+    :param min_interval: seconds between ticks while statuses keep changing.
+    :param max_interval: upper limit of the interval when nothing changes.
+    :param backoff: factor the interval grows by after a tick without changes.
+    """
+
+    def __init__(self, proj, job_ids=(), min_interval=0.2, max_interval=2.0, backoff=1.5):
+        self.proj = proj
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        # job index -> latest status dictionary, with 'Idx' and 'Name' added
+        self.statuses = {}
+        self._job_ids = set(job_ids)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """
+        Register a callback, called as callback(changes, statuses) after every tick that changed something.
+        changes holds only the jobs whose status differs from the previous tick, statuses holds all of them.
+        """
+        self._subscribers.append(callback)
+
+    def add_jobs(self, job_ids):
+        with self._lock:
+            self._job_ids.update(job_ids)
+
+    def is_active(self, idx):
+        status = self.statuses.get(idx)
+        return status is None or status.get('JobStatus') not in TERMINAL_STATES
+
+    def poll_once(self):
+        """
+        One tick: one GetRenderJobs call plus one GetRenderJobStatus call per unfinished job.
+        :return: dictionary of job index -> status, for the jobs that changed.
+        """
+        with self._lock:
+            job_ids = sorted(self._job_ids)
+        changes = {}
+        with operation('poll'):
+            jobs = self.proj.GetRenderJobs() or {}
+            for idx in job_ids:
+                if idx not in jobs:
+                    # job deleted from Resolve's render queue
+                    if self.statuses.pop(idx, None) is not None:
+                        changes[idx] = None
+                    continue
+                if not self.is_active(idx):
+                    continue
+                status = self.proj.GetRenderJobStatus(idx)
+                if not status:
+                    continue
+                status.update({'Idx': idx, 'Name': jobs[idx].get('TimelineName')})
+                if status != self.statuses.get(idx):
+                    self.statuses[idx] = status
+                    changes[idx] = status
+        if changes:
+            self._publish(changes)
+        return changes
+
+    def _publish(self, changes):
+        statuses = dict(self.statuses)
+        for callback in self._subscribers:
+            callback(changes, statuses)
+
+    def run(self):
+        """
+        Poll until Resolve stops rendering, then do a last tick so the final statuses are published.
+        """
+        self._stop.clear()
+        self.interval = self.min_interval
+        while not self._stop.is_set() and self.proj.IsRenderingInProgress():
+            if self.poll_once():
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._stop.wait(self.interval)
+        self.poll_once()
+
+    def start(self):
+        """
+        Run the poller in a daemon thread.
+        :return: the thread.
+        """
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait(self, timeout=None):
+        """
+        Block until the poller thread is done.
+        :return: True if it finished within timeout.
+        """
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeresolve  # noqa: E402
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """
+    :return: (watch path with the source folders A, B and C of 3 clips each, empty output path).
+    """
+    watch_path = str(tmp_path / 'watch')
+    output_path = str(tmp_path / 'out')
+    os.makedirs(output_path)
+    for name in 'ABC':
+        fakeresolve.make_source_tree(os.path.join(watch_path, name), 3)
+    return watch_path, output_path
+
+
+@pytest.fixture
+def run_cli(tmp_path, monkeypatch, capsys):
+    """
+    :return: function(argv) running fbcli.main against a new FakeResolve, with its database in tmp_path, returning
+        (exit status, list of the JSON events).
+    """
+    import fbcli
+    import fbcore
+    module = types.ModuleType('python_get_resolve')
+    module.GetResolve = fakeresolve.FakeResolve
+    monkeypatch.setitem(sys.modules, 'python_get_resolve', module)
+    monkeypatch.setattr(fbcore, 'default_db_path', lambda: str(tmp_path / 'footbrake.db'))
+
+    def run(argv):
+        capsys.readouterr()
+        status = fbcli.main(argv)
+        return status, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return run
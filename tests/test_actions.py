@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+import fakeresolve
+from fbactions import ActionBus
+from fbcli import EXIT_USAGE
+from fbcore import Session
+from fbjobs import Job
+
+PRESET = 'ProRes 422 Proxy'
+
+
+@pytest.fixture
+def rendered(folders):
+    """
+    :return: (session, job) of folder A, its renders in the output path.
+    """
+    watch_path, output_path = folders
+    session = Session(fakeresolve.FakeResolve())
+    job = Job(1, watch_path, 'A', output_path, PRESET)
+    job.sources = sorted(os.path.join(root, name) for root, dirs, files in os.walk(os.path.join(watch_path, 'A'))
+                         for name in files if name.endswith('.mov'))
+    for path in job.sources:
+        with open(os.path.join(output_path, os.path.basename(path)), 'wb') as filehandle:
+            filehandle.write(fakeresolve.QUICKTIME_HEADER)
+    return session, job
+
+
+def run(session, job, actions, delivery_path=None):
+    reports = []
+    bus = ActionBus(session, actions, on_report=reports.append, delivery_path=delivery_path)
+    try:
+        bus.submit(job, {'Name': 'A_timeline', 'TimeTakenToRenderInMs': 1000}).result()
+    finally:
+        bus.close()
+    return [(report.action, report.ok) for report in reports], reports
+
+
+def test_manifest_and_move(rendered, tmp_path):
+    session, job = rendered
+    delivery_path = str(tmp_path / 'delivery')
+    outcome, reports = run(session, job, ['manifest', 'move', 'notify'], delivery_path)
+    assert outcome == [('manifest', True), ('move', True), ('notify', True)]
+    with open(os.path.join(delivery_path, 'A_timeline.footbrake.json')) as filehandle:
+        assert len(json.load(filehandle)['renders']) == 3
+    # the renders and the manifest
+    assert len(os.listdir(delivery_path)) == 4 and not os.listdir(job.output_path)
+
+
+def test_move_refused_in_incremental_mode(rendered, tmp_path):
+    session, job = rendered
+    session.preserve_levels = 0
+    outcome, reports = run(session, job, ['move', 'manifest', 'notify'], str(tmp_path / 'delivery'))
+    # the actions after a failed one are skipped, notify tells about it
+    assert outcome == [('move', False), ('manifest', None), ('notify', True)]
+    assert 'incremental' in reports[0].message
+    assert len(os.listdir(job.output_path)) == 3
+
+
+def test_cli_refuses_move_with_incremental(folders, run_cli):
+    watch_path, output_path = folders
+    argv = [watch_path, '--preset', PRESET, '--output', output_path, '--action', 'move', '--delivery', output_path,
+            '--incremental', '1']
+    with pytest.raises(SystemExit) as exit_info:
+        run_cli(argv)
+    assert exit_info.value.code == EXIT_USAGE
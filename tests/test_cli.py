@@ -0,0 +1,57 @@
+import os
+import sys
+import types
+
+from fbcli import EXIT_NO_RESOLVE, EXIT_OK, EXIT_USAGE, folder_deadline, match_folders
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def events(log, name):
+    return [event for event in log if event['event'] == name]
+
+
+def test_match_folders():
+    names = ['A001', 'A002', 'B001']
+    assert match_folders(names, []) == names
+    assert match_folders(names, ['A*', 'B001']) == names
+    assert match_folders(names, ['a*']) == []
+
+
+def test_folder_deadline():
+    assert folder_deadline('A001', [('B*', 1), ('A*', 2), ('A001', 3)]) == 2
+    assert folder_deadline('C001', [('A*', 2)]) is None
+
+
+def test_renders_every_preset_into_its_folder(folders, run_cli):
+    watch_path, output_path = folders
+    status, log = run_cli([watch_path, 'A', 'B', '--preset', PRESET, '--preset', 'DNxHR LB',
+                           '--output', output_path, '--copy-xml'])
+    assert status == EXIT_OK
+    assert len(events(log, 'queued')) == 4
+    done = events(log, 'done')[0]
+    assert (done['complete'], done['failed'], done['folders']) == (4, 0, 2)
+    assert sorted(os.listdir(output_path)) == ['DNxHR LB', PRESET]
+    # the sidecars next to the renders of both presets
+    assert os.path.isfile(os.path.join(output_path, PRESET, 'A', 'A000', 'A000_C000', 'A000C00000.xml'))
+
+
+def test_queue_only_renders_nothing(folders, run_cli):
+    watch_path, output_path = folders
+    status, log = run_cli([watch_path, 'A', '--preset', PRESET, '--output', output_path, '--queue-only'])
+    assert status == EXIT_OK and events(log, 'status') == []
+
+
+def test_usage_errors(folders, run_cli):
+    watch_path, output_path = folders
+    assert run_cli([watch_path, 'Z*', '--preset', PRESET, '--output', output_path])[0] == EXIT_USAGE
+    assert run_cli([watch_path, '--preset', 'nope', '--output', output_path])[0] == EXIT_USAGE
+    assert run_cli([watch_path + '/missing', '--preset', PRESET, '--output', output_path])[0] == EXIT_USAGE
+
+
+def test_no_resolve(folders, run_cli, monkeypatch):
+    watch_path, output_path = folders
+    module = types.ModuleType('python_get_resolve')
+    module.GetResolve = lambda: None
+    monkeypatch.setitem(sys.modules, 'python_get_resolve', module)
+    assert run_cli([watch_path, '--preset', PRESET, '--output', output_path])[0] == EXIT_NO_RESOLVE
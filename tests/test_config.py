@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from fbconfig import ConfigStore, yaml_dump, yaml_load
+
+
+def test_changes_are_written_once_after_the_quiet_period(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    config = ConfigStore(path, delay=0.2)
+    for i in range(20):
+        config.update({'Watch path': '/Volumes/Cards/' + 'x' * i})
+    assert config.writes == 0 and not os.path.exists(path)
+    time.sleep(0.5)
+    assert config.writes == 1
+    assert yaml_load(path) == {'Watch path': '/Volumes/Cards/' + 'x' * 19}
+
+
+def test_unchanged_values_schedule_nothing(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    yaml_dump({'Copy xml': False}, path)
+    config = ConfigStore(path, delay=0.05)
+    config.update({'Copy xml': False})
+    config.flush()
+    assert config.writes == 0
+
+
+def test_flush_writes_now(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    config = ConfigStore(path, delay=60)
+    config.update({'Render order': 'sjf'})
+    config.flush()
+    assert config.writes == 1 and yaml_load(path) == {'Render order': 'sjf'}
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'config.yaml')
+    yaml_dump({'Render order': 'fifo'}, path)
+
+    def broken_dump(data, filehandle):
+        filehandle.write('Render order: ')
+        raise OSError('disk full')
+
+    monkeypatch.setattr('fbconfig.yaml.dump', broken_dump)
+    with pytest.raises(OSError):
+        yaml_dump({'Render order': 'sjf'}, path)
+    assert yaml_load(path) == {'Render order': 'fifo'}
+    # no temp file left behind
+    assert os.listdir(str(tmp_path)) == ['config.yaml']
+
+
+def test_broken_file_loads_empty(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    with open(path, 'w') as filehandle:
+        filehandle.write('- just\n- a list\n')
+    assert yaml_load(path) == {}
+    assert yaml_load(str(tmp_path / 'missing.yaml')) == {}
@@ -0,0 +1,61 @@
+import os
+
+import fakeresolve
+from fbcopy import MTIME_TOLERANCE, copy_sidecars
+
+
+def sidecar_tree(tmp_path):
+    watch_path = str(tmp_path / 'watch')
+    fakeresolve.make_source_tree(os.path.join(watch_path, 'A'), 100, clips_per_folder=50, sidecar_every=10)
+    return watch_path, str(tmp_path / 'out')
+
+
+def test_copies_the_sidecars_with_their_folders(tmp_path):
+    watch_path, output_path = sidecar_tree(tmp_path)
+    report = copy_sidecars(watch_path, 'A', output_path)
+    assert (report.copied, report.skipped, report.failed) == (10, 0, [])
+    copied = os.path.join(output_path, 'A', 'A000', 'A000_C001', 'A001C00050.xml')
+    source = os.path.join(watch_path, 'A', 'A000', 'A000_C001', 'A001C00050.xml')
+    assert os.path.isfile(copied)
+    assert os.stat(copied).st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    watch_path, output_path = sidecar_tree(tmp_path)
+    copy_sidecars(watch_path, 'A', output_path)
+    report = copy_sidecars(watch_path, 'A', output_path)
+    assert (report.copied, report.skipped) == (0, 10)
+
+
+def test_mtime_within_the_tolerance_is_unchanged(tmp_path):
+    watch_path, output_path = sidecar_tree(tmp_path)
+    copy_sidecars(watch_path, 'A', output_path)
+    source = os.path.join(watch_path, 'A', 'A000', 'A000_C000', 'A000C00000.xml')
+    target = os.path.join(output_path, 'A', 'A000', 'A000_C000', 'A000C00000.xml')
+    mtime = os.stat(source).st_mtime
+    # FAT rounds to 2 seconds
+    os.utime(target, (mtime, mtime + MTIME_TOLERANCE / 2))
+    assert copy_sidecars(watch_path, 'A', output_path).copied == 0
+    os.utime(target, (mtime, mtime + MTIME_TOLERANCE + 1))
+    assert copy_sidecars(watch_path, 'A', output_path).copied == 1
+
+
+def test_changed_size_is_copied_again(tmp_path):
+    watch_path, output_path = sidecar_tree(tmp_path)
+    copy_sidecars(watch_path, 'A', output_path)
+    source = os.path.join(watch_path, 'A', 'A000', 'A000_C000', 'A000C00010.xml')
+    stat = os.stat(source)
+    with open(source, 'wb') as filehandle:
+        filehandle.write(b'<xml/>')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    report = copy_sidecars(watch_path, 'A', output_path)
+    assert (report.copied, report.bytes) == (1, 6)
+
+
+def test_unwritable_destination_is_reported(tmp_path):
+    watch_path, output_path = sidecar_tree(tmp_path)
+    # a file where a destination folder should be
+    os.makedirs(os.path.join(output_path, 'A'))
+    open(os.path.join(output_path, 'A', 'A000'), 'w').close()
+    report = copy_sidecars(watch_path, 'A', output_path)
+    assert report.copied == 0 and len(report.failed) == 2
@@ -0,0 +1,85 @@
+import os
+import shutil
+
+import fakeresolve
+from fbcore import Session
+from fbdedup import DedupIndex, folder_fingerprint
+from fbindex import ScanIndex
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def imports(resolve):
+    """
+    :return: media pool imports so far, one per bin.
+    """
+    return resolve.log.counts['MediaStorage.AddItemsToMediaPool']
+
+
+def test_same_folder_reuses_its_timeline(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    session = Session(resolve, dedup=DedupIndex())
+    session.import_and_queue(watch_path, 'A', PRESET, output_path)
+    timeline_name = session.timeline.GetName()
+    before = imports(resolve)
+    assert session.import_and_queue(watch_path, 'A', 'DNxHR LB', output_path)
+    assert imports(resolve) == before
+    assert session.proj.GetCurrentTimeline().GetName() == timeline_name
+
+
+def test_copy_elsewhere_is_imported_again(folders, tmp_path):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    session = Session(resolve, dedup=DedupIndex())
+    session.import_and_queue(watch_path, 'A', PRESET, output_path)
+    before = imports(resolve)
+    # same names, sizes and mtimes, like rsync -a
+    other_watch_path = str(tmp_path / 'other')
+    shutil.copytree(os.path.join(watch_path, 'A'), os.path.join(other_watch_path, 'A'))
+    session.import_and_queue(other_watch_path, 'A', PRESET, output_path)
+    assert imports(resolve) > before
+
+
+def test_lookup_checks_the_source():
+    dedup = DedupIndex()
+    dedup.record('f00', '/watch/A', 'Project', 'bin', 'timeline')
+    assert dedup.lookup('f00', '/watch/A') == ('Project', 'bin', 'timeline')
+    assert dedup.lookup('f00', '/copy/A') is None
+    dedup.forget('f00')
+    assert dedup.lookup('f00', '/watch/A') is None
+
+
+def test_changed_folder_is_imported_again(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    session = Session(resolve, dedup=DedupIndex())
+    session.import_and_queue(watch_path, 'A', PRESET, output_path)
+    before = imports(resolve)
+    with open(os.path.join(watch_path, 'A', 'new.mov'), 'wb') as filehandle:
+        filehandle.write(fakeresolve.QUICKTIME_HEADER)
+    session.import_and_queue(watch_path, 'A', PRESET, output_path)
+    assert imports(resolve) > before
+
+
+def test_scan_index_fingerprint_matches_a_walk(folders, tmp_path):
+    watch_path, output_path = folders
+    scan_index = ScanIndex(str(tmp_path / 'index.db'))
+    path = os.path.join(watch_path, 'A')
+    assert folder_fingerprint(path, scan_index.walk) == folder_fingerprint(path)
+    # listed from the cache the second time
+    stats = dict(scan_index.stats)
+    assert folder_fingerprint(path, scan_index.walk) == folder_fingerprint(path)
+    assert scan_index.stats['scandir'] == stats['scandir']
+
+
+def test_file_appended_to_changes_the_fingerprint(folders, tmp_path):
+    watch_path, output_path = folders
+    scan_index = ScanIndex(str(tmp_path / 'index.db'))
+    path = os.path.join(watch_path, 'A')
+    before = folder_fingerprint(path, scan_index.walk)
+    clip = next(os.path.join(root, name) for root, dirs, files in os.walk(path) for name in files)
+    # the folder's mtime stays, its cached listing is not refreshed
+    with open(clip, 'ab') as filehandle:
+        filehandle.write(b'more frames')
+    assert folder_fingerprint(path, scan_index.walk) != before
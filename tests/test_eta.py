@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from fbeta import batch_remaining_seconds, format_batch_eta, order_jobs, parse_deadline, remaining_seconds
+from fbhistory import RenderHistory
+from fbjobs import COMPLETE, RENDERING, Job
+
+
+def job(idx, preset='ProRes 422 Proxy', frames=0, state=None, deadline=None):
+    job = Job(idx, '/watch', f'S{idx}', '/out', preset)
+    job.frames = frames
+    job.deadline = deadline
+    if state:
+        job.state = state
+    return job
+
+
+@pytest.fixture
+def history():
+    history = RenderHistory()
+    # 100 fps for ProRes, 10 fps for DNxHR
+    history.record('ProRes 422 Proxy', 'T1', 1000, 10000, COMPLETE)
+    history.record('DNxHR LB', 'T2', 100, 10000, COMPLETE)
+    return history
+
+
+def test_estimate_from_history(history):
+    assert remaining_seconds(job(1, frames=500), None, history) == 5
+    # no history of the preset, the speed of all of them
+    assert remaining_seconds(job(1, 'H.264', frames=1100), None, history) == 20
+    assert remaining_seconds(job(1), None, history) is None
+    assert remaining_seconds(job(1, frames=500, state=COMPLETE), None, history) == 0
+
+
+def test_rendering_job_goes_by_its_progress(history):
+    rendering = job(1, frames=500, state=RENDERING)
+    assert remaining_seconds(rendering, {'CompletionPercentage': 25, 'TimeTakenToRenderInMs': 3000}, history) == 9
+    assert remaining_seconds(rendering, {'CompletionPercentage': 25, 'EstimatedTimeRemainingInMs': 4000},
+                             history) == 4
+
+
+def test_batch_counts_the_unknown_jobs(history):
+    jobs = [job(1, frames=500), job(2, 'DNxHR LB', frames=50), job(3)]
+    assert batch_remaining_seconds(jobs, {}, history) == (10, 1)
+    assert format_batch_eta(10, 1) == 'Batch ETA 0:00:10 + 1 job unknown'
+    assert format_batch_eta(0, 0) == ''
+
+
+def test_orders(history):
+    jobs = [job(1, frames=1000), job(2, 'DNxHR LB', frames=50, deadline=100), job(3), job(4, frames=100, deadline=200)]
+    assert order_jobs(jobs, 'fifo', history) == jobs
+    # the job without an estimate goes last
+    assert [j.idx for j in order_jobs(jobs, 'sjf', history)] == [4, 2, 1, 3]
+    assert [j.idx for j in order_jobs(jobs, 'deadline', history)] == [2, 4, 1, 3]
+    with pytest.raises(ValueError):
+        order_jobs(jobs, 'lifo', history)
+
+
+def test_parse_deadline():
+    now = datetime.datetime(2024, 5, 1, 18, 30)
+    assert parse_deadline('2024-05-02 09:00', now) == datetime.datetime(2024, 5, 2, 9).timestamp()
+    assert parse_deadline('20:00', now) == datetime.datetime(2024, 5, 1, 20).timestamp()
+    # passed already today
+    assert parse_deadline('09:00', now) == datetime.datetime(2024, 5, 2, 9).timestamp()
+    with pytest.raises(ValueError):
+        parse_deadline('tomorrow', now)
@@ -0,0 +1,31 @@
+import os
+
+import fakeresolve
+import fbbench
+
+
+def test_calls_are_counted_per_method():
+    resolve = fakeresolve.FakeResolve()
+    project = resolve.GetProjectManager().GetCurrentProject()
+    project.GetRenderJobs()
+    project.GetRenderJobs()
+    assert resolve.log.counts['ProjectManager.GetCurrentProject'] == 1
+    assert resolve.log.counts['Project.GetRenderJobs'] == 2
+    assert resolve.log.total() == 4
+
+
+def test_source_tree_has_clips_and_sidecars(tmp_path):
+    paths = fakeresolve.make_source_tree(str(tmp_path / 'A'), 60, clips_per_folder=25, sidecar_every=25)
+    assert len(paths) == 60
+    assert len({path.rsplit('/', 1)[0] for path in paths}) == 3
+    sidecars = [path.replace('.mov', '.xml') for path in paths[::25]]
+    assert all(open(path, 'rb').read() == fakeresolve.QUICKTIME_HEADER for path in paths)
+    assert all(os.path.isfile(path) for path in sidecars)
+
+
+def test_benchmark_reports_calls_per_operation(tmp_path):
+    results = fbbench.run_size(20, 0.0, 2, str(tmp_path))
+    assert set(results) == {'import_timeline', 'make_timeline_with_folder', 'queue_render', 'update_render_status',
+                            'copy_xml'}
+    for result in results.values():
+        assert result['api_calls'] == sum(result['methods'].values())
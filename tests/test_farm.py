@@ -0,0 +1,112 @@
+import multiprocessing
+import socket
+import time
+
+import pytest
+
+import fakeresolve
+import fbfarm
+from fbjobs import COMPLETE
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_node(port):
+    process = multiprocessing.Process(target=fakeresolve.serve, args=(('127.0.0.1', port),),
+                                      kwargs={'render_fps': 300}, daemon=True)
+    process.start()
+    for _ in range(50):
+        resolve = fakeresolve.connect(('127.0.0.1', port))
+        if resolve is not None:
+            resolve._client.close()
+            return process
+        time.sleep(0.1)
+    process.kill()
+    pytest.fail(f'fake Resolve on port {port} did not start')
+
+
+@pytest.fixture
+def ports():
+    return free_port(), free_port()
+
+
+def test_jobs_of_a_dead_node_move_and_the_node_rejoins(folders, ports):
+    watch_path, output_path = folders
+    processes = {port: start_node(port) for port in ports}
+    messages = []
+    farm = fbfarm.FarmScheduler({'a': fbfarm.fake_connector(('127.0.0.1', ports[0])),
+                                 'b': fbfarm.fake_connector(('127.0.0.1', ports[1])),
+                                 'c': fbfarm.fake_connector(('127.0.0.1', free_port()))},
+                                notify=lambda message, title=None: messages.append(message), retry_interval=0.05)
+    try:
+        assert farm.connect() == 2
+        jobs = [farm.submit(watch_path, name, PRESET, output_path) for name in 'ABC']
+        moved = [job for job in jobs if job.node == 'a']
+        assert moved and all(job.node in ('a', 'b') for job in jobs)
+        polls = []
+
+        def on_poll(farm_jobs):
+            polls.append(farm_jobs)
+            if len(polls) == 1:
+                processes[ports[0]].kill()
+                processes[ports[0]].join()
+            elif len(polls) == 2:
+                processes[ports[0]] = start_node(ports[0])
+
+        jobs = farm.run(0.1, [on_poll])
+        assert [job.state for job in jobs] == [COMPLETE] * 3
+        assert all(job.node == 'b' and job.attempts == 2 for job in moved)
+        assert any(message.startswith('Node a is down') for message in messages)
+        # connected again on the next poll
+        farm.run(0.1)
+        assert 'Node a is back.' in messages
+    finally:
+        for process in processes.values():
+            process.kill()
+
+
+def test_a_node_without_a_project_is_lost(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    messages = []
+    farm = fbfarm.FarmScheduler({'a': lambda: resolve}, notify=lambda message, title=None: messages.append(message),
+                                retry_interval=0)
+    assert farm.connect() == 1
+    job = farm.submit(watch_path, 'A', PRESET, output_path)
+    assert job.node == 'a'
+    resolve.project_manager.current_project = None
+    farm.poll()
+    assert not farm.alive_nodes() and job.node is None
+    assert messages == ['Node a is down, moving 1 jobs.']
+    # answers again, but still without a project
+    assert farm.connect() == 0
+
+
+def test_unreachable_nodes_are_retried_with_backoff(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(fbfarm.time, 'monotonic', lambda: now[0])
+    attempts = []
+    farm = fbfarm.FarmScheduler({'a': lambda: attempts.append(now[0])}, retry_interval=1, max_retry_interval=4)
+    for _ in range(30):
+        farm.connect()
+        now[0] += 0.5
+    assert attempts == [100.0, 101.0, 103.0, 107.0, 111.0]
+
+
+def test_one_poller_per_node(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    farm = fbfarm.FarmScheduler({'a': lambda: resolve})
+    farm.connect()
+    poller = farm.nodes[0].poller
+    farm.submit(watch_path, 'A', PRESET, output_path)
+    farm.start()
+    for _ in range(3):
+        farm.poll()
+    assert farm.nodes[0].poller is poller and poller.statuses
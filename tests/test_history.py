@@ -0,0 +1,78 @@
+import datetime
+import json
+import sqlite3
+
+import pytest
+
+import fbhistory
+from fbhistory import RenderHistory, format_report
+
+
+def at(monkeypatch, *date):
+    monkeypatch.setattr(fbhistory.time, 'time', lambda: datetime.datetime(*date).timestamp())
+
+
+@pytest.fixture
+def history(monkeypatch):
+    history = RenderHistory()
+    at(monkeypatch, 2026, 3, 2, 12)
+    history.record('ProRes 422 Proxy', 'T1', 1000, 10000, 'Complete', 'a', clips=10, bytes=50 * 10 ** 6)
+    history.record('ProRes 422 Proxy', 'T2', 500, 5000, 'Failed', 'a', clips=5)
+    at(monkeypatch, 2026, 3, 3, 12)
+    history.record('ProRes 422 Proxy', 'T3', 1000, 20000, 'Complete', 'a', clips=10)
+    history.record('ProRes 422 Proxy', 'T4', 2000, 10000, 'Complete', 'b', clips=20, bytes=10 ** 8)
+    return history
+
+
+def test_speed_of_the_completed_jobs(history):
+    assert history.frames_per_second('ProRes 422 Proxy') == 4000 * 1000.0 / 40000
+    assert history.frames_per_second('DNxHR LB') is None
+    assert history.estimate('DNxHR LB', 100) == 1
+    assert history.estimate('ProRes 422 Proxy', 0) is None
+
+
+def test_speed_over_the_window(history, monkeypatch):
+    history.window = 1
+    at(monkeypatch, 2026, 3, 4, 12)
+    history.record('ProRes 422 Proxy', 'T5', 300, 1000, 'Complete', 'a')
+    assert history.frames_per_second('ProRes 422 Proxy') == 300
+
+
+def test_report_per_day_and_host(history):
+    report = history.report('day')
+    assert [(row['period'], row['host'], row['jobs'], row['failed'], row['clips'], row['frames']) for row in report] \
+        == [('2026-03-02', 'a', 2, 1, 15, 1000), ('2026-03-03', 'a', 1, 0, 10, 1000),
+            ('2026-03-03', 'b', 1, 0, 20, 2000)]
+    assert report[0]['fps'] == 100 and report[0]['mb_per_s'] == 5
+    # against the day before, of the same host
+    assert report[1]['fps'] == 50 and report[1]['fps_change'] == -50
+    assert report[1]['mb_per_s'] is None and report[2]['fps_change'] is None
+
+
+def test_report_filters(history):
+    since = datetime.datetime(2026, 3, 3).timestamp()
+    assert [row['jobs'] for row in history.report('all', since=since)] == [1, 1]
+    assert [row['jobs'] for row in history.report('month', host='b')] == [1]
+    assert history.report('week', preset='DNxHR LB') == []
+    assert format_report(history.report('all')).splitlines()[0].split()[:3] == ['Period', 'Preset', 'Host']
+
+
+def test_older_database_gets_the_new_columns(tmp_path):
+    db_path = str(tmp_path / 'footbrake.db')
+    db = sqlite3.connect(db_path)
+    db.execute('CREATE TABLE render_history (finished REAL NOT NULL, preset TEXT, timeline TEXT, '
+               'frames INTEGER NOT NULL, render_ms INTEGER NOT NULL, state TEXT NOT NULL)')
+    db.execute("INSERT INTO render_history VALUES (0, 'ProRes 422 Proxy', 'T1', 100, 1000, 'Complete')")
+    db.commit()
+    db.close()
+    history = RenderHistory(db_path)
+    history.record('ProRes 422 Proxy', 'T2', 100, 1000, 'Complete', 'a', clips=3, bytes=100)
+    assert [(row['host'], row['clips']) for row in history.report('all')] == [(None, 0), ('a', 3)]
+
+
+def test_main(history, tmp_path, capsys):
+    db_path = str(tmp_path / 'footbrake.db')
+    RenderHistory(db_path).record('ProRes 422 Proxy', 'T1', 100, 1000, 'Complete', 'a')
+    assert fbhistory.main(['--db', db_path, '--by', 'all', '--json']) == 0
+    assert json.loads(capsys.readouterr().out)[0]['fps'] == 100
+    assert fbhistory.main(['--db', str(tmp_path / 'missing.db')]) == 1
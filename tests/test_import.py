@@ -0,0 +1,43 @@
+import fakeresolve
+from fbimport import mp_add_source
+
+
+def import_tree(tmp_path, clips, **kwargs):
+    resolve = fakeresolve.FakeResolve()
+    media_pool = resolve.GetProjectManager().GetCurrentProject().GetMediaPool()
+    media_storage = resolve.GetMediaStorage()
+    path = str(tmp_path / 'A')
+    paths = fakeresolve.make_source_tree(path, clips, **kwargs)
+    resolve.log.reset()
+    report = mp_add_source(path, True, media_pool, media_storage)
+    return resolve, report, paths
+
+
+def test_one_import_call_per_bin(tmp_path):
+    # 2 parent folders, 10 + 2 leaf folders of 50 clips, a sidecar every 25
+    resolve, report, paths = import_tree(tmp_path, 600)
+    leaf_bins = 12
+    assert report.bins == 2 + leaf_bins
+    assert report.files == 600 + 24
+    assert resolve.log.counts['MediaStorage.AddItemsToMediaPool'] == leaf_bins
+    assert resolve.log.counts['MediaPool.SetCurrentFolder'] == leaf_bins
+    assert resolve.log.counts['MediaPool.AddSubFolder'] == report.bins
+    # GetCurrentFolder, a bin each, SetCurrentFolder and AddItemsToMediaPool per bin with files
+    assert report.api_calls == resolve.log.total() == 1 + report.bins + 2 * leaf_bins
+
+
+def test_calls_do_not_grow_with_the_clips_per_bin(tmp_path):
+    few = import_tree(tmp_path / 'few', 10, clips_per_folder=10)[0].log.total()
+    many = import_tree(tmp_path / 'many', 1000, clips_per_folder=1000)[0].log.total()
+    assert few == many
+
+
+def test_file_filter_keeps_files_away_from_resolve(tmp_path):
+    resolve = fakeresolve.FakeResolve()
+    project = resolve.GetProjectManager().GetCurrentProject()
+    path = str(tmp_path / 'A')
+    fakeresolve.make_source_tree(path, 50)
+    report = mp_add_source(path, True, project.GetMediaPool(), resolve.GetMediaStorage(),
+                           file_filter=lambda paths: [p for p in paths if p.endswith('.mov')])
+    assert report.clips == 50 and report.skipped == 2
+    assert [len(clips) for folder, clips in report.bin_clips] == [50]
@@ -0,0 +1,93 @@
+import os
+import time
+
+import fakeresolve
+from fbcore import Session
+from fbincremental import Manifest, output_dir, stale_clips
+
+LEVELS = 2
+
+
+def render(paths, output_path):
+    """
+    Write the renders Resolve would, empty files where the preset's directory levels put them.
+    """
+    for path in paths:
+        directory = output_dir(output_path, path, LEVELS)
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, os.path.basename(path)), 'wb').close()
+
+
+def stats(paths):
+    return {path: (os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths}
+
+
+def test_without_renders_every_clip_is_stale(tmp_path):
+    paths = fakeresolve.make_source_tree(str(tmp_path / 'A'), 4)
+    output_path = str(tmp_path / 'out')
+    assert list(stale_clips(paths, output_path, LEVELS, Manifest(str(tmp_path)))) == paths
+
+
+def test_render_without_manifest_entry_is_stale(tmp_path):
+    paths = fakeresolve.make_source_tree(str(tmp_path / 'A'), 4)
+    output_path = str(tmp_path / 'out')
+    os.makedirs(output_path)
+    # e.g. left by a cancelled render, newer than the clips
+    render(paths, output_path)
+    assert list(stale_clips(paths, output_path, LEVELS, Manifest(output_path))) == paths
+
+
+def test_recorded_renders_are_up_to_date(tmp_path):
+    paths = fakeresolve.make_source_tree(str(tmp_path / 'A'), 4)
+    output_path = str(tmp_path / 'out')
+    os.makedirs(output_path)
+    render(paths, output_path)
+    Manifest(output_path).update(stats(paths))
+    assert stale_clips(paths, output_path, LEVELS, Manifest(output_path)) == {}
+
+
+def test_changed_and_missing_renders_are_stale(tmp_path):
+    paths = fakeresolve.make_source_tree(str(tmp_path / 'A'), 4)
+    output_path = str(tmp_path / 'out')
+    os.makedirs(output_path)
+    render(paths, output_path)
+    Manifest(output_path).update(stats(paths))
+    os.utime(paths[1], ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    os.unlink(os.path.join(output_dir(output_path, paths[2], LEVELS), os.path.basename(paths[2])))
+    assert list(stale_clips(paths, output_path, LEVELS, Manifest(output_path))) == paths[1:3]
+
+
+def test_session_records_completed_jobs(folders):
+    watch_path, output_path = folders
+    session = Session(fakeresolve.FakeResolve())
+    session.preserve_levels = LEVELS
+    idx = session.import_and_queue(watch_path, 'A', 'ProRes 422 Proxy', output_path)
+    paths = session.jobs.get(idx).sources
+    session.start_rendering()
+    session.status_poller([idx]).run()
+    # the fake renderer writes no files
+    render(paths, output_path)
+    assert session.stale_clips(watch_path, 'A', output_path) == {}
+    assert session.import_and_queue(watch_path, 'A', 'ProRes 422 Proxy', output_path) is None
+
+
+def test_cli_renders_every_preset_incrementally(folders, run_cli):
+    watch_path, output_path = folders
+    presets = ['ProRes 422 Proxy', 'DNxHR LB']
+    argv = [watch_path, 'A', '--preset', presets[0], '--preset', presets[1], '--output', output_path,
+            '--incremental', str(LEVELS)]
+    status, log = run_cli(argv)
+    queued = [event for event in log if event['event'] == 'queued']
+    assert status == 0 and [event['preset'] for event in queued] == presets
+    paths = sorted(os.path.join(root, name) for root, dirs, files in os.walk(os.path.join(watch_path, 'A'))
+                   for name in files if name.endswith('.mov'))
+    for preset in presets:
+        render(paths, os.path.join(output_path, preset))
+    # the clips are in the manifests of both presets' output paths
+    status, log = run_cli(argv)
+    assert status == 0 and [event['event'] for event in log if event.get('folder') == 'A'] == ['skipped']
+    # a render missing from one of them queues the folder again, for every preset
+    os.unlink(os.path.join(output_dir(os.path.join(output_path, presets[1]), paths[0], LEVELS),
+                           os.path.basename(paths[0])))
+    status, log = run_cli(argv)
+    assert len([event for event in log if event['event'] == 'queued']) == 2
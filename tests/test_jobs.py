@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+import fakeresolve
+from fbcore import Session
+from fbjobs import CANCELLED, COMPLETE, FAILED, QUEUED, RENDERING, InvalidTransition, JobRegistry
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def test_registry_transitions():
+    jobs = JobRegistry()
+    jobs.add(1, '/watch', 'A', '/out')
+    assert jobs.get(1).state == QUEUED and jobs.pending_ids() == [1]
+    jobs.start([1])
+    assert jobs.get(1).state == RENDERING and jobs.pending_ids() == []
+    assert jobs.get(1).started is not None
+    jobs.update(1, {'JobStatus': 'Complete'})
+    assert jobs.get(1).state == COMPLETE
+    with pytest.raises(InvalidTransition):
+        jobs.transition(1, RENDERING)
+
+
+def test_failed_job_can_be_queued_again():
+    jobs = JobRegistry()
+    jobs.add(1, '/watch', 'A', '/out')
+    jobs.start([1])
+    jobs.update(1, {'JobStatus': 'Failed'})
+    jobs.get(1).recorded = True
+    assert jobs.get(1).state == FAILED and jobs.pending_ids() == []
+    jobs.transition(1, QUEUED)
+    assert jobs.pending_ids() == [1] and not jobs.get(1).recorded
+
+
+def test_unknown_status_leaves_the_state():
+    jobs = JobRegistry()
+    jobs.add(1, '/watch', 'A', '/out')
+    jobs.update(1, {'JobStatus': 'Paused'})
+    assert jobs.get(1).state == QUEUED
+
+
+def test_gone_from_resolve_is_removed():
+    jobs = JobRegistry()
+    jobs.add(1, '/watch', 'A', '/out')
+    jobs.update(1, None)
+    assert 1 not in jobs and jobs.update(1, None) is None
+
+
+def test_oldest_finished_jobs_are_dropped():
+    jobs = JobRegistry(max_finished=2)
+    for idx in (1, 2, 3, 4):
+        jobs.add(idx, '/watch', str(idx), '/out')
+    jobs.start([1, 2, 3])
+    for idx in (1, 2, 3):
+        jobs.update(idx, {'JobStatus': 'Complete'})
+    assert jobs.ids() == [2, 3, 4] and jobs.pending_ids() == [4]
+
+
+def test_ready_stays_rendering_until_the_render_stops():
+    jobs = JobRegistry()
+    jobs.add(1, '/watch', 'A', '/out')
+    jobs.start([1])
+    # waiting for its turn in the batch
+    jobs.update(1, {'JobStatus': 'Ready'}, rendering=True)
+    assert jobs.get(1).state == RENDERING and jobs.pending_ids() == []
+    # the render was stopped before it got there
+    jobs.update(1, {'JobStatus': 'Ready'}, rendering=False)
+    assert jobs.get(1).state == QUEUED and jobs.pending_ids() == [1]
+
+
+def test_session_renders_to_complete(folders):
+    watch_path, output_path = folders
+    session = Session(fakeresolve.FakeResolve())
+    ids = [session.import_and_queue(watch_path, name, PRESET, output_path) for name in 'AB']
+    assert session.start_rendering() == ids
+    session.status_poller(ids).run()
+    assert [session.jobs.get(k).state for k in ids] == [COMPLETE, COMPLETE]
+
+
+def test_failed_render(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    session = Session(resolve)
+    idx = session.import_and_queue(watch_path, 'A', PRESET, output_path)
+    resolve.failing_timelines.add(session.timeline.GetName())
+    session.start_rendering()
+    session.status_poller([idx]).run()
+    assert session.jobs.get(idx).state == FAILED
+
+
+def test_stop_requeues_the_jobs_not_reached(folders):
+    watch_path, output_path = folders
+    # 400 frames a job, 4 seconds each
+    session = Session(fakeresolve.FakeResolve(render_fps=100))
+    for name in 'ABC':
+        session.import_and_queue(watch_path, name, PRESET, output_path)
+    ids = session.start_rendering()
+    poller = session.status_poller(ids)
+    thread = threading.Thread(target=poller.run)
+    thread.start()
+    try:
+        # the batch is running, the jobs waiting for their turn stay RENDERING
+        time.sleep(0.5)
+        assert [session.jobs.get(k).state for k in ids] == [RENDERING] * 3
+    finally:
+        session.proj.StopRendering()
+        thread.join()
+    assert [session.jobs.get(k).state for k in ids] == [CANCELLED, QUEUED, QUEUED]
+    assert session.jobs.pending_ids() == ids[1:]
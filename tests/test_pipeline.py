@@ -0,0 +1,72 @@
+import threading
+
+import fakeresolve
+import fbcore
+import fbmetrics
+from fbcore import Session
+from fbjobs import COMPLETE
+from fbpipeline import RenderPipeline
+from fbserial import serialize
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def test_renders_start_while_the_next_folder_imports(folders, monkeypatch):
+    watch_path, output_path = folders
+    session = Session(fakeresolve.FakeResolve(render_fps=1000))
+    started = threading.Event()
+    waited = []
+    mp_add_source = fbcore.mp_add_source
+
+    def slow_import(fpath, *args, **kwargs):
+        if fpath.endswith('B'):
+            # the first folder's render starts meanwhile
+            waited.append(started.wait(5))
+        return mp_add_source(fpath, *args, **kwargs)
+
+    start_rendering = session.start_rendering
+
+    def start():
+        ids = start_rendering()
+        started.set()
+        return ids
+
+    monkeypatch.setattr(fbcore, 'mp_add_source', slow_import)
+    monkeypatch.setattr(session, 'start_rendering', start)
+    pipeline = RenderPipeline(session, watch_path, [(PRESET, output_path)], interval=0.05)
+    pipeline.add('A')
+    pipeline.add('B')
+    pipeline.close()
+    assert pipeline.run() == [1, 2]
+    assert waited == [True]
+    assert [session.jobs.get(k).state for k in (1, 2)] == [COMPLETE] * 2
+
+
+def test_proxies_stack(monkeypatch):
+    monkeypatch.setattr(fbmetrics.registry, 'enabled', True)
+    fbmetrics.registry.reset()
+    lock = threading.RLock()
+    held = []
+    resolve = serialize(fbmetrics.instrument(fakeresolve.FakeResolve(), 'Resolve'), lock)
+    project = resolve.GetProjectManager().GetCurrentProject()
+    media_pool = project.GetMediaPool()
+    root = media_pool.GetRootFolder()
+    media_pool.SetCurrentFolder(root)
+    # unwrapped layer by layer on the way in, wrapped again on the way out
+    assert media_pool.GetCurrentFolder() == root and hash(media_pool.GetCurrentFolder()) == hash(root)
+    assert root is not media_pool.GetCurrentFolder()
+    original = lock.__enter__
+
+    class Spy:
+        def __enter__(self):
+            held.append(True)
+            return original()
+
+        def __exit__(self, *exc_info):
+            return lock.__exit__(*exc_info)
+
+    project._lock = Spy()
+    project.GetName()
+    assert held == [True]
+    assert ('other', 'Project.GetName') in fbmetrics.registry.calls
+    fbmetrics.registry.reset()
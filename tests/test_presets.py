@@ -0,0 +1,32 @@
+import fakeresolve
+from fbpresets import PresetCatalogue, is_builtin
+
+
+def test_builtin_by_name():
+    assert is_builtin('H.264 Master')
+    assert is_builtin('YouTube - 1080p') and is_builtin('YouTube')
+    assert not is_builtin('ProRes 422 Proxy')
+    # a platform name without the ' - ' is the user's
+    assert not is_builtin('Boxed 4K') and not is_builtin('Vimeo_review')
+    assert is_builtin('New Preset', extra_builtins={'New Preset'})
+
+
+def test_presets_are_fetched_once_per_project():
+    resolve = fakeresolve.FakeResolve(custom_presets=('ProRes 422 Proxy', 'Boxed 4K'))
+    project = resolve.GetProjectManager().GetCurrentProject()
+    catalogue = PresetCatalogue()
+    assert catalogue.names(project, custom_only=True) == ['ProRes 422 Proxy', 'Boxed 4K']
+    assert 'YouTube - 1080p' in catalogue.names(project)
+    assert resolve.log.counts['Project.GetRenderPresets'] == 1
+    catalogue.names(project, refresh=True)
+    assert resolve.log.counts['Project.GetRenderPresets'] == 2
+    other = resolve.GetProjectManager().CreateProject('other')
+    catalogue.names(other)
+    assert resolve.log.counts['Project.GetRenderPresets'] == 3
+
+
+def test_extra_builtins_are_left_out():
+    resolve = fakeresolve.FakeResolve()
+    project = resolve.GetProjectManager().GetCurrentProject()
+    catalogue = PresetCatalogue(extra_builtins=['DNxHR LB'])
+    assert catalogue.names(project, custom_only=True) == ['ProRes 422 Proxy']
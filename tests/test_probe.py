@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from fbprobe import MediaProbe, probe_file
+
+
+def write(path, data):
+    with open(path, 'wb') as filehandle:
+        filehandle.write(data)
+    return str(path)
+
+
+def atom(kind, payload=b''):
+    return (8 + len(payload)).to_bytes(4, 'big') + kind + payload
+
+
+@pytest.mark.parametrize('name, data, kind', [
+    ('clip.mov', atom(b'ftyp', b'qt  ') + atom(b'mdat', bytes(100)), 'quicktime'),
+    # the header wins over the extension
+    ('clip.dat', b'\x06\x0e\x2b\x34\x02\x05\x01\x01' + bytes(100), 'mxf'),
+    ('clip.wav', b'RIFF\x00\x00\x00\x00WAVE' + bytes(100), 'wav'),
+    ('frame.png', b'\x89PNG\r\n\x1a\n' + bytes(100), 'png'),
+    ('A001.R3D', b'\x00\x00\x00\x00RED2' + bytes(100), 'r3d'),
+    # no magic number, let through by the extension
+    ('frame.tga', bytes(100), 'tga'),
+])
+def test_media(tmp_path, name, data, kind):
+    assert probe_file(write(tmp_path / name, data)) == kind
+
+
+@pytest.mark.parametrize('name, data', [
+    ('clip.mov', b'<?xml version="1.0"?>' + bytes(100)),
+    ('report.pdf', b'%PDF-1.4' + bytes(100)),
+    ('.DS_Store', b'\x00\x00\x00\x01Bud1' + bytes(100)),
+    ('notes.txt', b'nothing to see here'),
+    ('short.mov', b'ftyp'),
+    ('empty.mov', b''),
+])
+def test_junk(tmp_path, name, data):
+    assert probe_file(write(tmp_path / name, data)) is None
+
+
+def test_truncated_quicktime(tmp_path):
+    data = atom(b'ftyp', b'qt  ') + atom(b'mdat', bytes(100))
+    assert probe_file(write(tmp_path / 'half.mov', data[:-10])) is None
+
+
+def test_unreadable(tmp_path):
+    assert probe_file(str(tmp_path / 'gone.mov')) is None
+
+
+def test_filter_caches_until_a_file_changes(tmp_path):
+    clip = write(tmp_path / 'clip.mov', atom(b'ftyp', b'qt  ') + atom(b'mdat', bytes(100)))
+    sidecar = write(tmp_path / 'clip.xml', b'<?xml version="1.0"?>')
+    probe = MediaProbe(str(tmp_path / 'probe.db'), workers=1)
+    try:
+        assert probe.filter([clip, sidecar]) == [clip]
+        assert probe.filter([clip, sidecar]) == [clip]
+        assert probe.stats == {'cached': 2, 'probed': 2, 'rejected': 2}
+        write(clip, b'%PDF-1.4' + bytes(100))
+        os.utime(clip, ns=(0, 0))
+        assert probe.filter([clip, sidecar]) == []
+        assert probe.stats['probed'] == 3
+    finally:
+        probe.close()
@@ -0,0 +1,92 @@
+import fakeresolve
+from fbcore import Session
+from renderpoll import RenderStatusPoller
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StillProject:
+    """
+    Renders for a number of IsRenderingInProgress calls, the job status changes only when told to.
+    """
+
+    def __init__(self, ticks, changing=False):
+        self.ticks = ticks
+        self.changing = changing
+        self.percent = 0
+
+    def IsRenderingInProgress(self):
+        self.ticks -= 1
+        return self.ticks >= 0
+
+    def GetRenderJobs(self):
+        return {1: {'TimelineName': 'A'}}
+
+    def GetRenderJobStatus(self, idx):
+        if self.changing:
+            self.percent += 1
+        return {'JobStatus': 'Rendering', 'CompletionPercentage': self.percent}
+
+
+def queued_session(folders, names):
+    watch_path, output_path = folders
+    clock = Clock()
+    resolve = fakeresolve.FakeResolve(render_fps=100, clock=clock)
+    session = Session(resolve)
+    for name in names:
+        session.import_and_queue(watch_path, name, 'ProRes 422 Proxy', output_path)
+    return resolve, session, clock
+
+
+def test_one_job_list_per_tick_and_only_unfinished_jobs(folders):
+    resolve, session, clock = queued_session(folders, 'ABC')
+    ids = session.start_rendering()
+    poller = RenderStatusPoller(session.proj, ids)
+    resolve.log.reset()
+    assert sorted(poller.poll_once()) == ids
+    assert resolve.log.counts['Project.GetRenderJobs'] == 1
+    assert resolve.log.counts['Project.GetRenderJobStatus'] == 3
+    clock.now += 10
+    poller.poll_once()
+    resolve.log.reset()
+    # all finished, nothing queried but the job list
+    assert poller.poll_once() == {}
+    assert dict(resolve.log.counts) == {'Project.GetRenderJobs': 1}
+
+
+def test_unchanged_statuses_are_not_published(folders):
+    resolve, session, clock = queued_session(folders, 'A')
+    ids = session.start_rendering()
+    poller = RenderStatusPoller(session.proj, ids)
+    published = []
+    poller.subscribe(lambda changes, statuses: published.append(changes))
+    poller.poll_once()
+    poller.poll_once()
+    assert len(published) == 1
+
+
+def test_deleted_job_is_published_as_none(folders):
+    resolve, session, clock = queued_session(folders, 'A')
+    poller = RenderStatusPoller(session.proj, session.jobs.ids())
+    poller.poll_once()
+    session.proj.DeleteAllRenderJobs()
+    assert poller.poll_once() == {1: None}
+
+
+def test_backs_off_while_nothing_changes():
+    poller = RenderStatusPoller(StillProject(8), [1], min_interval=0.001, max_interval=0.004, backoff=2.0)
+    poller.run()
+    assert poller.interval == 0.004
+
+
+def test_stays_fast_while_statuses_change():
+    poller = RenderStatusPoller(StillProject(8, changing=True), [1], min_interval=0.001, max_interval=0.004,
+                                backoff=2.0)
+    poller.run()
+    assert poller.interval == 0.001
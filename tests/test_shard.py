@@ -0,0 +1,42 @@
+import fakeresolve
+from fbcore import Session
+from fbjobs import COMPLETE
+from fbshard import ShardManager, count_source
+
+PRESET = 'ProRes 422 Proxy'
+
+
+def test_count_source(folders):
+    watch_path, output_path = folders
+    # 3 clips and a sidecar, in A000/A000_C000
+    assert count_source(watch_path + '/A') == (4, 3)
+
+
+def test_folders_over_the_cap_get_projects_of_their_own(folders):
+    watch_path, output_path = folders
+    resolve = fakeresolve.FakeResolve()
+    shards = ShardManager(Session(resolve), max_clips=5, max_bins=100)
+    for name in 'ABC':
+        assert shards.import_and_queue(watch_path, name, PRESET, output_path) == 1
+    assert [(shard.clips, len(shard.jobs)) for shard in shards.shards] == [(4, 1)] * 3
+    # the project they were created in, plus one per shard
+    assert len(resolve.project_manager.projects) == 4
+    rendered = shards.render()
+    assert [(shard, ids) for shard, ids in rendered] == [(shard, [1]) for shard in shards.shards]
+    assert all(shard.jobs.get(1).state == COMPLETE for shard in shards.shards)
+
+
+def test_folders_share_a_project_under_the_cap(folders):
+    watch_path, output_path = folders
+    shards = ShardManager(Session(fakeresolve.FakeResolve()), max_clips=100, max_bins=100)
+    ids = [shards.import_and_queue(watch_path, name, PRESET, output_path) for name in 'ABC']
+    assert ids == [1, 2, 3] and len(shards.shards) == 1
+    assert shards.pending()
+
+
+def test_bin_cap(folders):
+    watch_path, output_path = folders
+    shards = ShardManager(Session(fakeresolve.FakeResolve()), max_clips=100, max_bins=4)
+    for name in 'AB':
+        shards.import_and_queue(watch_path, name, PRESET, output_path)
+    assert [shard.bins for shard in shards.shards] == [3, 3]
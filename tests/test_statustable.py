@@ -0,0 +1,72 @@
+from footbrake import StatusTable
+
+
+class FakeTree:
+    def __init__(self):
+        self.items = {}
+        self.edits = 0
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def item(self, iid, values):
+        self.items[iid] = values
+        self.edits += 1
+
+
+class FakeTable:
+    """
+    The parts of sg.Table StatusTable uses: update(values=...) rebuilds the rows, Widget is the Tk Treeview.
+    """
+
+    def __init__(self):
+        self.Widget = FakeTree()
+        self.updates = 0
+
+    def update(self, values):
+        self.Widget.items = {str(i + 1): row for i, row in enumerate(values)}
+        self.updates += 1
+
+
+def row(k, status):
+    return [str(k), f'T{k}', status, '0', '', '']
+
+
+def test_changed_rows_are_updated_in_place():
+    table = FakeTable()
+    eta = []
+    status_table = StatusTable(table, eta.append, max_rate=0)
+    status_table.merge({('', 1): row(1, 'Queued'), ('', 2): row(2, 'Queued')}, 'Batch ETA 0:01:00')
+    status_table.draw()
+    assert table.updates == 2 and list(table.Widget.items.values()) == [row(1, 'Queued'), row(2, 'Queued')]
+    assert eta == ['Batch ETA 0:01:00']
+    status_table.merge({('', 2): row(2, 'Rendering')}, 'Batch ETA 0:00:30')
+    status_table.draw()
+    # the same jobs, one row written, no rebuild
+    assert table.updates == 2 and table.Widget.edits == 1
+    assert table.Widget.items['2'] == row(2, 'Rendering')
+
+
+def test_added_and_removed_rows_rebuild_the_table():
+    table = FakeTable()
+    status_table = StatusTable(table, lambda text: None, max_rate=0)
+    status_table.merge({('', 1): row(1, 'Queued')}, '')
+    status_table.draw()
+    status_table.merge({('', 1): None, ('B', 1): row(1, 'Queued'), ('', 3): row(3, 'Queued')}, '')
+    status_table.draw()
+    assert table.updates == 3 and list(table.Widget.items.values()) == [row(3, 'Queued'), row(1, 'Queued')]
+    status_table.clear()
+    assert table.Widget.items == {}
+
+
+def test_redraws_are_rate_limited():
+    table = FakeTable()
+    status_table = StatusTable(table, lambda text: None, max_rate=0.001)
+    status_table.merge({('', 1): row(1, 'Queued')}, '')
+    status_table.draw()
+    status_table.merge({('', 1): row(1, 'Rendering')}, '')
+    assert status_table.timeout() > 0
+    status_table.draw()
+    assert table.Widget.items['1'] == row(1, 'Queued')
+    status_table.draw(force=True)
+    assert table.Widget.items['1'] == row(1, 'Rendering')
@@ -0,0 +1,42 @@
+import fakeresolve
+from fbimport import mp_add_source
+from fbtimeline import make_timeline_with_folder
+
+
+def imported(tmp_path, clips, clips_per_folder=50):
+    resolve = fakeresolve.FakeResolve(clip_frames=24)
+    media_pool = resolve.GetProjectManager().GetCurrentProject().GetMediaPool()
+    path = str(tmp_path / 'A')
+    fakeresolve.make_source_tree(path, clips, clips_per_folder=clips_per_folder)
+    bin_folder = media_pool.AddSubFolder(media_pool.GetRootFolder(), 'A')
+    report = mp_add_source(path, True, media_pool, resolve.GetMediaStorage(), bin_folder)
+    resolve.log.reset()
+    return resolve, media_pool, bin_folder, report
+
+
+def test_one_append_without_markers(tmp_path):
+    resolve, media_pool, bin_folder, report = imported(tmp_path, 1000)
+    timeline = make_timeline_with_folder(bin_folder, '', False, media_pool, report.bin_clips)
+    assert resolve.log.counts['MediaPool.AppendToTimeline'] == 1
+    assert resolve.log.total() == 5
+    assert len(timeline.GetItemsInTrack('video', 1)) == 1000
+
+
+def test_markers_cost_a_call_per_bin(tmp_path):
+    resolve, media_pool, bin_folder, report = imported(tmp_path, 1000)
+    timeline = make_timeline_with_folder(bin_folder, 'note', True, media_pool, report.bin_clips)
+    bins = len(report.bin_clips)
+    assert bins == 20
+    assert 'MediaPoolItem.GetClipProperty' not in resolve.log.counts
+    assert resolve.log.counts['TimelineItem.GetEnd'] == bins
+    assert resolve.log.total() <= 3 * bins + 10
+    # at the end of every bin of 50 clips of 24 frames
+    assert sorted(timeline.GetMarkers()) == [50 * 24 * (i + 1) for i in range(bins)]
+
+
+def test_markers_from_the_bin_tree(tmp_path):
+    resolve, media_pool, bin_folder, report = imported(tmp_path, 30, clips_per_folder=10)
+    timeline = make_timeline_with_folder(bin_folder, 'note', True, media_pool)
+    markers = timeline.GetMarkers()
+    assert sorted(markers) == [240, 480, 720]
+    assert [markers[frame]['name'] for frame in sorted(markers)] == ['A000_C000', 'A000_C001', 'A000_C002']
@@ -0,0 +1,83 @@
+import os
+import time
+
+import fakeresolve
+from fbjobs import Job
+from fbverify import Verifier, find_outputs, verify_job
+
+CLIP = fakeresolve.QUICKTIME_HEADER + bytes(100)
+
+
+def write(path, data=CLIP, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as filehandle:
+        filehandle.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def job(output_path, started=None):
+    job = Job(1, '/watch', 'A', output_path, 'ProRes 422 Proxy')
+    job.started = started
+    return job
+
+
+def test_every_render_found_and_checksummed(tmp_path):
+    output_path = str(tmp_path / 'out')
+    sources = ['/watch/A/C001.mov', '/watch/A/C002.mov']
+    for name in ('C001', 'C002'):
+        write(os.path.join(output_path, name + '.mov'))
+    report = verify_job(job(output_path), 'A_timeline', sources, algorithm='md5')
+    assert (report.expected, len(report.outputs), report.missing, report.bad) == (2, 2, [], [])
+    with open(report.manifest) as filehandle:
+        assert sorted(line.split()[1] for line in filehandle) == ['C001.mov', 'C002.mov']
+
+
+def test_missing_empty_and_truncated_renders(tmp_path):
+    output_path = str(tmp_path / 'out')
+    sources = ['/watch/A/C001.mov', '/watch/A/C002.mov', '/watch/A/C003.mov', '/watch/A/C004.mov']
+    write(os.path.join(output_path, 'C001.mov'))
+    empty = write(os.path.join(output_path, 'C002.mov'), b'')
+    truncated = write(os.path.join(output_path, 'C003.mov'), CLIP[:-110])
+    report = verify_job(job(output_path), 'A_timeline', sources, algorithm='md5')
+    assert report.missing == ['/watch/A/C004.mov']
+    assert report.bad == [(empty, 'empty'), (truncated, 'truncated or unknown container')]
+    assert len(report.outputs) == 1 and report.manifest
+
+
+def test_nothing_rendered(tmp_path):
+    output_path = str(tmp_path / 'out')
+    os.makedirs(output_path)
+    report = verify_job(job(output_path), 'A_timeline', ['/watch/A/C001.mov'], algorithm='md5')
+    assert report.missing == ['/watch/A/C001.mov'] and report.manifest is None
+
+
+def test_renders_older_than_the_job_are_an_earlier_jobs(tmp_path):
+    output_path = str(tmp_path / 'out')
+    started = time.time()
+    # the same clip name on another card, rendered by an earlier job, newer than this job's render in another folder
+    write(os.path.join(output_path, 'B', 'C001.mov'), mtime=started - 3600)
+    assert find_outputs(['/watch/A/C001.mov'], output_path, 'A_timeline', since=started) == \
+        ([], ['/watch/A/C001.mov'])
+    render = write(os.path.join(output_path, 'A', 'C001.mov'))
+    assert find_outputs(['/watch/A/C001.mov'], output_path, 'A_timeline', since=started) == ([render], [])
+
+
+def test_single_file_render(tmp_path):
+    output_path = str(tmp_path / 'out')
+    render = write(os.path.join(output_path, 'A_timeline.mov'))
+    assert find_outputs(['/watch/A/C001.mov', '/watch/A/C002.mov'], output_path, 'A_timeline') == ([render], [])
+
+
+def test_verifier_reports_every_job(tmp_path):
+    output_path = str(tmp_path / 'out')
+    write(os.path.join(output_path, 'C001.mov'))
+    reports = []
+    verifier = Verifier(on_report=reports.append, algorithm='md5')
+    try:
+        futures = [verifier.submit(job(output_path), 'A_timeline', ['/watch/A/C001.mov']) for _ in range(3)]
+        verifier.wait()
+        assert all(future.done() for future in futures) and len(reports) == 3
+    finally:
+        verifier.close()